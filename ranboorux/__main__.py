@@ -0,0 +1,163 @@
+"""Command-line batch prompt generator: ``python -m ranboorux --count 1000 -o prompts.jsonl``."""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+from typing import Optional, Sequence
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import headless as rb_headless
+from ranboorux.boorus import BOORU_NAMES
+
+_REMOVAL_FLAGS = (
+    "remove_artist_tags",
+    "remove_character_tags",
+    "remove_clothing_tags",
+    "remove_text_tags",
+    "restrict_subject_tags",
+    "remove_furry_tags",
+    "remove_headwear_tags",
+    "remove_girl_suffix_tags",
+    "preserve_hair_eye_colors",
+    "remove_series_tags",
+)
+
+
+def _split_list(value: str) -> tuple:
+    return tuple(tag.strip() for tag in (value or "").split(",") if tag.strip())
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m ranboorux",
+        description="Generate RanbooruX prompts from booru posts as JSON lines.",
+    )
+    parser.add_argument("-o", "--output", required=True, help="JSONL file, or - for stdout.")
+    parser.add_argument("-n", "--count", type=int, default=100, help="Prompts to generate.")
+    parser.add_argument("--booru", choices=BOORU_NAMES, default="danbooru")
+    parser.add_argument("--tags", default="", help="Comma-separated search tags.")
+    parser.add_argument("--mature-rating", default="All")
+    parser.add_argument("--max-pages", type=int, default=10)
+    parser.add_argument("--prompt", default="", help="Base positive prompt.")
+    parser.add_argument("--negative-prompt", default="")
+    parser.add_argument("--remove-tags", default="", help="Comma-separated tags to remove.")
+    parser.add_argument("--favorite-tags", default="", help="Tags never removed.")
+    parser.add_argument("--keep-bad-tags", action="store_true", help="Keep watermark/text tags.")
+    parser.add_argument("--no-strict", action="store_true", help="Skip post prefiltering.")
+    parser.add_argument("--no-shuffle", action="store_true")
+    parser.add_argument(
+        "--chaos-mode", choices=("None", "Shuffle All", "Shuffle Negative"), default="None"
+    )
+    parser.add_argument("--chaos-amount", type=float, default=0.5)
+    parser.add_argument("--limit-tags", type=float, default=1.0)
+    parser.add_argument("--max-tags", type=int, default=0)
+    parser.add_argument("--change-dash", action="store_true")
+    for flag in _REMOVAL_FLAGS:
+        parser.add_argument(f"--{flag.replace('_', '-')}", action="store_true")
+    parser.add_argument(
+        "--catalog",
+        default=rb_headless.BUNDLED_CATALOG_PATH,
+        help="Tag catalog CSV (defaults to the bundled Danbooru catalog).",
+    )
+    parser.add_argument("--no-catalog", action="store_true")
+    parser.add_argument("--gelbooru-api-key", default="")
+    parser.add_argument("--gelbooru-user-id", default="")
+    parser.add_argument("--compat-base-url", default="", help="Gelbooru-compatible base URL.")
+    parser.add_argument("--batch-size", type=int, default=rb_headless.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=rb_headless.DEFAULT_WORKERS)
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Start over instead of resuming the batches missing from --output "
+        "(resuming needs the same --count and --batch-size).",
+    )
+    return parser.parse_args(argv)
+
+
+def build_options(args: argparse.Namespace) -> rb_headless.HeadlessOptions:
+    credentials = None
+    if args.gelbooru_api_key and args.gelbooru_user_id:
+        credentials = {"api_key": args.gelbooru_api_key, "user_id": args.gelbooru_user_id}
+    return rb_headless.HeadlessOptions(
+        booru=args.booru,
+        tags=args.tags,
+        mature_rating=args.mature_rating,
+        max_pages=args.max_pages,
+        base_positive=args.prompt,
+        base_negative=args.negative_prompt,
+        remove_bad_tags=not args.keep_bad_tags,
+        remove_tags=_split_list(args.remove_tags),
+        favorite_tags=_split_list(args.favorite_tags),
+        strict=not args.no_strict,
+        shuffle_tags=not args.no_shuffle,
+        chaos_mode=args.chaos_mode,
+        chaos_amount=args.chaos_amount,
+        limit_tags=args.limit_tags,
+        max_tags=args.max_tags,
+        change_dash=args.change_dash,
+        fringe_benefits=True,
+        gelbooru_credentials=credentials,
+        compat_base_url=args.compat_base_url,
+        **{flag: bool(getattr(args, flag)) for flag in _REMOVAL_FLAGS},
+    )
+
+
+def _load_catalog(args: argparse.Namespace) -> Optional[rb_catalog.TagCatalogProvider]:
+    if args.no_catalog:
+        return None
+    catalog, message = rb_catalog.load_catalog(args.catalog)
+    if not catalog.enabled():
+        print(f"[R Headless] Catalog disabled: {message}")
+        return None
+    return catalog
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    to_stdout = args.output == "-"
+    out = sys.stdout
+    # Progress logging goes to stderr so stdout stays pure JSONL.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            generator = rb_headless.PromptGenerator(
+                build_options(args), catalog=_load_catalog(args)
+            )
+        except ValueError as exc:
+            print(f"[R Headless] {exc}")
+            return 2
+        done = set()
+        if not to_stdout:
+            if args.overwrite and os.path.exists(args.output):
+                os.remove(args.output)
+            done = rb_headless.completed_batches(args.output, args.count, args.batch_size)
+            if done:
+                print(f"[R Headless] Resuming: {len(done)} batch(es) already in {args.output}")
+        started = time.monotonic()
+        with contextlib.ExitStack() as stack:
+            if not to_stdout:
+                out = stack.enter_context(open(args.output, "a", encoding="utf-8"))
+            totals = rb_headless.run(
+                generator,
+                out,
+                count=args.count,
+                batch_size=args.batch_size,
+                workers=args.workers,
+                skip=done,
+                on_batch=lambda batch, written: print(
+                    f"[R Headless] Batch {batch}: {written} prompt(s)"
+                ),
+            )
+        print(
+            f"[R Headless] Wrote {totals['written']} prompt(s) in "
+            f"{time.monotonic() - started:.1f}s; {totals['skipped']} batch(es) resumed, "
+            f"{totals['failed']} failed."
+        )
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
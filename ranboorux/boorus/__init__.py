@@ -1,57 +1,157 @@
 """Booru base class and factory function."""
 
+import math
+import random
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 from ranboorux import http_client as rb_http_client
+from ranboorux import rate_limit as rb_rate_limit
+from ranboorux.boorus.common import (
+    POST_AMOUNT,
+    USER_AGENT,
+    BooruError,
+    log,
+    split_tag_string,
+    split_tag_string_override,
+)
+from ranboorux.boorus.counts import TOTAL_COUNTS
+
+_PAGE_SLOTS_LOCK = threading.Lock()
+_PAGE_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_XML_TOTAL_RE = re.compile(r'<posts\b[^>]*?\bcount="(\d+)"')
+
+
+@dataclass
+class PostsResult:
+    """What one ``get_posts`` call fetched, kept per call so parallel fetches don't race.
+
+    ``total`` is the hit count the API reported for the query (``None`` when the
+    booru does not say), ``page`` the page that was read and ``elapsed`` the wall
+    time in seconds.
+    """
+
+    posts: List[dict] = field(default_factory=list)
+    total: Optional[int] = None
+    page: Optional[int] = None
+    elapsed: float = 0.0
+    booru_name: str = ""
+
+    @property
+    def count(self) -> int:
+        return self.total if self.total is not None else len(self.posts)
+
+
+def as_posts_result(value, booru_name="") -> PostsResult:
+    """Wrap a plain post list (older or third-party boorus) in a PostsResult."""
+    if isinstance(value, PostsResult):
+        return value
+    return PostsResult(posts=list(value or []), booru_name=booru_name)
 
 
 class Booru:
-    def __init__(self, booru_name, base_api_url, http_client=None):
-        from scripts.ranbooru import Script
+    # Index of the first page in the API's page parameter (``page=`` is 1-based,
+    # Gelbooru-style ``pid=`` is 0-based).
+    PAGE_BASE = 1
+    # Upper bound on concurrent page requests to one booru, shared by all instances.
+    MAX_CONCURRENT_PAGES = 3
+    # Raw post keys _standardize_post reads; page payloads are trimmed to these before
+    # standardizing. Subclasses reading extra keys extend this set.
+    POST_FIELDS = frozenset(
+        {
+            "id",
+            "rating",
+            "score",
+            "source",
+            "md5",
+            "hash",
+            "tags",
+            "tag_string",
+            "tag_string_artist",
+            "tag_string_character",
+            "tag_string_copyright",
+            "file",
+            "file_url",
+            "large_file_url",
+            "image_width",
+            "image_height",
+            "width",
+            "height",
+            "media_asset",
+            "sample",
+            "sample_url",
+            "sample_width",
+            "sample_height",
+            "jpeg_url",
+            "jpeg_width",
+            "jpeg_height",
+            "preview",
+            "preview_url",
+            "preview_width",
+            "preview_height",
+            "actual_preview_width",
+            "actual_preview_height",
+        }
+    )
 
+    def __init__(self, booru_name, base_api_url, http_client=None):
         self.booru_name = booru_name
         self.base_api_url = base_api_url
+        self.page_size = POST_AMOUNT
         self.http = http_client or rb_http_client.BooruSession()
-        self.headers = {"user-agent": f"Ranbooru Extension/{Script.version} for Forge"}
+        self.headers = {"user-agent": USER_AGENT}
 
-    def _fetch_data(self, query_url):
-        from scripts.ranbooru import BooruError, _log
+    def _rate_limiter(self):
+        return getattr(self.http, "rate_limiter", None) or rb_rate_limit.RATE_LIMITER
 
-        _log(f"Querying {self.booru_name}: {rb_http_client.redact_url(query_url)}")
+    def _fetch_data(self, query_url, fields=None):
+        log(f"Querying {self.booru_name}: {rb_http_client.redact_url(query_url)}")
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                return self.http.get_json(query_url, headers=self.headers, timeout=30)
+                return self.http.get_json(
+                    query_url, headers=self.headers, timeout=30, fields=fields
+                )
             except Exception as e:
                 from requests.exceptions import HTTPError, RequestException
 
                 if isinstance(e, HTTPError):
                     status = getattr(e.response, "status_code", 0) if hasattr(e, "response") else 0
-                    if status and 400 <= status < 500:
+                    if (
+                        status
+                        and 400 <= status < 500
+                        and status not in rb_rate_limit.THROTTLE_STATUSES
+                    ):
                         message = rb_http_client.safe_exception_message(
                             f"fetching data from {self.booru_name}", query_url, e
                         )
-                        _log(f"Error {message}")
+                        log(f"Error {message}")
                         raise BooruError(f"HTTP Error {message}") from e
                 elif not isinstance(e, RequestException):
                     message = rb_http_client.safe_exception_message(
                         f"fetching data from {self.booru_name}", query_url, e
                     )
-                    _log(f"Error {message}")
+                    log(f"Error {message}")
                     raise BooruError(f"HTTP Error {message}") from e
 
                 if attempt < max_retries - 1:
-                    sleep_time = 2**attempt
+                    # The shared limiter holds the host for the backoff (or a longer
+                    # Retry-After), so the wait also applies to other requests in flight.
+                    delay = self._rate_limiter().backoff(query_url, attempt + 1)
                     message = rb_http_client.safe_exception_message(
                         f"fetching data from {self.booru_name}", query_url, e
                     )
-                    _log(f"[R] Retry {attempt + 1}/{max_retries} after {sleep_time}s: {message}")
-                    time.sleep(sleep_time)
+                    log(f"[R] Retry {attempt + 1}/{max_retries} after {delay:.1f}s: {message}")
                 else:
                     message = rb_http_client.safe_exception_message(
                         f"fetching data from {self.booru_name}", query_url, e
                     )
-                    _log(f"Error {message}")
+                    log(f"Error {message}")
                     raise BooruError(f"HTTP Error {message}") from e
 
     def _is_direct_image_url(self, url):
@@ -90,9 +190,96 @@ class Booru:
 
         return False
 
-    def _standardize_post(self, post_data):
-        from scripts.ranbooru import _split_tag_string, _split_tag_string_override
+    @staticmethod
+    def _post_dimensions(post_data):
+        """Return the original image size the API reports, or (None, None)."""
+        candidates = [post_data]
+        if isinstance(post_data.get("file"), dict):
+            candidates.append(post_data["file"])
+        for source in candidates:
+            for width_key, height_key in (("image_width", "image_height"), ("width", "height")):
+                try:
+                    width = int(source.get(width_key) or 0)
+                    height = int(source.get(height_key) or 0)
+                except (TypeError, ValueError):
+                    continue
+                if width > 0 and height > 0:
+                    return width, height
+        return None, None
+
+    @staticmethod
+    def _post_renditions(post_data):
+        """Collect the downscaled copies a booru serves next to the original file.
+
+        Each entry is ``{"kind", "url", "width", "height"}``; only absolute URLs with
+        known dimensions are kept, since the fetch policy compares sizes.
+        """
+        renditions = []
 
+        def add(kind, url, width, height):
+            try:
+                width = int(width or 0)
+                height = int(height or 0)
+            except (TypeError, ValueError):
+                return
+            if (
+                isinstance(url, str)
+                and url.startswith(("http://", "https://"))
+                and width > 0
+                and height > 0
+            ):
+                renditions.append({"kind": kind, "url": url, "width": width, "height": height})
+
+        # Danbooru / AIBooru list every variant on the media asset
+        media_asset = post_data.get("media_asset")
+        if isinstance(media_asset, dict) and isinstance(media_asset.get("variants"), list):
+            for variant in media_asset["variants"]:
+                if isinstance(variant, dict) and variant.get("type") != "original":
+                    add(
+                        str(variant.get("type") or "sample"),
+                        variant.get("url"),
+                        variant.get("width"),
+                        variant.get("height"),
+                    )
+        # Gelbooru / Moebooru flat fields
+        add(
+            "sample",
+            post_data.get("sample_url"),
+            post_data.get("sample_width"),
+            post_data.get("sample_height"),
+        )
+        add(
+            "jpeg",
+            post_data.get("jpeg_url"),
+            post_data.get("jpeg_width"),
+            post_data.get("jpeg_height"),
+        )
+        add(
+            "preview",
+            post_data.get("preview_url"),
+            post_data.get("actual_preview_width") or post_data.get("preview_width"),
+            post_data.get("actual_preview_height") or post_data.get("preview_height"),
+        )
+        # e621 nests renditions in dicts
+        for kind in ("sample", "preview"):
+            nested = post_data.get(kind)
+            if isinstance(nested, dict):
+                add(kind, nested.get("url"), nested.get("width"), nested.get("height"))
+        return renditions
+
+    @staticmethod
+    def _post_md5(post_data):
+        """Return the lowercase md5 of the original file when the API exposes one."""
+        for source in (post_data, post_data.get("file")):
+            if not isinstance(source, dict):
+                continue
+            for key in ("md5", "hash"):
+                value = source.get(key)
+                if isinstance(value, str) and len(value) == 32:
+                    return value.lower()
+        return None
+
+    def _standardize_post(self, post_data):
         post = {}
         # extract tags in a robust way; some APIs return categorized tags as dicts
         raw_tags = post_data.get("tags", post_data.get("tag_string", ""))
@@ -110,22 +297,22 @@ class Booru:
             if isinstance(tags_dict.get("copyright"), list):
                 copyright_tags = tags_dict.get("copyright", [])
         if "tag_string_artist" in post_data:
-            parsed = _split_tag_string_override(post_data.get("tag_string_artist"))
+            parsed = split_tag_string_override(post_data.get("tag_string_artist"))
             if parsed is not None:
                 artist_tags = parsed
         if "tag_string_character" in post_data:
-            parsed = _split_tag_string_override(post_data.get("tag_string_character"))
+            parsed = split_tag_string_override(post_data.get("tag_string_character"))
             if parsed is not None:
                 character_tags = parsed
         if "tag_string_copyright" in post_data:
-            parsed = _split_tag_string_override(post_data.get("tag_string_copyright"))
+            parsed = split_tag_string_override(post_data.get("tag_string_copyright"))
             if parsed is not None:
                 copyright_tags = parsed
 
         # For boorus that don't provide categorized tags, try to extract character tags from the main tag string
         # This handles cases like Gelbooru/Danbooru where character tags are mixed with other tags
         if not character_tags and isinstance(raw_tags, str):
-            all_tags = _split_tag_string(raw_tags)
+            all_tags = split_tag_string(raw_tags)
             for tag in all_tags:
                 # Common patterns for character tags: contains parentheses (series name) or ends with specific patterns
                 if (
@@ -156,6 +343,8 @@ class Booru:
         post["file_url"] = post_data.get("file_url")
         if post["file_url"] is None:
             post["file_url"] = post_data.get("large_file_url")
+        if post["file_url"] is None and isinstance(post_data.get("file"), dict):
+            post["file_url"] = post_data["file"].get("url")
         if post["file_url"] is None:
             # Check if source is a direct image URL before using it
             source_url = post_data.get("source")
@@ -163,10 +352,271 @@ class Booru:
                 post["file_url"] = source_url
             else:
                 post["file_url"] = None
+        post["width"], post["height"] = self._post_dimensions(post_data)
+        post["renditions"] = self._post_renditions(post_data)
+        post["md5"] = self._post_md5(post_data)
+        post["source"] = post_data.get("source") or None
         post["id"] = post_data.get("id")
         post["rating"] = post_data.get("rating")
         post["booru_name"] = self.booru_name
         return post
 
+    def _standardize_posts(self, raw_posts):
+        return [self._standardize_post(post) for post in raw_posts if post]
+
+    def _page_range(self, max_pages, total=None):
+        pages = max(1, int(max_pages or 1))
+        if total is not None:
+            # Only pick pages that exist for this query; page one is kept even when
+            # the total says zero, since counts lag behind new uploads.
+            pages = min(pages, max(1, math.ceil(total / max(1, int(self.page_size)))))
+        return range(self.PAGE_BASE, self.PAGE_BASE + pages)
+
+    def _random_page(self, max_pages, tags_query=None):
+        total = None if tags_query is None else self._known_total(tags_query)
+        return random.choice(self._page_range(max_pages, total))
+
+    def _fetch_page(self, tags_query, page):
+        """Fetch one result page; returns (standardized posts, reported total or None)."""
+        raise NotImplementedError
+
+    def _count_key(self, tags_query):
+        return (str(self.booru_name).lower(), self.base_api_url, tags_query or "")
+
+    def _probe_total(self, tags_query):
+        """Ask the API how many posts match, as cheaply as it allows; None if it can't."""
+        return None
+
+    @staticmethod
+    def _xml_total(text):
+        match = _XML_TOTAL_RE.search((text or "")[:4096])
+        return int(match.group(1)) if match else None
+
+    def _fetch_xml_total(self, query_url):
+        response = self.http.get_text(query_url, headers=self.headers, timeout=30)
+        return self._xml_total(response.text)
+
+    def _known_total(self, tags_query):
+        """Cached total for ``tags_query``, probing the API once when nothing is cached."""
+        key = self._count_key(tags_query)
+        total = TOTAL_COUNTS.get(key)
+        if total is not None:
+            return total
+        try:
+            total = self._probe_total(tags_query)
+        except Exception as exc:
+            log(f"{self.booru_name}: count probe failed: {exc}")
+            return None
+        if total is not None:
+            TOTAL_COUNTS.put(key, total)
+            log(f"{self.booru_name}: query matches {total} post(s).")
+        return total
+
+    def _learn_total(self, tags_query, page, posts, total):
+        """Cache a reported total, or infer one from a short last page.
+
+        A full page only proves a lower bound, so it never shrinks a cached total,
+        and a reported total below the posts already seen is ignored.
+        """
+        page_size = int(self.page_size)
+        seen = (page - self.PAGE_BASE) * page_size + len(posts)
+        key = self._count_key(tags_query)
+        if total is None and len(posts) < page_size:
+            total = seen
+        if total is None or total < seen:
+            return TOTAL_COUNTS.get(key)
+        if len(posts) >= page_size:
+            cached = TOTAL_COUNTS.get(key)
+            if cached is not None and cached > total:
+                return cached
+        TOTAL_COUNTS.put(key, total)
+        return total
+
+    def _fetch_random_page(self, tags_query, max_pages):
+        """Fetch one random page inside the known page range; returns (posts, total, page).
+
+        When the picked page comes back empty the learned total shrinks the range and
+        one more page inside it is tried.
+        """
+        page = self._random_page(max_pages, tags_query)
+        posts, total = self._fetch_page(tags_query, page)
+        learned = self._learn_total(tags_query, page, posts, total)
+        if not posts and page != self.PAGE_BASE and learned:
+            retry = self._random_page(max_pages, tags_query)
+            if retry != page:
+                page = retry
+                posts, total = self._fetch_page(tags_query, page)
+                self._learn_total(tags_query, page, posts, total)
+        return posts, total, page
+
+    @contextmanager
+    def _page_slot(self):
+        key = str(self.booru_name).lower()
+        with _PAGE_SLOTS_LOCK:
+            semaphore = _PAGE_SLOTS.get(key)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(max(1, int(self.MAX_CONCURRENT_PAGES)))
+                _PAGE_SLOTS[key] = semaphore
+        with semaphore:
+            yield
+
+    @staticmethod
+    def _post_identity(post):
+        post_id = post.get("id")
+        if post_id is not None:
+            return (str(post.get("booru_name") or "").lower(), str(post_id))
+        return (None, post.get("file_url"))
+
+    def harvest_posts(self, tags_query="", max_pages=10, pages=3, exclude_pages=()):
+        """Fetch several distinct random pages concurrently and merge them by post id.
+
+        Concurrency per booru is capped by ``MAX_CONCURRENT_PAGES``. Failed pages are
+        logged and skipped; the error is only raised when every page failed.
+        """
+        excluded = set(exclude_pages or ())
+        candidates = [
+            page
+            for page in self._page_range(max_pages, self._known_total(tags_query))
+            if page not in excluded
+        ]
+        if not candidates:
+            return []
+        chosen = random.sample(candidates, min(max(1, int(pages)), len(candidates)))
+
+        def _run(page):
+            with self._page_slot():
+                return self._fetch_page(tags_query, page)
+
+        results = []
+        errors = []
+        workers = min(len(chosen), max(1, int(self.MAX_CONCURRENT_PAGES)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ranboorux-pages") as pool:
+            futures = [(page, pool.submit(_run, page)) for page in chosen]
+            for page, future in futures:
+                try:
+                    posts, total = future.result()
+                    results.append(posts)
+                    self._learn_total(tags_query, page, posts, total)
+                except Exception as exc:
+                    errors.append(exc)
+                    log(f"{self.booru_name}: page {page} failed during harvest: {exc}")
+        if errors and not results:
+            raise errors[-1]
+
+        merged = []
+        seen = set()
+        for page_posts in results:
+            for post in page_posts:
+                identity = self._post_identity(post)
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                merged.append(post)
+        print(
+            f"[R] Harvested {len(merged)} unique posts from {len(results)}/{len(chosen)} "
+            f"{self.booru_name} page(s)."
+        )
+        return merged
+
+    def _result(self, posts, started, total=None, page=None):
+        return PostsResult(
+            posts=posts,
+            total=total,
+            page=page,
+            elapsed=time.monotonic() - started,
+            booru_name=self.booru_name,
+        )
+
     def get_posts(self, tags_query="", max_pages=10, post_id=None):
+        """Fetch posts for one random page (or one post id); returns a PostsResult."""
         raise NotImplementedError
+
+
+BOORU_NAMES = (
+    "gelbooru",
+    "gelbooru-compatible",
+    "danbooru",
+    "xbooru",
+    "rule34",
+    "safebooru",
+    "konachan",
+    "yande.re",
+    "aibooru",
+    "e621",
+    "federated",
+)
+
+
+def make_booru(
+    booru_name,
+    *,
+    fringe_benefits=True,
+    gelbooru_credentials=None,
+    compat_base_url="",
+    http_client=None,
+    federated_backends=None,
+    federated_timeout=None,
+):
+    """Build the booru client for a UI name such as ``danbooru`` or ``federated``.
+
+    Every client shares ``http_client`` when one is given. Federated search skips
+    Gelbooru unless credentials are configured.
+    """
+    from ranboorux.boorus.common import sanitize_base_url
+    from ranboorux.boorus.federated import DEFAULT_BACKEND_TIMEOUT, DEFAULT_BACKENDS, FederatedBooru
+    from ranboorux.boorus.gelbooru import Gelbooru, GelbooruCompatible
+    from ranboorux.boorus.simple import (
+        AIBooru,
+        Danbooru,
+        Konachan,
+        Rule34,
+        Safebooru,
+        XBooru,
+        Yandere,
+        e621,
+    )
+
+    booru_name = (booru_name or "").strip().lower()
+    if booru_name == "gelbooru-compatible":
+        base_url = sanitize_base_url(compat_base_url)
+        if not base_url:
+            raise ValueError(
+                "Please enter a Gelbooru-compatible Base URL (e.g., https://realbooru.com)."
+            )
+        api = GelbooruCompatible(base_url)
+        if http_client is not None:
+            api.http = http_client
+        return api
+
+    booru_apis = {
+        "gelbooru": Gelbooru(fringe_benefits, gelbooru_credentials),
+        "danbooru": Danbooru(),
+        "xbooru": XBooru(),
+        "rule34": Rule34(),
+        "safebooru": Safebooru(),
+        "konachan": Konachan(),
+        "yande.re": Yandere(),
+        "aibooru": AIBooru(),
+        "e621": e621(),
+    }
+    if http_client is not None:
+        for api in booru_apis.values():
+            api.http = http_client
+    if booru_name == "federated":
+        backends = []
+        for backend_name, weight in federated_backends or DEFAULT_BACKENDS:
+            backend = booru_apis.get(backend_name)
+            if backend is None:
+                continue
+            if isinstance(backend, Gelbooru) and not (backend.api_key and backend.user_id):
+                print("[R] Federated: skipping Gelbooru (no API key/user ID configured).")
+                continue
+            backends.append((backend, weight))
+        return FederatedBooru(
+            backends,
+            timeout=DEFAULT_BACKEND_TIMEOUT if federated_timeout is None else federated_timeout,
+            http_client=http_client,
+        )
+    if booru_name not in booru_apis:
+        raise ValueError(f"Booru '{booru_name}' not implemented.")
+    return booru_apis[booru_name]
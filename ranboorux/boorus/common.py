@@ -0,0 +1,87 @@
+"""Constants, errors and logging shared by the booru clients.
+
+Kept free of WebUI imports so ``ranboorux.boorus`` can be used from worker
+processes, benchmarks and command-line tools without gradio or ``modules.*``.
+"""
+
+import re
+
+CLIENT_VERSION = "1.8-Refactored"
+USER_AGENT = f"Ranbooru Extension/{CLIENT_VERSION} for Forge"
+# Posts requested per page from every booru.
+POST_AMOUNT = 100
+
+_TAG_SPLIT_RE = re.compile(r"[,\s]+")
+
+RATING_TYPES = {
+    "none": {"All": "All"},
+    "full": {"All": "All", "Safe": "safe", "Questionable": "questionable", "Explicit": "explicit"},
+    "single": {"All": "All", "Safe": "g", "Sensitive": "s", "Questionable": "q", "Explicit": "e"},
+}
+
+# Rating tag vocabulary per booru, keyed by the UI's mature-rating choice.
+RATINGS = {
+    "e621": RATING_TYPES["full"],
+    "danbooru": RATING_TYPES["single"],
+    "aibooru": RATING_TYPES["full"],
+    "yande.re": RATING_TYPES["full"],
+    "konachan": RATING_TYPES["full"],
+    "safebooru": RATING_TYPES["none"],
+    "rule34": RATING_TYPES["full"],
+    "xbooru": RATING_TYPES["full"],
+    "gelbooru": RATING_TYPES["single"],
+    "gelbooru-compatible": RATING_TYPES["single"],
+    "federated": RATING_TYPES["full"],
+}
+
+
+class BooruError(Exception):
+    pass
+
+
+def log(message):
+    if isinstance(message, str) and not message.startswith("[R]"):
+        message = f"[R] {message}"
+    print(message)
+
+
+def split_tag_string(value):
+    if not isinstance(value, str):
+        return []
+    return [tag for tag in _TAG_SPLIT_RE.split(value.strip()) if tag]
+
+
+def split_tag_string_override(value):
+    """Split a categorised tag field; ``None`` when the API did not send one."""
+    if value is None or not isinstance(value, str):
+        return None
+    return split_tag_string(value)
+
+
+def sanitize_base_url(value):
+    if not isinstance(value, str):
+        return ""
+    sanitized = value.strip()
+    if not sanitized:
+        return ""
+    if not re.match(r"^https?://", sanitized, re.IGNORECASE):
+        sanitized = f"https://{sanitized}"
+    return sanitized.rstrip("/")
+
+
+def query_tags(booru_name, search_tags, mature_rating, post_id=None):
+    """Search tags plus the booru's rating tag and ``-animated``, before catalog cleanup."""
+    tags = []
+    # Don't add search_tags to the query when using post_id - causes API confusion
+    if search_tags and not post_id:
+        tags.extend([t.strip() for t in search_tags.split(",") if t.strip()])
+    if mature_rating != "All" and booru_name in RATINGS and mature_rating in RATINGS[booru_name]:
+        rating_tag = RATINGS[booru_name][mature_rating]
+        if rating_tag != "All":
+            tags.append(f"rating:{rating_tag}")
+    tags.append("-animated")
+    return tags
+
+
+def format_tags_query(tags):
+    return f"&tags={'+'.join(tags)}" if tags else ""
@@ -0,0 +1,64 @@
+"""TTL cache of total hit counts per (booru, endpoint, tags query)."""
+
+import threading
+import time
+from collections import OrderedDict
+
+COUNT_CACHE_TTL_SECONDS = 900.0
+COUNT_CACHE_MAX_ENTRIES = 512
+
+
+class TotalCountCache:
+    """Remember how many posts a tag query matches so page picks stay in range.
+
+    Totals come from count probes, from ``count`` attributes on result pages, or
+    are inferred from a short or empty page. Entries expire after ``ttl`` seconds
+    because new uploads keep shifting the real number.
+    """
+
+    def __init__(
+        self, ttl=COUNT_CACHE_TTL_SECONDS, max_entries=COUNT_CACHE_MAX_ENTRIES, clock=None
+    ):
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, total):
+        try:
+            total = max(0, int(total))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._entries[key] = (total, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+TOTAL_COUNTS = TotalCountCache()
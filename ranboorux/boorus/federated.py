@@ -0,0 +1,169 @@
+"""Federated booru that pools posts from several backends into one weighted result."""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from urllib.parse import urlparse
+
+from ranboorux.boorus import Booru, as_posts_result
+from ranboorux.boorus.common import BooruError, log
+
+DEFAULT_BACKEND_TIMEOUT = 20.0
+# (booru, weight) pairs queried by default; weights set each backend's share of random
+# picks. Gelbooru is only included when credentials are configured.
+DEFAULT_BACKENDS = (
+    ("danbooru", 1.0),
+    ("gelbooru", 1.0),
+    ("safebooru", 0.5),
+)
+
+
+def _normalized_source(url):
+    """Reduce a source URL to ``host/path`` so http/https and ``www.`` variants match."""
+    if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+        return None
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if not host:
+        return None
+    path = parsed.path.rstrip("/")
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{host}{path}{query}"
+
+
+class FederatedBooru(Booru):
+    """Query several boorus concurrently and merge their posts into one pool.
+
+    Each backend keeps its own ``_standardize_post``, so merged posts still carry
+    their origin in ``booru_name``. A post is dropped as a cross-post when an
+    earlier backend returned the same md5, or the same normalised source URL
+    where either post lacks an md5. Every post gets
+    a ``pool_weight`` so random selection draws each backend in proportion to its
+    weight regardless of how many posts it returned. A backend that errors or
+    misses the shared deadline is logged and skipped.
+    """
+
+    def __init__(self, backends, timeout=DEFAULT_BACKEND_TIMEOUT, http_client=None):
+        self.backends = [
+            (backend, float(weight)) for backend, weight in backends if float(weight) > 0
+        ]
+        if not self.backends:
+            raise ValueError("Federated search needs at least one backend.")
+        super().__init__("Federated", "", http_client=http_client or self.backends[0][0].http)
+        self.timeout = float(timeout)
+
+    @property
+    def backend_names(self):
+        return [backend.booru_name.lower() for backend, _weight in self.backends]
+
+    @staticmethod
+    def _query_for(backend, tags_query):
+        if isinstance(tags_query, dict):
+            return tags_query.get(backend.booru_name.lower(), "")
+        return tags_query
+
+    @staticmethod
+    def _dedupe_keys(post):
+        """``(md5, source)`` used to spot cross-posts; either may be None."""
+        return post.get("md5") or None, _normalized_source(post.get("source"))
+
+    def _gather(self, call, tags_query):
+        """Run ``call(backend, query)`` on every backend; returns [(backend, weight, posts)]."""
+        results = []
+        errors = []
+        pool = ThreadPoolExecutor(
+            max_workers=len(self.backends), thread_name_prefix="ranboorux-federated"
+        )
+        try:
+            futures = [
+                (backend, weight, pool.submit(call, backend, self._query_for(backend, tags_query)))
+                for backend, weight in self.backends
+            ]
+            deadline = time.monotonic() + self.timeout
+            for backend, weight, future in futures:
+                try:
+                    posts = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FuturesTimeoutError:
+                    errors.append(f"{backend.booru_name} timed out")
+                    log(
+                        f"Federated: {backend.booru_name} missed the {self.timeout:g}s "
+                        "deadline; skipping."
+                    )
+                except Exception as exc:
+                    errors.append(f"{backend.booru_name}: {exc}")
+                    log(f"Federated: {backend.booru_name} failed: {exc}")
+                else:
+                    results.append((backend, weight, posts))
+        finally:
+            # Don't block on a straggler; its result is simply dropped.
+            pool.shutdown(wait=False, cancel_futures=True)
+        if errors and not results:
+            raise BooruError(f"Every federated backend failed ({'; '.join(errors)})")
+        return results
+
+    def _merge(self, results):
+        merged = []
+        md5s = set()
+        # Normalised source -> whether every earlier post with that source had an md5.
+        sources = {}
+        contributed = []
+        for backend, weight, posts in results:
+            kept = []
+            for post in posts or ():
+                md5, source = self._dedupe_keys(post)
+                if md5 and md5 in md5s:
+                    continue
+                # Posts with different md5s are different files, even from one source.
+                if source in sources and not (md5 and sources[source]):
+                    continue
+                kept.append(post)
+            # Recorded only after the whole backend, so a booru never drops its own posts.
+            for post in kept:
+                md5, source = self._dedupe_keys(post)
+                if md5:
+                    md5s.add(md5)
+                if source:
+                    sources[source] = sources.get(source, True) and bool(md5)
+            if kept:
+                contributed.append((backend, weight, kept))
+        for _backend, weight, kept in contributed:
+            share = weight / len(kept)
+            for post in kept:
+                post["pool_weight"] = share
+                merged.append(post)
+        random.shuffle(merged)
+        summary = ", ".join(
+            f"{backend.booru_name}={len(kept)}" for backend, _w, kept in contributed
+        )
+        print(f"[R] Federated pool: {len(merged)} unique posts ({summary or 'none'}).")
+        return merged
+
+    def harvest_posts(self, tags_query="", max_pages=10, pages=3, exclude_pages=()):
+        results = self._gather(
+            lambda backend, query: backend.harvest_posts(
+                tags_query=query, max_pages=max_pages, pages=pages
+            ),
+            tags_query,
+        )
+        return self._merge(results)
+
+    def get_posts(self, tags_query="", max_pages=10, post_id=None):
+        started = time.monotonic()
+        if post_id:
+            print(f"[R] Warn: {self.booru_name} does not support post IDs.")
+            return self._result([], started)
+        results = self._gather(
+            lambda backend, query: as_posts_result(
+                backend.get_posts(tags_query=query, max_pages=max_pages), backend.booru_name
+            ),
+            tags_query,
+        )
+        totals = [result.total for _backend, _weight, result in results]
+        posts = self._merge(
+            [(backend, weight, result.posts) for backend, weight, result in results]
+        )
+        total = sum(totals) if totals and None not in totals else None
+        return self._result(posts, started, total)
@@ -1,88 +1,131 @@
 """Gelbooru and GelbooruCompatible booru classes."""
 
-import random
+import io
+import threading
 import time
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote_plus
 
 from ranboorux import http_client as rb_http_client
+from ranboorux import user_store as rb_user_store
 from ranboorux.boorus import Booru
+from ranboorux.boorus.common import POST_AMOUNT, BooruError, log, sanitize_base_url
+
+# Which DAPI flavour ("json" or "xml") last worked for each Gelbooru-compatible base
+# URL, so sites without JSON support don't cost a failed request on every call.
+_DAPI_FORMATS: Dict[str, str] = {}
+_DAPI_FORMATS_LOCK = threading.Lock()
+_SNIFF_BYTES = 256
+
+
+# Root element of each DAPI XML listing.
+_XML_ROOTS = {"post": "posts", "tag": "tags", "tag_alias": "tag_aliases"}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _head(response, size: int) -> bytes:
+    """First ``size`` body bytes, without consuming a streamed body."""
+    peek = getattr(response, "peek", None)
+    if callable(peek):
+        return bytes(peek(size))
+    return bytes(response.content[:size])
+
+
+def _remembered_format(base_url: str) -> Optional[str]:
+    with _DAPI_FORMATS_LOCK:
+        return _DAPI_FORMATS.get(base_url)
+
+
+def _remember_format(base_url: str, fmt: Optional[str]) -> None:
+    with _DAPI_FORMATS_LOCK:
+        if fmt is None:
+            _DAPI_FORMATS.pop(base_url, None)
+        else:
+            _DAPI_FORMATS[base_url] = fmt
 
 
 class Gelbooru(Booru):
-    def __init__(self, fringe_benefits, credentials: Optional[Dict[str, str]] = None):
-        from scripts.ranbooru import POST_AMOUNT, _sanitize_gelbooru_credential
+    PAGE_BASE = 0
 
-        super().__init__(
-            "Gelbooru",
-            f"https://gelbooru.com/index.php?page=dapi&s=post&q=index&json=1&limit={POST_AMOUNT}",
-        )
+    def __init__(self, fringe_benefits, credentials: Optional[Dict[str, str]] = None):
+        self.dapi_url = "https://gelbooru.com/index.php?page=dapi&s=post&q=index"
+        super().__init__("Gelbooru", f"{self.dapi_url}&json=1&limit={POST_AMOUNT}")
         self.fringeBenefits = fringe_benefits
         credentials = credentials or {}
         self.api_key = (
-            _sanitize_gelbooru_credential(credentials.get("api_key"))
+            rb_user_store.sanitize_credential(credentials.get("api_key"))
             if isinstance(credentials, dict)
             else ""
         )
         self.user_id = (
-            _sanitize_gelbooru_credential(credentials.get("user_id"))
+            rb_user_store.sanitize_credential(credentials.get("user_id"))
             if isinstance(credentials, dict)
             else ""
         )
 
-    def get_posts(self, tags_query="", max_pages=10, post_id=None):
-        import scripts.ranbooru as _r
-        from scripts.ranbooru import BooruError
-
-        _r.COUNT = 0
-        all_fetched_posts = []
+    def _credentials_query(self):
         if not self.api_key or not self.user_id:
             raise BooruError(
                 "Gelbooru requires an API key and user ID. Set them under RanbooruX \u00bb Gelbooru settings."
             )
-        credentials_query = (
-            f"&api_key={quote_plus(self.api_key)}&user_id={quote_plus(self.user_id)}"
-        )
+        return f"&api_key={quote_plus(self.api_key)}&user_id={quote_plus(self.user_id)}"
+
+    @staticmethod
+    def _reported_count(fetched_data):
+        if (
+            fetched_data
+            and "@attributes" in fetched_data
+            and "count" in fetched_data["@attributes"]
+        ):
+            try:
+                return int(fetched_data["@attributes"]["count"])
+            except Exception:
+                return None
+        return None
+
+    def _probe_total(self, tags_query):
+        query_url = f"{self.dapi_url}&json=1&limit=1{self._credentials_query()}{tags_query}"
+        return self._reported_count(self._fetch_data(query_url))
+
+    def _fetch_page(self, tags_query, page):
+        query_url = f"{self.base_api_url}{self._credentials_query()}&pid={page}{tags_query}"
+        fetched_data = self._fetch_data(query_url, fields=self.POST_FIELDS)
+        all_fetched_posts = []
+        if fetched_data and "post" in fetched_data and isinstance(fetched_data["post"], list):
+            all_fetched_posts = fetched_data["post"]
+        return self._standardize_posts(all_fetched_posts), self._reported_count(fetched_data)
+
+    def get_posts(self, tags_query="", max_pages=10, post_id=None):
+        started = time.monotonic()
+        credentials_query = self._credentials_query()
         if post_id:
             query_url = f"{self.base_api_url}{credentials_query}&id={post_id}{tags_query}"
             fetched_data = self._fetch_data(query_url)
+            all_fetched_posts = []
             if fetched_data and "post" in fetched_data and isinstance(fetched_data["post"], list):
                 all_fetched_posts = fetched_data["post"]
-            _r.COUNT = len(all_fetched_posts)
-            print(f"[R] Found {_r.COUNT} post(s) for ID: {post_id}")
-        else:
-            page = random.randint(0, max_pages - 1)
-            query_url = f"{self.base_api_url}{credentials_query}&pid={page}{tags_query}"
-            fetched_data = self._fetch_data(query_url)
-            if fetched_data and "post" in fetched_data and isinstance(fetched_data["post"], list):
-                all_fetched_posts = fetched_data["post"]
-            if (
-                fetched_data
-                and "@attributes" in fetched_data
-                and "count" in fetched_data["@attributes"]
-            ):
-                try:
-                    _r.COUNT = int(fetched_data["@attributes"]["count"])
-                except Exception:
-                    _r.COUNT = len(all_fetched_posts)
-            else:
-                _r.COUNT = len(all_fetched_posts)
-            print(
-                f"[R] Fetched {len(all_fetched_posts)} posts from page {page}. Reported total (approx): {_r.COUNT}"
-            )
-        return [self._standardize_post(post) for post in all_fetched_posts]
+            print(f"[R] Found {len(all_fetched_posts)} post(s) for ID: {post_id}")
+            return self._result(self._standardize_posts(all_fetched_posts), started)
+        posts, total, page = self._fetch_random_page(tags_query, max_pages)
+        result = self._result(posts, started, total, page)
+        print(
+            f"[R] Fetched {len(posts)} posts from page {page}. Reported total (approx): {result.count}"
+        )
+        return result
 
 
 class GelbooruCompatible(Booru):
+    PAGE_BASE = 0
     RETRIABLE_STATUS = {429, 500, 502, 503, 504}
 
     def __init__(
         self, base_url: str, retries: int = 3, backoff: float = 1.5, log_diagnostics: bool = True
     ):
-        from scripts.ranbooru import _sanitize_gelbooru_compat_base_url
-
-        sanitized = _sanitize_gelbooru_compat_base_url(base_url)
+        sanitized = sanitize_base_url(base_url)
         if not sanitized:
             raise ValueError("Invalid Gelbooru-compatible base URL.")
         self.base_url = sanitized
@@ -94,9 +137,8 @@ class GelbooruCompatible(Booru):
         self._alias_endpoint = f"{self.base_url}/index.php?page=dapi&s=tag_alias&q=index"
         super().__init__("Gelbooru-Compatible", self._post_endpoint)
 
-    def _perform_request(self, url: str):
-        from scripts.ranbooru import BooruError
-
+    def _perform_request(self, url: str, stream: bool = False):
+        """GET ``url`` with retries; ``stream`` returns the body unread (close it)."""
         last_error: Optional[Exception] = None
         for attempt in range(1, self.retries + 1):
             try:
@@ -111,6 +153,10 @@ class GelbooruCompatible(Booru):
                     close = getattr(response, "close", None)
                     if callable(close):
                         close()
+                elif stream:
+                    return self.http._stream_bounded_response(
+                        response, url, rb_http_client.DEFAULT_API_MAX_BYTES
+                    )
                 else:
                     content = self.http._read_bounded_response(
                         response,
@@ -124,7 +170,8 @@ class GelbooruCompatible(Booru):
                         content=content,
                         encoding=getattr(response, "encoding", None),
                     )
-            time.sleep(min(self.backoff * attempt, 5.0))
+            if attempt < self.retries:
+                self._rate_limiter().backoff(url, attempt, base=self.backoff, cap=5.0)
         if last_error is None:
             error_summary = "unknown error"
         elif isinstance(last_error, BooruError):
@@ -136,20 +183,24 @@ class GelbooruCompatible(Booru):
         )
 
     def _log_retry(self, url: str, attempt: int, message: str) -> None:
-        from scripts.ranbooru import _log
-
-        _log(f"{self.booru_name}: retry {attempt} for {rb_http_client.redact_url(url)} - {message}")
+        log(f"{self.booru_name}: retry {attempt} for {rb_http_client.redact_url(url)} - {message}")
 
     def _log_snippet(self, response) -> None:
-        from scripts.ranbooru import _log
-
         if not self.log_diagnostics:
             return
-        snippet = response.text.strip().replace("\n", " ")[:200]
-        _log(
+        head = _head(response, 400).decode(response.encoding or "utf-8", errors="replace")
+        snippet = head.strip().replace("\n", " ")[:200]
+        log(
             f"{self.booru_name}: {rb_http_client.redact_url(getattr(response, 'url', ''))} -> {snippet}"
         )
 
+    @staticmethod
+    def _looks_like_html(response) -> bool:
+        ct = (response.headers.get("content-type") or "").lower()
+        head = _head(response, _SNIFF_BYTES).decode("utf-8", errors="replace")
+        head = head.lstrip()[:64].lower()
+        return "html" in ct or head.startswith("<!doctype html") or head.startswith("<html")
+
     def _parse_json_entities(self, payload, entity_key: str) -> Tuple[List[dict], Optional[int]]:
         entries: List[dict] = []
         approx = None
@@ -169,108 +220,182 @@ class GelbooruCompatible(Booru):
             entries = payload
         return entries, approx
 
-    def _parse_xml_entities(
-        self, text_payload: str, entity_key: str
-    ) -> Tuple[List[dict], Optional[int]]:
-        from scripts.ranbooru import BooruError
+    def _parse_xml_entities(self, payload, entity_key: str) -> Tuple[List[dict], Optional[int]]:
+        """Stream DAPI XML with iterparse, keeping only each entity's fields.
 
-        probe = (text_payload or "").lower()
-        if ("<posts" not in probe) and ("<post " not in probe):
-            raise BooruError(f"{self.booru_name} response does not look like DAPI XML.")
+        ``payload`` is bytes, text or a readable stream such as a streamed response
+        body, which is then parsed as it arrives. Entities are read from the root's
+        direct children (attributes, plus child elements on sites that nest fields)
+        and dropped from the tree as soon as they are consumed, so large tag and
+        tag_alias pages parse in bounded memory.
+        """
+        if hasattr(payload, "read"):
+            source = payload
+        else:
+            data = payload.encode("utf-8") if isinstance(payload, str) else bytes(payload or b"")
+            source = io.BytesIO(data)
+        roots = (_XML_ROOTS.get(entity_key, f"{entity_key}s"), entity_key)
+        entries: List[dict] = []
+        root: Optional[ET.Element] = None
+        approx = None
+        depth = 0
         try:
-            root = ET.fromstring(text_payload)
+            for event, element in ET.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if root is None:
+                        root = element
+                        # The listing root (posts, tags, tag_aliases) or a lone entity.
+                        if _local_name(element.tag) not in roots:
+                            raise BooruError(
+                                f"{self.booru_name} response does not look like DAPI XML."
+                            )
+                        count_attr = element.attrib.get("count")
+                        if count_attr is not None:
+                            try:
+                                approx = int(count_attr)
+                            except (TypeError, ValueError):
+                                approx = None
+                    continue
+                depth -= 1
+                if depth == 1 and root is not None and _local_name(element.tag) == entity_key:
+                    entries.append(self._xml_entity(element))
+                    root.remove(element)
         except ET.ParseError as exc:
             raise BooruError(f"Failed to parse XML from {self.booru_name}: {exc}") from exc
-        entries = [element.attrib for element in root.findall(entity_key)]
-        if not entries and root.tag == entity_key:
-            entries = [root.attrib]
-        approx = None
-        count_attr = root.attrib.get("count") if hasattr(root, "attrib") else None
-        if count_attr is not None:
-            try:
-                approx = int(count_attr)
-            except (TypeError, ValueError):
-                approx = None
-        if approx is None:
-            approx = len(entries)
+        if root is None:
+            raise BooruError(f"{self.booru_name} returned an empty DAPI response.")
+        if not entries and _local_name(root.tag) == entity_key:
+            entries = [self._xml_entity(root)]
         return entries, approx
 
-    def _request_dapi(self, url_base: str, entity_key: str) -> Tuple[List[dict], int]:
-        from scripts.ranbooru import BooruError
+    @staticmethod
+    def _xml_entity(element) -> dict:
+        entry = dict(element.attrib)
+        for child in element:
+            entry.setdefault(child.tag, child.text or "")
+        return entry
 
-        json_url = f"{url_base}&json=1"
+    def _request_json_dapi(self, url_base: str):
+        """Return the parsed JSON payload, or None when the site can't serve JSON."""
+        response = self._perform_request(f"{url_base}&json=1")
+        self._log_snippet(response)
+        if self._looks_like_html(response):
+            log(
+                f"{self.booru_name} returned HTML for JSON request. The site may be blocking "
+                "API access or the base URL is not DAPI-compatible."
+            )
+            return None
+        try:
+            payload = response.json()
+        except ValueError:
+            return None
+        return payload if isinstance(payload, (dict, list)) else None
+
+    def _request_dapi(self, url_base: str, entity_key: str) -> Tuple[List[dict], Optional[int]]:
+        """Fetch DAPI entities; the count is ``None`` unless the site reported one."""
+        remembered = _remembered_format(self.base_url)
+        json_unsupported = False
+        if remembered != "xml":
+            try:
+                payload = self._request_json_dapi(url_base)
+            except BooruError:
+                # Transport failure: fall back to XML once without changing the memory.
+                payload = None
+            else:
+                json_unsupported = payload is None
+            if payload is not None:
+                entries, approx = self._parse_json_entities(payload, entity_key)
+                # An empty JSON page on a site not yet known to speak JSON is
+                # double-checked over XML, as before.
+                if entries or remembered == "json":
+                    _remember_format(self.base_url, "json")
+                    return entries, approx
+
+        response = self._perform_request(url_base, stream=True)
         try:
-            response = self._perform_request(json_url)
             self._log_snippet(response)
-            ct = (response.headers.get("content-type") or "").lower()
-            text_head = (response.text or "").lstrip()[:64].lower()
-            if (
-                "html" in ct
-                or text_head.startswith("<!doctype html")
-                or text_head.startswith("<html")
-            ):
+            if self._looks_like_html(response):
                 raise BooruError(
-                    f"{self.booru_name} returned HTML for JSON request. The site may be blocking API access or the base URL is not DAPI-compatible."
+                    f"{self.booru_name} returned HTML. Expected DAPI XML/JSON. Verify the base URL (e.g., https://realbooru.com) or that the site allows API access."
                 )
-            payload = response.json()
-            entries, approx = self._parse_json_entities(payload, entity_key)
-            if entries:
-                return entries, approx or len(entries)
-        except (ValueError, BooruError):
-            pass
-
-        response = self._perform_request(url_base)
-        self._log_snippet(response)
-        ct2 = (response.headers.get("content-type") or "").lower()
-        text2 = response.text or ""
-        text2_head = text2.lstrip()[:64].lower()
-        if (
-            "html" in ct2
-            or text2_head.startswith("<!doctype html")
-            or text2_head.startswith("<html")
-        ):
-            raise BooruError(
-                f"{self.booru_name} returned HTML. Expected DAPI XML/JSON. Verify the base URL (e.g., https://realbooru.com) or that the site allows API access."
+            body = getattr(response, "body", None)
+            entries, approx = self._parse_xml_entities(
+                body if body is not None else response.content, entity_key
             )
-        entries, approx = self._parse_xml_entities(text2, entity_key)
-        return entries, approx or 0
+        except BooruError:
+            if remembered == "xml":
+                # Let the next request probe JSON again in case the site changed.
+                _remember_format(self.base_url, None)
+            raise
+        finally:
+            close = getattr(response, "close", None)
+            if callable(close):
+                close()
+        if json_unsupported:
+            _remember_format(self.base_url, "xml")
+        return entries, approx
 
-    def get_posts(self, tags_query: str = "", max_pages: int = 10, post_id: Optional[int] = None):
-        import scripts.ranbooru as _r
-        from scripts.ranbooru import POST_AMOUNT
+    def _standardize_post(self, post_data):
+        normalized = super()._standardize_post(post_data)
+        normalized["source_base_url"] = self.base_url
+        return normalized
+
+    def _probe_total(self, tags_query):
+        response = self._perform_request(f"{self._post_endpoint}&limit=0{tags_query}")
+        return self._xml_total(response.text)
+
+    def _fetch_page(self, tags_query, page):
+        query_base = f"{self._post_endpoint}&limit={POST_AMOUNT}&pid={page}{tags_query}"
+        posts, approx = self._request_dapi(query_base, "post")
+        return self._standardize_posts(posts), approx
 
-        _r.COUNT = 0
-        posts: List[dict] = []
+    def get_posts(self, tags_query: str = "", max_pages: int = 10, post_id: Optional[int] = None):
+        started = time.monotonic()
         if post_id:
             query_base = f"{self._post_endpoint}&limit={POST_AMOUNT}&id={post_id}{tags_query}"
             posts, approx = self._request_dapi(query_base, "post")
-            _r.COUNT = approx
             print(f"[R] Gelbooru-compatible: found {len(posts)} post(s) for ID: {post_id}")
-        else:
-            page = random.randint(0, max_pages - 1) if max_pages > 0 else 0
-            query_base = f"{self._post_endpoint}&limit={POST_AMOUNT}&pid={page}{tags_query}"
-            posts, approx = self._request_dapi(query_base, "post")
-            _r.COUNT = approx
-            print(
-                f"[R] Gelbooru-compatible: fetched {len(posts)} posts from page {page}. Reported count={approx}"
-            )
-        standardized = []
-        for post in posts:
-            normalized = self._standardize_post(post)
-            normalized["source_base_url"] = self.base_url
-            standardized.append(normalized)
-        return standardized
-
-    def get_tags(self, name_pattern: Optional[str] = None, limit: int = 100) -> List[dict]:
-        query = f"{self._tag_endpoint}&limit={limit}"
+            return self._result(self._standardize_posts(posts), started, approx)
+        standardized, approx, page = self._fetch_random_page(tags_query, max_pages)
+        print(
+            f"[R] Gelbooru-compatible: fetched {len(standardized)} posts from page {page}. Reported count={approx}"
+        )
+        return self._result(standardized, started, approx, page)
+
+    @staticmethod
+    def _listing_query(
+        name_pattern: Optional[str], page: Optional[int], after_id: Optional[int]
+    ) -> str:
+        query = ""
         if name_pattern:
             query += f"&name_pattern={quote_plus(name_pattern)}"
+        if page is not None:
+            query += f"&pid={int(page)}"
+        if after_id is not None:
+            query += f"&after_id={int(after_id)}"
+        return query
+
+    def get_tags(
+        self,
+        name_pattern: Optional[str] = None,
+        limit: int = 100,
+        page: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[dict]:
+        query = f"{self._tag_endpoint}&limit={limit}"
+        query += self._listing_query(name_pattern, page, after_id)
         tags, _ = self._request_dapi(query, "tag")
         return tags
 
-    def get_tag_aliases(self, name_pattern: Optional[str] = None, limit: int = 100) -> List[dict]:
+    def get_tag_aliases(
+        self,
+        name_pattern: Optional[str] = None,
+        limit: int = 100,
+        page: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[dict]:
         query = f"{self._alias_endpoint}&limit={limit}"
-        if name_pattern:
-            query += f"&name_pattern={quote_plus(name_pattern)}"
+        query += self._listing_query(name_pattern, page, after_id)
         aliases, _ = self._request_dapi(query, "tag_alias")
         return aliases
@@ -1,8 +1,19 @@
 from __future__ import annotations
 
+import copy
 import csv
+import functools
+import hashlib
+import itertools
 import os
-from typing import Tuple
+import re
+import unicodedata
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ranboorux import fuzzy_index as rb_fuzzy_index
+from ranboorux import tag_pipeline as rb_tag_pipeline
 
 
 def validate_catalog_csv(path: str) -> Tuple[bool, str]:
@@ -48,3 +59,650 @@ def validate_catalog_csv(path: str) -> Tuple[bool, str]:
         return False, "CSV is not valid UTF-8"
     except Exception as exc:
         return False, str(exc)
+
+
+# Bits of ``TagClassification.flags`` (the binary index stores the first three).
+FLAG_HAIR = 1
+FLAG_EYE = 2
+FLAG_TEXTUAL = 4
+FLAG_KNOWN = 8
+
+# One classified tag: canonical name, category, count, flags.
+_Classified = Tuple[str, Optional[int], int, int]
+# One parsed catalog row: name, category, count, aliases.
+_Row = Tuple[str, int, int, Tuple[str, ...]]
+
+
+@dataclass
+class TagClassification:
+    """Struct-of-arrays result of ``TagCatalogProvider.classify``.
+
+    Entry ``i`` of every field describes ``tags[i]``: its canonical name, catalog
+    category (``None`` when unknown), usage count and ``FLAG_*`` bits.
+    """
+
+    tags: List[str] = field(default_factory=list)
+    canonical: List[str] = field(default_factory=list)
+    category: List[Optional[int]] = field(default_factory=list)
+    count: array = field(default_factory=lambda: array("q"))
+    flags: array = field(default_factory=lambda: array("B"))
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def _append(self, tag: str, row: _Classified) -> None:
+        self.tags.append(tag)
+        self.canonical.append(row[0])
+        self.category.append(row[1])
+        self.count.append(row[2])
+        self.flags.append(row[3])
+
+    def flagged(self, index: int, flag: int) -> bool:
+        return bool(self.flags[index] & flag)
+
+
+class TagCatalogProvider:
+    """Interface for optional tag catalog backends."""
+
+    def enabled(self) -> bool:
+        return False
+
+    def resolve_alias(self, tag: str) -> str:
+        return tag if isinstance(tag, str) else ""
+
+    def category(self, tag: str) -> Optional[int]:
+        return None
+
+    def is_textual(self, tag: str) -> bool:
+        return False
+
+    def is_hair(self, tag: str) -> bool:
+        return False
+
+    def is_eye(self, tag: str) -> bool:
+        return False
+
+    def canonical(self, tag: str) -> str:
+        return self.resolve_alias(tag)
+
+    def has(self, tag: str) -> bool:
+        return False
+
+    def count(self, tag: str) -> int:
+        return 0
+
+    def suggestions(
+        self, tag: str, limit: int = 3, cutoff: float = 0.6, exact: bool = False
+    ) -> List[str]:
+        """Known names close to ``tag``; ``exact`` matches difflib at a much higher cost."""
+        return []
+
+    def _classify_one(self, tag: str) -> _Classified:
+        flags = 0
+        if self.has(tag):
+            flags |= FLAG_KNOWN
+        if self.is_hair(tag):
+            flags |= FLAG_HAIR
+        if self.is_eye(tag):
+            flags |= FLAG_EYE
+        if self.is_textual(tag):
+            flags |= FLAG_TEXTUAL
+        return self.resolve_alias(tag), self.category(tag), self.count(tag), flags
+
+    def classify(self, tags: Sequence[str]) -> TagClassification:
+        """Answer ``canonical``/``category``/``count`` and the flag checks for all ``tags``.
+
+        Each distinct tag is resolved once, so a whole post costs one pass instead
+        of a resolve per question per tag.
+        """
+        result = TagClassification()
+        rows: Dict[str, _Classified] = {}
+        for tag in tags:
+            key = tag if isinstance(tag, str) else ""
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = self._classify_one(key)
+            result._append(key, row)
+        return result
+
+
+class NoopCatalog(TagCatalogProvider):
+    pass
+
+
+class ClassifiedCatalog(TagCatalogProvider):
+    """Per-tag view of one ``classify`` call, falling back to the catalog for other tags."""
+
+    def __init__(self, catalog: TagCatalogProvider, tags: Sequence[str]):
+        self._catalog = catalog
+        self._result = catalog.classify(tags)
+        self._index = {tag: idx for idx, tag in enumerate(self._result.tags)}
+
+    def enabled(self) -> bool:
+        return self._catalog.enabled()
+
+    def resolve_alias(self, tag: str) -> str:
+        idx = self._index.get(tag)
+        return self._catalog.resolve_alias(tag) if idx is None else self._result.canonical[idx]
+
+    def category(self, tag: str) -> Optional[int]:
+        idx = self._index.get(tag)
+        return self._catalog.category(tag) if idx is None else self._result.category[idx]
+
+    def count(self, tag: str) -> int:
+        idx = self._index.get(tag)
+        return self._catalog.count(tag) if idx is None else int(self._result.count[idx])
+
+    def _flag(self, tag: str, flag: int) -> Optional[bool]:
+        idx = self._index.get(tag)
+        return None if idx is None else self._result.flagged(idx, flag)
+
+    def is_textual(self, tag: str) -> bool:
+        flagged = self._flag(tag, FLAG_TEXTUAL)
+        return self._catalog.is_textual(tag) if flagged is None else flagged
+
+    def is_hair(self, tag: str) -> bool:
+        flagged = self._flag(tag, FLAG_HAIR)
+        return self._catalog.is_hair(tag) if flagged is None else flagged
+
+    def is_eye(self, tag: str) -> bool:
+        flagged = self._flag(tag, FLAG_EYE)
+        return self._catalog.is_eye(tag) if flagged is None else flagged
+
+    def has(self, tag: str) -> bool:
+        flagged = self._flag(tag, FLAG_KNOWN)
+        return self._catalog.has(tag) if flagged is None else flagged
+
+    def suggestions(
+        self, tag: str, limit: int = 3, cutoff: float = 0.6, exact: bool = False
+    ) -> List[str]:
+        return self._catalog.suggestions(tag, limit, cutoff, exact)
+
+
+def classified(
+    catalog: Optional[rb_tag_pipeline.CatalogResolver], tags: Sequence[str]
+) -> Optional[rb_tag_pipeline.CatalogResolver]:
+    """Wrap ``catalog`` so lookups of ``tags`` come from a single ``classify`` pass.
+
+    Catalog-like objects without ``classify`` are returned unchanged.
+    """
+    if not isinstance(catalog, TagCatalogProvider) or isinstance(catalog, ClassifiedCatalog):
+        return catalog
+    return ClassifiedCatalog(catalog, tags)
+
+
+class _CatalogRules:
+    """Name normalisation and textual/hair/eye rules shared by the catalog backends."""
+
+    _TEXTUAL_SEED: Set[str] = {
+        "text",
+        "english_text",
+        "japanese_text",
+        "chinese_text",
+        "korean_text",
+        "translated",
+        "translation",
+        "commentary",
+        "artist_commentary",
+        "author_commentary",
+        "publisher_commentary",
+        "speech_bubble",
+        "speech_bubbles",
+        "dialogue",
+        "dialog",
+        "subtitle",
+        "subtitles",
+        "caption",
+        "captions",
+        "watermark",
+        "logo",
+        "signature",
+        "url",
+        "filename",
+        "thought_bubble",
+        "thought_balloon",
+        "notice",
+    }
+    _TEXTUAL_KEYWORDS: Tuple[str, ...] = (
+        "text",
+        "commentary",
+        "speech_bubble",
+        "thought_bubble",
+        "watermark",
+        "logo",
+        "subtitle",
+        "caption",
+        "dialog",
+        "dialogue",
+        "filename",
+        "url",
+        "signature",
+        "credit",
+    )
+    _TEXTUAL_PREFIXES: Tuple[str, ...] = (
+        "translated_",
+        "translation_",
+        "english_",
+        "japanese_",
+        "korean_",
+        "chinese_",
+    )
+    _TEXTUAL_SUFFIXES: Tuple[str, ...] = (
+        "_text",
+        "_commentary",
+        "_logo",
+        "_watermark",
+        "_subtitle",
+        "_caption",
+        "_speech",
+        "_bubble",
+    )
+    _HAIR_SUFFIXES: Tuple[str, ...] = ("_hair",)
+    _EYE_SUFFIXES: Tuple[str, ...] = ("_eyes", "_eye")
+
+    @staticmethod
+    def _normalize_name(value: str) -> str:
+        if not isinstance(value, str):
+            return ""
+        cleaned = unicodedata.normalize("NFKC", value).strip().lower()
+        if not cleaned:
+            return ""
+        cleaned = cleaned.replace("-", "_").replace(" ", "_")
+        cleaned = re.sub(r"_+", "_", cleaned)
+        return cleaned
+
+    @staticmethod
+    def _lookup_key(value: str) -> str:
+        """``_normalize_name`` for lookups, memoised: prompts repeat the same tags."""
+        return _normalize_lookup(value) if isinstance(value, str) else ""
+
+    def _looks_textual(self, tag: str) -> bool:
+        if not tag:
+            return False
+        if tag in self._TEXTUAL_SEED:
+            return True
+        if _TEXTUAL_KEYWORD_RE.search(tag):
+            return True
+        if tag.startswith(self._TEXTUAL_PREFIXES):
+            return True
+        if tag.endswith(self._TEXTUAL_SUFFIXES):
+            return True
+        return False
+
+
+_TEXTUAL_KEYWORD_RE = re.compile("|".join(map(re.escape, _CatalogRules._TEXTUAL_KEYWORDS)))
+# Loading a catalog normalises every row once; only lookups go through the cache.
+_normalize_lookup = functools.lru_cache(maxsize=16384)(_CatalogRules._normalize_name)
+
+
+def row_key(header: Sequence[str], row: Sequence[str]) -> bytes:
+    """Stable digest of a raw CSV row and the header that gives its columns meaning."""
+    raw = "\x1f".join([*header, "\x1e", *row]).encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(raw, digest_size=8).digest()
+
+
+class CsvCatalog(_CatalogRules, TagCatalogProvider):
+    def __init__(self, path: str, row_cache: Optional[Dict[bytes, Optional[_Row]]] = None):
+        self._path = path
+        self._mtime = 0.0
+        self._aliases: Dict[str, str] = {}
+        self._cats: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {}
+        self._textual: Set[str] = set(self._TEXTUAL_SEED)
+        self._hair: Set[str] = set()
+        self._eyes: Set[str] = set()
+        self._all_tags: Set[str] = set()
+        # Parsed rows keyed by ``row_key`` of their raw cells, so a reload only
+        # re-parses the rows that changed. A compiled index stores the same map.
+        self._row_cache: Dict[bytes, Optional[_Row]] = dict(row_cache or {})
+        self.last_reload: Dict[str, int] = {}
+        # Trigram index for suggestions, built on first use after each load.
+        self._fuzzy: Optional[rb_fuzzy_index.TrigramIndex] = None
+        self._load()
+
+    def _parse_row(
+        self, row: List[str], columns: Optional[Dict[str, int]] = None
+    ) -> Optional[_Row]:
+        def _safe_get(idx: Optional[int]) -> str:
+            if idx is None:
+                return ""
+            if idx < 0 or idx >= len(row):
+                return ""
+            return row[idx]
+
+        if columns:
+            raw_name = _safe_get(columns.get("tag"))
+            if not raw_name:
+                raw_name = _safe_get(columns.get("name"))
+            cat_val = _safe_get(columns.get("category"))
+            count_val = _safe_get(columns.get("count"))
+            alias_field = _safe_get(columns.get("alias"))
+            if not alias_field:
+                alias_field = _safe_get(columns.get("aliases"))
+        else:
+            raw_name = row[0] if len(row) > 0 else ""
+            cat_val = row[1] if len(row) > 1 else ""
+            count_val = row[2] if len(row) > 2 else ""
+            alias_field = row[3] if len(row) > 3 else ""
+
+        name = self._normalize_name(raw_name)
+        if not name:
+            return None
+        try:
+            category = int(cat_val) if cat_val is not None and str(cat_val).strip() != "" else 0
+        except Exception:
+            category = 0
+        try:
+            count = int(count_val) if count_val is not None and str(count_val).strip() != "" else 0
+        except Exception:
+            count = 0
+        aliases: List[str] = []
+        if alias_field:
+            for alias_candidate in re.split(r"[\s,]+", alias_field):
+                alias_name = self._normalize_name(alias_candidate)
+                if not alias_name or alias_name == name:
+                    continue
+                aliases.append(alias_name)
+        return name, category, count, tuple(aliases)
+
+    def _read_rows(self) -> List[_Row]:
+        with open(self._path, newline="", encoding="utf-8") as handle:
+            reader = csv.reader(handle)
+            first_row = next(reader, None)
+            if first_row is None:
+                raise ValueError("CSV file is empty")
+            header_map: Optional[Dict[str, int]] = None
+            header: List[str] = []
+            lowered = [str(cell or "").strip().lower() for cell in first_row]
+            body: Iterable[List[str]] = reader
+            if len(lowered) >= 3 and lowered[0] in ("tag", "name") and lowered[1] == "category":
+                header_map = {name: idx for idx, name in enumerate(lowered)}
+                header = lowered
+            else:
+                body = itertools.chain([first_row], reader)
+            cache = self._row_cache
+            fresh: Dict[bytes, Optional[_Row]] = {}
+            rows: List[_Row] = []
+            parsed = 0
+            for row in body:
+                key = row_key(header, row)
+                if key in cache:
+                    entry = cache[key]
+                else:
+                    entry = self._parse_row(row, header_map)
+                    parsed += 1
+                fresh[key] = entry
+                if entry is not None:
+                    rows.append(entry)
+        self._row_cache = fresh
+        self.last_reload = {"rows": len(rows), "parsed": parsed}
+        return rows
+
+    def _apply_rows(self, rows: List[_Row]) -> int:
+        """Patch the lookup tables in place to match ``rows``; returns the tags changed."""
+        cats: Dict[str, int] = {}
+        counts: Dict[str, int] = {}
+        aliases: Dict[str, str] = {}
+        for name, category, count, alias_names in rows:
+            cats[name] = category
+            counts[name] = count
+            for alias_name in alias_names:
+                aliases[alias_name] = name
+
+        removed = self._cats.keys() - cats.keys()
+        changed = {name for name, _category in cats.items() - self._cats.items()}
+        changed.update(name for name, _count in counts.items() - self._counts.items())
+        for name in removed:
+            del self._cats[name]
+            self._counts.pop(name, None)
+            self._all_tags.discard(name)
+            if name not in self._TEXTUAL_SEED:
+                self._textual.discard(name)
+        added = cats.keys() - self._all_tags
+        self._all_tags.update(added)
+        self._textual.update(name for name in added if self._looks_textual(name))
+        self._cats.update(cats)
+        self._counts.update(counts)
+        for alias_name in self._aliases.keys() - aliases.keys():
+            del self._aliases[alias_name]
+        self._aliases.update(aliases)
+
+        hair = {n for n, c in cats.items() if c == 0 and n.endswith(self._HAIR_SUFFIXES)}
+        eyes = {n for n, c in cats.items() if c == 0 and n.endswith(self._EYE_SUFFIXES)}
+        # Include alias forms for hair/eye lookup convenience
+        for alias_name, target in aliases.items():
+            if target in hair:
+                hair.add(alias_name)
+            if target in eyes:
+                eyes.add(alias_name)
+        for current, wanted in ((self._hair, hair), (self._eyes, eyes)):
+            current.intersection_update(wanted)
+            current.update(wanted)
+        return len(changed) + len(removed)
+
+    def _load(self) -> None:
+        if not os.path.isfile(self._path):
+            raise FileNotFoundError(self._path)
+        self._mtime = os.path.getmtime(self._path)
+        changed = self._apply_rows(self._read_rows())
+        self.last_reload["changed"] = changed
+        if changed:
+            self._fuzzy = None
+
+    def maybe_reload(self) -> None:
+        """Follow edits to the file, re-parsing only rows that changed since the last load."""
+        try:
+            current = os.path.getmtime(self._path)
+        except OSError:
+            return
+        if current != self._mtime:
+            self._load()
+
+    def reloaded(self) -> CsvCatalog:
+        """A new catalog for the file's current contents, leaving this one untouched.
+
+        Shared catalogs must not change under their readers; this copies the
+        tables and applies the same incremental reload to the copy.
+        """
+        clone = copy.copy(self)
+        clone._aliases = dict(self._aliases)
+        clone._cats = dict(self._cats)
+        clone._counts = dict(self._counts)
+        clone._textual = set(self._textual)
+        clone._hair = set(self._hair)
+        clone._eyes = set(self._eyes)
+        clone._all_tags = set(self._all_tags)
+        clone.last_reload = {}
+        clone._load()
+        return clone
+
+    def enabled(self) -> bool:
+        return True
+
+    def resolve_alias(self, tag: str) -> str:
+        normalized = self._lookup_key(tag)
+        if not normalized:
+            return ""
+        return self._aliases.get(normalized, normalized)
+
+    def category(self, tag: str) -> Optional[int]:
+        canonical = self.resolve_alias(tag)
+        return self._cats.get(canonical)
+
+    def count(self, tag: str) -> int:
+        return self._counts.get(self.resolve_alias(tag), 0)
+
+    def is_textual(self, tag: str) -> bool:
+        canonical = self.resolve_alias(tag)
+        return canonical in self._textual or self._looks_textual(canonical)
+
+    def is_hair(self, tag: str) -> bool:
+        canonical = self.resolve_alias(tag)
+        return canonical in self._hair
+
+    def is_eye(self, tag: str) -> bool:
+        canonical = self.resolve_alias(tag)
+        return canonical in self._eyes
+
+    def canonical(self, tag: str) -> str:
+        return self.resolve_alias(tag)
+
+    def has(self, tag: str) -> bool:
+        canonical = self.resolve_alias(tag)
+        return canonical in self._cats
+
+    def _classify_one(self, tag: str) -> _Classified:
+        canonical = self.resolve_alias(tag)
+        category = self._cats.get(canonical)
+        flags = 0 if category is None else FLAG_KNOWN
+        if canonical in self._hair:
+            flags |= FLAG_HAIR
+        if canonical in self._eyes:
+            flags |= FLAG_EYE
+        if canonical in self._textual or self._looks_textual(canonical):
+            flags |= FLAG_TEXTUAL
+        return canonical, category, self._counts.get(canonical, 0), flags
+
+    def _fuzzy_index(self) -> rb_fuzzy_index.TrigramIndex:
+        index = self._fuzzy
+        if index is None:
+            index = self._fuzzy = rb_fuzzy_index.build_index(self._all_tags, self._counts)
+        return index
+
+    def suggestions(
+        self, tag: str, limit: int = 3, cutoff: float = 0.6, exact: bool = False
+    ) -> List[str]:
+        if limit <= 0 or not self._all_tags:
+            return []
+        normalized = self._normalize_name(tag)
+        if not normalized:
+            return []
+        return self._fuzzy_index().search(normalized, limit, cutoff, exact)
+
+    def tag_count(self) -> int:
+        return len(self._all_tags)
+
+    def alias_count(self) -> int:
+        return len(self._aliases)
+
+
+# Subject tags in catalog (underscore) form; one is kept even if every other tag drops.
+SUBJECT_ANCHORS = frozenset(s.replace(" ", "_") for s in rb_tag_pipeline._SUBJECT_TAGS)
+
+
+def apply_catalog(
+    tags: Iterable[str],
+    catalog: Optional[TagCatalogProvider],
+    *,
+    keep_hair_eye: bool,
+    drop_series: bool,
+    drop_characters: bool,
+    drop_textual: bool,
+    suggestion_limit: int = 3,
+    subject_anchors: Optional[Iterable[str]] = None,
+) -> Tuple[List[str], Dict[str, object]]:
+    """Canonicalise ``tags`` through ``catalog`` and drop the categories asked for.
+
+    Returns the kept tags and a diagnostics dict (kept, dropped, normalized and
+    unknown entries). Without a catalog the tags pass through unchanged.
+    """
+    diag: Dict[str, object] = {
+        "mode": "catalog",
+        "rules": {
+            "drop_series": bool(drop_series),
+            "drop_characters": bool(drop_characters),
+            "drop_textual": bool(drop_textual),
+            "keep_hair_eye": bool(keep_hair_eye),
+        },
+        "kept": [],
+        "dropped": [],
+        "normalized": [],
+        "unknown": [],
+    }
+    if not catalog:
+        return list(tags), diag
+    anchors = SUBJECT_ANCHORS if subject_anchors is None else frozenset(subject_anchors)
+
+    kept: List[str] = []
+    seen: Set[str] = set()
+    normalized_records: List[Dict[str, str]] = []
+    dropped_records: List[Dict[str, str]] = []
+    unknown_records: List[Dict[str, object]] = []
+    preserved_hair_eye: Set[str] = set()
+    original_subjects: List[str] = []
+
+    entries: List[Tuple[bool, str]] = []
+    for raw in tags:
+        tag = (raw or "").strip()
+        if not tag:
+            continue
+        negated = tag.startswith("-")
+        base = tag[1:] if negated else tag
+        base_compact = re.sub(r"\s+", "_", base.strip().lower())
+        base_compact = re.sub(r"_+", "_", base_compact)
+        if base_compact:
+            entries.append((negated, base_compact))
+    result = catalog.classify([base_compact for _negated, base_compact in entries])
+
+    for idx, (negated, base_compact) in enumerate(entries):
+        if ":" in base_compact:
+            canonical = base_compact
+        else:
+            canonical = result.canonical[idx] or base_compact
+            if canonical != base_compact:
+                normalized_records.append({"from": base_compact, "to": canonical})
+        final_tag = f"-{canonical}" if negated else canonical
+        if final_tag in seen:
+            continue
+        seen.add(final_tag)
+
+        category = result.category[idx]
+        is_hair = result.flagged(idx, FLAG_HAIR)
+        is_eye = result.flagged(idx, FLAG_EYE)
+        if canonical in anchors:
+            original_subjects.append(canonical)
+
+        reason: Optional[str] = None
+        if drop_series and category == 3:
+            reason = "series"
+        elif drop_characters and category == 4:
+            reason = "character"
+        elif drop_textual and result.flagged(idx, FLAG_TEXTUAL):
+            reason = "textual"
+
+        if reason and not (keep_hair_eye and (is_hair or is_eye)):
+            dropped_records.append({"tag": final_tag, "reason": reason})
+            continue
+
+        if keep_hair_eye and (is_hair or is_eye):
+            preserved_hair_eye.add(final_tag)
+
+        if not result.flagged(idx, FLAG_KNOWN) and ":" not in canonical:
+            suggestions = catalog.suggestions(canonical, suggestion_limit)
+            unknown_records.append({"tag": canonical, "suggestions": suggestions})
+
+        kept.append(final_tag)
+
+    if original_subjects and not any(t.lstrip("-") in anchors for t in kept):
+        kept.append(original_subjects[0])
+
+    diag["kept"] = kept
+    diag["dropped"] = dropped_records
+    diag["normalized"] = normalized_records
+    diag["unknown"] = unknown_records
+    if preserved_hair_eye:
+        diag["preserved"] = sorted(preserved_hair_eye)
+    return kept, diag
+
+
+def load_catalog(path: str) -> Tuple[TagCatalogProvider, str]:
+    """Validate and load a shared CSV catalog; falls back to ``NoopCatalog`` with the reason."""
+    from ranboorux import catalog_registry as rb_catalog_registry
+
+    valid, message = validate_catalog_csv(path)
+    if not valid:
+        return NoopCatalog(), message
+    try:
+        return rb_catalog_registry.CATALOGS.acquire(path), "Catalog loaded"
+    except Exception as exc:
+        return NoopCatalog(), str(exc)
@@ -0,0 +1,452 @@
+"""Precompiled binary tag catalog, looked up through a memory-mapped file.
+
+``python -m ranboorux.catalog_index data/catalogs/danbooru_tags.csv``
+
+A CSV catalog is parsed once by ``CsvCatalog`` and written next to it as
+``<csv>.rbxcat``: a sorted string table plus fixed-size records for tags
+(category, count, hair/eye/textual flags) and aliases (index of the canonical
+tag). Opening the index is an ``mmap`` plus a header read, lookups are binary
+searches over the mapped records, and every process that maps the file shares
+the same page-cache pages. The header stores the source CSV's mtime and size,
+so an edited CSV is recompiled on the next open or ``maybe_reload``. The index
+also keeps every parsed CSV row under its ``row_key``, so recompiling an edited
+file only re-parses the rows that changed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ranboorux import fuzzy_index as rb_fuzzy_index
+from ranboorux.catalog import (
+    FLAG_EYE,
+    FLAG_HAIR,
+    FLAG_KNOWN,
+    FLAG_TEXTUAL,
+    CsvCatalog,
+    TagCatalogProvider,
+    _CatalogRules,
+    _Classified,
+    _Row,
+)
+
+INDEX_SUFFIX = ".rbxcat"
+MAGIC = b"RBXCAT\x00\x01"
+VERSION = 2
+# magic, version, source mtime_ns, source size, tag count, alias count, row count,
+# then the byte offsets of the tag records, alias records, string table, row
+# records and row alias references.
+_HEADER = struct.Struct("<8sIqqIIIQQQQQ")
+# string offset, string length, category, count, flags
+_TAG_RECORD = struct.Struct("<IHhIB")
+# string offset, string length, tag record index
+_ALIAS_RECORD = struct.Struct("<IHI")
+# row key, name offset, name length (0 for skipped rows), category, count, first
+# row alias reference, row alias count
+_ROW_RECORD = struct.Struct("<8sIHhqIH")
+# string offset, string length
+_STRING_REF = struct.Struct("<IH")
+_MAX_COUNT = 2**32 - 1
+
+
+def index_path_for(csv_path: str) -> str:
+    return f"{csv_path}{INDEX_SUFFIX}"
+
+
+def _source_signature(csv_path: str) -> Tuple[int, int]:
+    stat = os.stat(csv_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def compile_catalog(
+    csv_path: str, index_path: Optional[str] = None, source: Optional[CsvCatalog] = None
+) -> str:
+    """Compile ``csv_path`` into a binary index; returns the index path.
+
+    ``source`` is an already loaded catalog of the current file (see
+    ``BinaryCatalog.reloaded``); without one the CSV is parsed here. The file is
+    written under a temporary name and moved into place, so readers never map a
+    half-written index.
+    """
+    index_path = index_path or index_path_for(csv_path)
+    signature = _source_signature(csv_path)
+    if source is None:
+        source = CsvCatalog(csv_path)
+
+    # UTF-8 preserves code point order, so sorting the strings sorts their bytes.
+    names = sorted(source._cats)
+    position = {name: idx for idx, name in enumerate(names)}
+    aliases = sorted(
+        (alias, target) for alias, target in source._aliases.items() if target in position
+    )
+
+    strings = bytearray()
+    refs: Dict[str, Tuple[int, int]] = {}
+
+    def add_strings(values: Sequence[str]) -> List[Tuple[int, int]]:
+        encoded = [value.encode("utf-8")[:0xFFFF] for value in values]
+        lengths = list(map(len, encoded))
+        spans = list(zip(itertools.accumulate(lengths, initial=len(strings)), lengths))
+        refs.update(zip(values, spans))
+        strings.extend(b"".join(encoded))
+        return spans
+
+    def string_ref(value: str) -> Tuple[int, int]:
+        return refs.get(value) or add_strings([value])[0]
+
+    hair, eyes, textual = source._hair, source._eyes, source._textual
+    cats, counts = source._cats, source._counts
+    tag_records = b"".join(
+        _TAG_RECORD.pack(
+            offset,
+            length,
+            max(-0x8000, min(0x7FFF, cats[name])),
+            max(0, min(_MAX_COUNT, counts.get(name, 0))),
+            (FLAG_HAIR if name in hair else 0)
+            | (FLAG_EYE if name in eyes else 0)
+            | (FLAG_TEXTUAL if name in textual else 0),
+        )
+        for name, (offset, length) in zip(names, add_strings(names))
+    )
+    alias_records = b"".join(
+        _ALIAS_RECORD.pack(offset, length, position[target])
+        for (_alias, target), (offset, length) in zip(
+            aliases, add_strings([alias for alias, _target in aliases])
+        )
+    )
+    row_records = bytearray()
+    row_aliases = bytearray()
+    pack_row, pack_ref = _ROW_RECORD.pack, _STRING_REF.pack
+    alias_refs = 0
+    for key, row in source._row_cache.items():
+        if row is None:
+            row_records += pack_row(key, 0, 0, 0, 0, 0, 0)
+            continue
+        name, category, count, row_alias_names = row
+        offset, length = string_ref(name)
+        category = max(-0x8000, min(0x7FFF, category))
+        row_records += pack_row(
+            key, offset, length, category, count, alias_refs, len(row_alias_names)
+        )
+        for alias in row_alias_names:
+            row_aliases += pack_ref(*string_ref(alias))
+        alias_refs += len(row_alias_names)
+
+    tags_offset = _HEADER.size
+    aliases_offset = tags_offset + len(tag_records)
+    strings_offset = aliases_offset + len(alias_records)
+    rows_offset = strings_offset + len(strings)
+    row_aliases_offset = rows_offset + len(row_records)
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        signature[0],
+        signature[1],
+        len(names),
+        len(aliases),
+        len(source._row_cache),
+        tags_offset,
+        aliases_offset,
+        strings_offset,
+        rows_offset,
+        row_aliases_offset,
+    )
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as handle:
+            handle.write(header)
+            handle.write(tag_records)
+            handle.write(alias_records)
+            handle.write(strings)
+            handle.write(row_records)
+            handle.write(row_aliases)
+        os.replace(temp_path, index_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return index_path
+
+
+def _read_header(index_path: str) -> Optional[tuple]:
+    try:
+        with open(index_path, "rb") as handle:
+            raw = handle.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(raw) != _HEADER.size:
+        return None
+    header = _HEADER.unpack(raw)
+    if header[0] != MAGIC or header[1] != VERSION:
+        return None
+    return header
+
+
+def index_is_current(csv_path: str, index_path: Optional[str] = None) -> bool:
+    header = _read_header(index_path or index_path_for(csv_path))
+    if header is None:
+        return False
+    try:
+        return (header[2], header[3]) == _source_signature(csv_path)
+    except OSError:
+        return False
+
+
+class BinaryCatalog(_CatalogRules, TagCatalogProvider):
+    """Read-only catalog over a compiled index; answers like ``CsvCatalog``."""
+
+    def __init__(self, csv_path: str, index_path: Optional[str] = None):
+        self._path = csv_path
+        self._index_path = index_path or index_path_for(csv_path)
+        self.last_reload: Dict[str, int] = {}
+        self._source: Optional[CsvCatalog] = None
+        self._fuzzy: Optional[rb_fuzzy_index.TrigramIndex] = None
+        self._open()
+
+    def _open(self) -> None:
+        header = _read_header(self._index_path)
+        if header is None:
+            raise ValueError(f"Not a RanbooruX catalog index: {self._index_path}")
+        with open(self._index_path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.close()
+        self._map = mapped
+        (
+            _magic,
+            _version,
+            mtime_ns,
+            size,
+            self._tag_total,
+            self._alias_total,
+            self._row_total,
+            self._tags_offset,
+            self._aliases_offset,
+            self._strings_offset,
+            self._rows_offset,
+            self._row_aliases_offset,
+        ) = header
+        self._signature = (mtime_ns, size)
+        self._fuzzy = None
+
+    def close(self) -> None:
+        """Unmap the index; the catalog can't answer lookups until it is reopened."""
+        mapped = getattr(self, "_map", None)
+        if mapped is not None:
+            mapped.close()
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._strings_offset + offset
+        return self._map[start : start + length]
+
+    def _search(self, key: bytes, base: int, record: struct.Struct, total: int) -> Optional[tuple]:
+        lo, hi = 0, total
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = record.unpack_from(self._map, base + mid * record.size)
+            probe = self._string(entry[0], entry[1])
+            if probe == key:
+                return entry
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _tag_at(self, index: int) -> tuple:
+        return _TAG_RECORD.unpack_from(self._map, self._tags_offset + index * _TAG_RECORD.size)
+
+    def _lookup(self, canonical: str) -> Optional[tuple]:
+        if not canonical:
+            return None
+        return self._search(
+            canonical.encode("utf-8"), self._tags_offset, _TAG_RECORD, self._tag_total
+        )
+
+    def _row_cache(self) -> Dict[bytes, Optional[_Row]]:
+        """The parsed CSV rows this index was compiled from, keyed by ``row_key``."""
+        rows: Dict[bytes, Optional[_Row]] = {}
+        if not self._row_total:
+            return rows
+        data = self._map
+        start = self._strings_offset
+        refs = [
+            data[start + offset : start + offset + length].decode("utf-8")
+            for offset, length in _STRING_REF.iter_unpack(data[self._row_aliases_offset :])
+        ]
+        end = self._rows_offset + self._row_total * _ROW_RECORD.size
+        for key, offset, length, category, count, first, total in _ROW_RECORD.iter_unpack(
+            data[self._rows_offset : end]
+        ):
+            if not length:
+                rows[key] = None
+                continue
+            name = data[start + offset : start + offset + length].decode("utf-8")
+            rows[key] = (name, category, count, tuple(refs[first : first + total]))
+        return rows
+
+    def maybe_reload(self) -> None:
+        try:
+            current = _source_signature(self._path)
+        except OSError:
+            return
+        if current == self._signature:
+            return
+        try:
+            if not index_is_current(self._path, self._index_path):
+                source = CsvCatalog(self._path, row_cache=self._row_cache())
+                # An open map keeps Windows from replacing the index file.
+                self.close()
+                try:
+                    compile_catalog(self._path, self._index_path, source=source)
+                finally:
+                    self._open()
+                self.last_reload = source.last_reload
+            else:
+                self._open()
+        except Exception as exc:
+            print(f"[R] Catalog index refresh failed, keeping the previous one: {exc}")
+
+    def reloaded(self) -> TagCatalogProvider:
+        """A catalog for the file's current contents, leaving this one untouched.
+
+        Only rows that changed since this index was compiled are re-parsed. When
+        the new index can't be written, the freshly loaded CSV catalog is used.
+        """
+        if self._source is not None:
+            source = self._source.reloaded()
+        else:
+            source = CsvCatalog(self._path, row_cache=self._row_cache())
+        try:
+            index_path = compile_catalog(self._path, self._index_path, source=source)
+            fresh = BinaryCatalog(self._path, index_path)
+        except (OSError, ValueError) as exc:
+            print(f"[R] Catalog index unavailable, using the parsed CSV instead: {exc}")
+            return source
+        fresh.last_reload = source.last_reload
+        # A file that was edited once tends to be edited again; keep the parsed
+        # tables so the next version is a patch instead of a rebuild.
+        fresh._source = source
+        return fresh
+
+    def enabled(self) -> bool:
+        return True
+
+    def resolve_alias(self, tag: str) -> str:
+        normalized = self._lookup_key(tag)
+        if not normalized:
+            return ""
+        alias = self._search(
+            normalized.encode("utf-8"), self._aliases_offset, _ALIAS_RECORD, self._alias_total
+        )
+        if alias is None:
+            return normalized
+        target = self._tag_at(alias[2])
+        return self._string(target[0], target[1]).decode("utf-8")
+
+    def category(self, tag: str) -> Optional[int]:
+        entry = self._lookup(self.resolve_alias(tag))
+        return None if entry is None else int(entry[2])
+
+    def count(self, tag: str) -> int:
+        entry = self._lookup(self.resolve_alias(tag))
+        return 0 if entry is None else int(entry[3])
+
+    def is_textual(self, tag: str) -> bool:
+        canonical = self.resolve_alias(tag)
+        entry = self._lookup(canonical)
+        if entry is not None and entry[4] & FLAG_TEXTUAL:
+            return True
+        return self._looks_textual(canonical)
+
+    def is_hair(self, tag: str) -> bool:
+        entry = self._lookup(self.resolve_alias(tag))
+        return bool(entry is not None and entry[4] & FLAG_HAIR)
+
+    def is_eye(self, tag: str) -> bool:
+        entry = self._lookup(self.resolve_alias(tag))
+        return bool(entry is not None and entry[4] & FLAG_EYE)
+
+    def canonical(self, tag: str) -> str:
+        return self.resolve_alias(tag)
+
+    def has(self, tag: str) -> bool:
+        return self._lookup(self.resolve_alias(tag)) is not None
+
+    def _classify_one(self, tag: str) -> _Classified:
+        canonical = self.resolve_alias(tag)
+        entry = self._lookup(canonical)
+        if entry is None:
+            flags = FLAG_TEXTUAL if self._looks_textual(canonical) else 0
+            return canonical, None, 0, flags
+        flags = FLAG_KNOWN | (entry[4] & (FLAG_HAIR | FLAG_EYE | FLAG_TEXTUAL))
+        if not flags & FLAG_TEXTUAL and self._looks_textual(canonical):
+            flags |= FLAG_TEXTUAL
+        return canonical, int(entry[2]), int(entry[3]), flags
+
+    def _fuzzy_index(self) -> rb_fuzzy_index.TrigramIndex:
+        index = self._fuzzy
+        if index is None:
+            names = []
+            counts = []
+            for position in range(self._tag_total):
+                entry = self._tag_at(position)
+                names.append(self._string(entry[0], entry[1]).decode("utf-8"))
+                counts.append(int(entry[3]))
+            index = self._fuzzy = rb_fuzzy_index.TrigramIndex(names, counts)
+        return index
+
+    def suggestions(
+        self, tag: str, limit: int = 3, cutoff: float = 0.6, exact: bool = False
+    ) -> List[str]:
+        if limit <= 0 or not self._tag_total:
+            return []
+        normalized = self._normalize_name(tag)
+        if not normalized:
+            return []
+        return self._fuzzy_index().search(normalized, limit, cutoff, exact)
+
+    def tag_count(self) -> int:
+        return int(self._tag_total)
+
+    def alias_count(self) -> int:
+        return int(self._alias_total)
+
+
+def open_catalog(csv_path: str) -> TagCatalogProvider:
+    """Open ``csv_path`` through its compiled index, compiling it when missing or stale.
+
+    Falls back to parsing the CSV when the index can't be written (read-only
+    install) or mapped.
+    """
+    try:
+        if not index_is_current(csv_path):
+            compile_catalog(csv_path)
+        return BinaryCatalog(csv_path)
+    except (OSError, ValueError) as exc:
+        print(f"[R] Catalog index unavailable, parsing the CSV instead: {exc}")
+        return CsvCatalog(csv_path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m ranboorux.catalog_index",
+        description="Compile a tag catalog CSV into a memory-mapped binary index.",
+    )
+    parser.add_argument("csv", help="Catalog CSV (tag,category,count,alias).")
+    parser.add_argument("-o", "--output", default=None, help="Index path (default: <csv>.rbxcat)")
+    args = parser.parse_args(argv)
+    index_path = compile_catalog(args.csv, args.output)
+    catalog = BinaryCatalog(args.csv, index_path)
+    print(
+        f"[R] Compiled {catalog.tag_count():,} tags and {catalog.alias_count():,} aliases "
+        f"into {index_path} ({os.path.getsize(index_path):,} bytes)."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
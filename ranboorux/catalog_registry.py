@@ -0,0 +1,233 @@
+"""Process-wide registry of loaded tag catalogs.
+
+The txt2img and img2img tabs each build their own ``Script``, and each used to
+load its own copy of the same catalog. ``CATALOGS`` hands every consumer the same
+read-only catalog object for a file, keyed by ``(real path, mtime_ns, size)``, and
+counts references so a version is only dropped once nobody uses it. A few
+released catalogs stay cached, so switching sources back and forth does not reload.
+With ``watch()`` running, a daemon thread stats the loaded files instead of
+every ``refresh`` call doing it.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from ranboorux.catalog import TagCatalogProvider
+
+CatalogKey = Tuple[str, int, int]
+DEFAULT_MAX_IDLE = 2
+DEFAULT_WATCH_INTERVAL = 2.0
+
+
+@dataclass
+class _Entry:
+    catalog: TagCatalogProvider
+    refs: int = 0
+
+
+def catalog_key(path: str) -> CatalogKey:
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    return real_path, stat.st_mtime_ns, stat.st_size
+
+
+class CatalogRegistry:
+    """Share one catalog instance per file version across the process.
+
+    ``acquire`` returns the shared catalog for a path (loading it on first use) and
+    ``release`` gives a reference back. Catalogs handed out here must be treated as
+    read-only; ``refresh`` swaps a caller's reference to the current file version
+    instead of reloading the shared object in place.
+    """
+
+    def __init__(
+        self,
+        opener: Optional[Callable[[str], TagCatalogProvider]] = None,
+        max_idle: int = DEFAULT_MAX_IDLE,
+    ):
+        self._opener = opener
+        self.max_idle = max(0, int(max_idle))
+        self._lock = threading.Lock()
+        self._entries: Dict[CatalogKey, _Entry] = {}
+        self._keys: Dict[int, CatalogKey] = {}
+        self._idle: "OrderedDict[CatalogKey, None]" = OrderedDict()
+        # Latest key seen per real path by the watcher thread.
+        self._observed: Dict[str, CatalogKey] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.loads = 0
+        self.hits = 0
+
+    def _open(self, path: str, previous: Optional[TagCatalogProvider] = None) -> TagCatalogProvider:
+        # A new version of a file can often be derived from the previous one
+        # (CsvCatalog only re-parses the rows that changed).
+        reloaded = getattr(previous, "reloaded", None)
+        if callable(reloaded):
+            return reloaded()  # type: ignore[no-any-return]
+        if self._opener is not None:
+            return self._opener(path)
+        from ranboorux import catalog_index as rb_catalog_index
+
+        return rb_catalog_index.open_catalog(path)
+
+    def acquire(
+        self, path: str, previous: Optional[TagCatalogProvider] = None
+    ) -> TagCatalogProvider:
+        key = catalog_key(path)
+        with self._lock:
+            self._observed[key[0]] = key
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self._idle.pop(key, None)
+                self.hits += 1
+                return entry.catalog
+        # Load outside the lock; a concurrent load of the same version is discarded.
+        catalog = self._open(key[0], previous)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(catalog)
+                self._entries[key] = entry
+                self._keys[id(catalog)] = key
+                self.loads += 1
+            else:
+                self.hits += 1
+            entry.refs += 1
+            self._idle.pop(key, None)
+            return entry.catalog
+
+    def release(self, catalog: object) -> None:
+        """Return one reference; unknown objects (e.g. ``NoopCatalog``) are ignored."""
+        with self._lock:
+            key = self._keys.get(id(catalog))
+            entry = self._entries.get(key) if key is not None else None
+            if key is None or entry is None or entry.catalog is not catalog:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            if entry.refs:
+                return
+            self._idle[key] = None
+            while len(self._idle) > self.max_idle:
+                stale, _ = self._idle.popitem(last=False)
+                self._drop(stale)
+
+    def _drop(self, key: CatalogKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._keys.pop(id(entry.catalog), None)
+            # Unused by now; release file handles such as an index mmap.
+            close = getattr(entry.catalog, "close", None)
+            if callable(close):
+                close()
+        self._idle.pop(key, None)
+
+    def refresh(self, catalog: TagCatalogProvider) -> TagCatalogProvider:
+        """Return the catalog to use from now on, following edits to its file.
+
+        When the file changed, the new version is acquired and ``catalog`` is
+        released (and dropped once unused). While ``watch()`` runs, changes are
+        taken from the watcher instead of a ``stat`` per call. Catalogs not from
+        this registry fall back to their own ``maybe_reload``.
+        """
+        with self._lock:
+            key = self._keys.get(id(catalog))
+            watching = self._watcher is not None
+            observed = self._observed.get(key[0]) if key is not None else None
+        if key is None:
+            reload = getattr(catalog, "maybe_reload", None)
+            if callable(reload):
+                reload()
+            return catalog
+        if watching:
+            current = observed or key
+        else:
+            try:
+                current = catalog_key(key[0])
+            except OSError:
+                return catalog
+        if current == key:
+            return catalog
+        try:
+            fresh = self.acquire(key[0], previous=catalog)
+        except OSError:
+            return catalog
+        self.release(catalog)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refs == 0:
+                self._drop(key)
+        return fresh
+
+    def _watched_paths(self) -> Set[str]:
+        with self._lock:
+            return {key[0] for key in self._entries}
+
+    def scan(self) -> int:
+        """Stat every loaded file once; returns how many changed since the last scan."""
+        changed = 0
+        for path in self._watched_paths():
+            try:
+                current = catalog_key(path)
+            except OSError:
+                continue
+            with self._lock:
+                if self._observed.get(path) != current:
+                    self._observed[path] = current
+                    changed += 1
+        return changed
+
+    def _watch_loop(self, interval: float, stop: threading.Event) -> None:
+        while not stop.wait(interval):
+            try:
+                self.scan()
+            except Exception as exc:
+                print(f"[R] Catalog watcher scan failed: {exc}")
+
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """Start the background file watcher (once; later calls are no-ops)."""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._stop = threading.Event()
+            self._watcher = threading.Thread(
+                target=self._watch_loop,
+                args=(max(0.05, float(interval)), self._stop),
+                name="ranboorux-catalog-watcher",
+                daemon=True,
+            )
+            self._watcher.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+            self._stop.set()
+        if watcher is not None and watcher is not threading.current_thread():
+            watcher.join(timeout=1.0)
+
+    def clear(self) -> None:
+        self.stop()
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._idle.clear()
+            self._observed.clear()
+            self.loads = 0
+            self.hits = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refs),
+                "loads": self.loads,
+                "hits": self.hits,
+            }
+
+
+CATALOGS = CatalogRegistry()
@@ -0,0 +1,357 @@
+"""Build a tag catalog CSV from a Gelbooru-compatible site's DAPI tag listings.
+
+``python -m ranboorux.catalog_sync https://example.booru -o user/catalogs/example.csv``
+
+Tag and tag_alias pages are walked concurrently and written in the
+``tag,category,count,alias`` schema ``CsvCatalog`` reads. Each finished page is
+appended to a journal next to the output, so an interrupted sync resumes with the
+pages it has not fetched yet. A sync state file records the highest tag and alias
+ids seen; later runs only ask for entries after those ids (``after_id``) and merge
+them into the existing CSV. Pass ``--full`` to rebuild from scratch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import html
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_WORKERS = 3
+# DAPI ``type`` values are Danbooru category numbers; some sites send the names.
+CATEGORY_NAMES = {
+    "general": 0,
+    "artist": 1,
+    "copyright": 3,
+    "character": 4,
+    "metadata": 5,
+    "meta": 5,
+}
+_KINDS = ("tag", "alias")
+# Alias separators CsvCatalog accepts, so hand-edited catalogs merge cleanly.
+_ALIAS_SEPARATORS = re.compile(r"[\s,]+")
+
+
+def _int(value: Any, default: int = 0) -> int:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+def _tag_name(value: Any) -> str:
+    # DAPI XML escapes names (``&#039;``) and some sites double-escape them.
+    return html.unescape(html.unescape(str(value or ""))).strip()
+
+
+def tag_row(entry: Dict[str, Any]) -> Optional[List[Any]]:
+    """``[name, category, count, id]`` for one DAPI tag entry, or None when nameless."""
+    name = _tag_name(entry.get("name") or entry.get("tag"))
+    if not name:
+        return None
+    raw_category = entry.get("type", entry.get("category", 0))
+    if isinstance(raw_category, str) and raw_category.strip().lower() in CATEGORY_NAMES:
+        category = CATEGORY_NAMES[raw_category.strip().lower()]
+    else:
+        category = _int(raw_category)
+    count = _int(entry.get("count", entry.get("post_count", 0)))
+    return [name, category, count, _int(entry.get("id"))]
+
+
+def alias_row(entry: Dict[str, Any]) -> Optional[List[Any]]:
+    """``[alias, tag, id]`` for one active DAPI tag_alias entry, or None."""
+    status = str(entry.get("status") or "active").strip().lower()
+    if status not in ("active", "approved"):
+        return None
+    alias = _tag_name(entry.get("alias") or entry.get("antecedent_name"))
+    target = _tag_name(entry.get("tag") or entry.get("consequent_name"))
+    if not alias or not target or alias == target:
+        return None
+    return [alias, target, _int(entry.get("id"))]
+
+
+def read_catalog_rows(path: str) -> Dict[str, List[Any]]:
+    """Read a catalog CSV into ``{tag: [category, count, alias set]}``."""
+    rows: Dict[str, List[Any]] = {}
+    if not os.path.isfile(path):
+        return rows
+    with open(path, newline="", encoding="utf-8") as handle:
+        reader = csv.reader(handle)
+        first = next(reader, None)
+        if first is None:
+            return rows
+        lowered = [str(cell or "").strip().lower() for cell in first]
+        has_header = (
+            len(lowered) >= 3 and lowered[0] in ("tag", "name") and lowered[1] == "category"
+        )
+        for row in reader if has_header else itertools.chain([first], reader):
+            if not row or not row[0].strip():
+                continue
+            alias_field = row[3] if len(row) > 3 else ""
+            aliases = {part for part in _ALIAS_SEPARATORS.split(alias_field) if part}
+            rows[row[0].strip()] = [
+                _int(row[1] if len(row) > 1 else 0),
+                _int(row[2] if len(row) > 2 else 0),
+                aliases,
+            ]
+    return rows
+
+
+def write_catalog_rows(path: str, rows: Dict[str, List[Any]]) -> None:
+    """Write rows most-used first, replacing ``path`` atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    ordered = sorted(rows.items(), key=lambda item: (-item[1][1], item[0]))
+    with open(temp_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["tag", "category", "count", "alias"])
+        for name, (category, count, aliases) in ordered:
+            writer.writerow([name, category, count, ",".join(sorted(aliases))])
+    os.replace(temp_path, path)
+
+
+class CatalogSync:
+    """Sync one Gelbooru-compatible site's tags and aliases into a catalog CSV.
+
+    ``api`` is a ``GelbooruCompatible`` (anything with ``get_tags`` and
+    ``get_tag_aliases`` taking ``limit``/``page``/``after_id``). Pages are fetched
+    ``workers`` at a time; a listing ends at its first short page. A failed page
+    aborts the run and leaves the journal in place for the next attempt.
+    """
+
+    def __init__(
+        self,
+        api: Any,
+        path: str,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        workers: int = DEFAULT_WORKERS,
+        max_pages: Optional[int] = None,
+    ):
+        self.api = api
+        self.path = path
+        self.page_size = max(1, int(page_size))
+        self.workers = max(1, int(workers))
+        self.max_pages = None if max_pages is None else max(1, int(max_pages))
+        self.state_path = f"{path}.sync.json"
+        self.journal_path = f"{path}.sync-journal.jsonl"
+
+    @property
+    def base_url(self) -> str:
+        return str(getattr(self.api, "base_url", "") or "")
+
+    def load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(state, handle, indent=2, sort_keys=True)
+        os.replace(temp_path, self.state_path)
+
+    def _journal_header(self, after: Dict[str, Optional[int]]) -> Dict[str, Any]:
+        return {"base_url": self.base_url, "page_size": self.page_size, "after": after}
+
+    def _read_journal(
+        self, header: Dict[str, Any]
+    ) -> Optional[Dict[str, Dict[int, Tuple[int, List[List[Any]]]]]]:
+        """Pages already fetched for this exact run, as ``{kind: {page: (size, rows)}}``.
+
+        Returns None (and drops any stale journal) when there is nothing to resume.
+        """
+        try:
+            with open(self.journal_path, encoding="utf-8") as handle:
+                text = handle.read()
+        except OSError:
+            return None
+        lines = text.splitlines()
+        if not lines or _loads(lines[0]) != header:
+            os.remove(self.journal_path)
+            return None
+        if not text.endswith("\n"):
+            # Drop a torn last line from an interrupted write; that page is refetched.
+            lines.pop()
+            with open(self.journal_path, "w", encoding="utf-8") as handle:
+                handle.write("".join(f"{line}\n" for line in lines))
+        done: Dict[str, Dict[int, Tuple[int, List[List[Any]]]]] = {kind: {} for kind in _KINDS}
+        for line in lines[1:]:
+            record = _loads(line)
+            if isinstance(record, dict) and record.get("kind") in done:
+                done[record["kind"]][int(record["page"])] = (
+                    int(record["size"]),
+                    record["rows"],
+                )
+        return done
+
+    def _fetch_page(
+        self, kind: str, page: int, after_id: Optional[int]
+    ) -> Tuple[int, List[List[Any]]]:
+        fetch = self.api.get_tags if kind == "tag" else self.api.get_tag_aliases
+        parse = tag_row if kind == "tag" else alias_row
+        page_slot = getattr(self.api, "_page_slot", None)
+        if callable(page_slot):
+            with page_slot():
+                entries = fetch(limit=self.page_size, page=page, after_id=after_id)
+        else:
+            entries = fetch(limit=self.page_size, page=page, after_id=after_id)
+        rows = [row for row in (parse(entry) for entry in entries or ()) if row is not None]
+        return len(entries or ()), rows
+
+    def _walk(
+        self,
+        kind: str,
+        after_id: Optional[int],
+        done: Dict[int, Tuple[int, List[List[Any]]]],
+        journal,
+    ) -> List[List[Any]]:
+        pages = dict(done)
+        short = [page for page, (size, _rows) in pages.items() if size < self.page_size]
+        last = min(short) if short else None
+        next_page = 0
+        pending: Dict[Future, int] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="ranboorux-catalog-sync"
+        ) as pool:
+            try:
+                while True:
+                    while (
+                        len(pending) < self.workers
+                        and (last is None or next_page <= last)
+                        and (self.max_pages is None or next_page < self.max_pages)
+                    ):
+                        if next_page not in pages:
+                            future = pool.submit(self._fetch_page, kind, next_page, after_id)
+                            pending[future] = next_page
+                        next_page += 1
+                    if not pending:
+                        break
+                    finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        page = pending.pop(future)
+                        size, rows = future.result()
+                        pages[page] = (size, rows)
+                        journal.write(
+                            json.dumps({"kind": kind, "page": page, "size": size, "rows": rows})
+                            + "\n"
+                        )
+                        journal.flush()
+                        if size < self.page_size and (last is None or page < last):
+                            last = page
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+        print(f"[R Catalog Sync] {kind}: {len(pages)} page(s) from {self.base_url}")
+        return [
+            row for page in sorted(pages) if last is None or page <= last for row in pages[page][1]
+        ]
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Fetch, merge and write the catalog; returns counts for the run."""
+        state = {} if full else self.load_state()
+        if state.get("base_url") != self.base_url:
+            state = {}
+        incremental = bool(state) and os.path.isfile(self.path)
+        after: Dict[str, Optional[int]] = {
+            "tag": state.get("last_tag_id") if incremental else None,
+            "alias": state.get("last_alias_id") if incremental else None,
+        }
+        header = self._journal_header(after)
+        done = self._read_journal(header)
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            if done is None:
+                done = {kind: {} for kind in _KINDS}
+                journal.write(json.dumps(header) + "\n")
+                journal.flush()
+            else:
+                resumed = sum(len(pages) for pages in done.values())
+                print(f"[R Catalog Sync] Resuming: {resumed} page(s) already fetched")
+            tags = self._walk("tag", after["tag"], done["tag"], journal)
+            aliases = self._walk("alias", after["alias"], done["alias"], journal)
+
+        rows = read_catalog_rows(self.path) if incremental else {}
+        for name, category, count, _id in tags:
+            previous = rows.get(name)
+            rows[name] = [category, count, previous[2] if previous else set()]
+        for alias, target, _id in aliases:
+            rows.setdefault(target, [0, 0, set()])[2].add(alias)
+        write_catalog_rows(self.path, rows)
+
+        self._save_state(
+            {
+                "base_url": self.base_url,
+                "last_tag_id": max([after["tag"] or 0] + [row[3] for row in tags]),
+                "last_alias_id": max([after["alias"] or 0] + [row[2] for row in aliases]),
+                "synced_at": time.time(),
+            }
+        )
+        os.remove(self.journal_path)
+        return {
+            "tags": len(tags),
+            "aliases": len(aliases),
+            "rows": len(rows),
+            "incremental": incremental,
+        }
+
+
+def _loads(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from ranboorux.boorus.gelbooru import GelbooruCompatible
+
+    parser = argparse.ArgumentParser(
+        prog="python -m ranboorux.catalog_sync",
+        description="Sync a Gelbooru-compatible site's tags and aliases into a catalog CSV.",
+    )
+    parser.add_argument("base_url", help="Site base URL, e.g. https://realbooru.com")
+    parser.add_argument("-o", "--output", required=True, help="Catalog CSV to write.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--max-pages", type=int, default=None, help="Cap pages per listing.")
+    parser.add_argument("--full", action="store_true", help="Ignore the previous sync state.")
+    args = parser.parse_args(argv)
+    try:
+        api = GelbooruCompatible(args.base_url)
+    except ValueError as exc:
+        print(f"[R Catalog Sync] {exc}")
+        return 2
+    sync = CatalogSync(
+        api,
+        args.output,
+        page_size=args.page_size,
+        workers=args.workers,
+        max_pages=args.max_pages,
+    )
+    try:
+        totals = sync.run(full=args.full)
+    except Exception as exc:
+        print(f"[R Catalog Sync] Sync stopped ({exc}); re-run to resume.")
+        return 1
+    mode = "incremental" if totals["incremental"] else "full"
+    print(
+        f"[R Catalog Sync] {mode} sync wrote {totals['rows']} tag(s) to {args.output} "
+        f"({totals['tags']} tag and {totals['aliases']} alias entries fetched)."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,243 @@
+"""Character-trigram index for "did you mean" tag suggestions.
+
+Scanning every catalog tag with ``difflib.get_close_matches`` costs a full
+SequenceMatcher pass over ~32k names per unknown tag. ``TrigramIndex`` keeps an
+inverted index from padded character trigrams to tag ids. A lookup counts shared
+trigrams over the query's posting lists and checks only the best-overlapping
+names with SequenceMatcher, which takes about a millisecond. ``exact=True``
+instead returns what ``get_close_matches`` would, at tens of milliseconds.
+"""
+
+from __future__ import annotations
+
+import difflib
+import heapq
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_CUTOFF = 0.6
+# Queries this short share too few trigrams with their matches; they are compared
+# against the (few) names of similar length instead.
+SHORT_QUERY = 3
+# Best-overlapping names verified per pooled suggestion on the default (fast) path.
+CANDIDATES_PER_RESULT = 4
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"^{text}$"
+    return [padded[i : i + 3] for i in range(max(1, len(padded) - 2))]
+
+
+def _needed_matches(floor: float, total: int) -> int:
+    """Fewest matching characters giving ``2 * M / total >= floor``, as difflib rounds it."""
+    needed = max(0, math.ceil(floor * total / 2.0))
+    while needed > 0 and 2.0 * (needed - 1) / total >= floor:
+        needed -= 1
+    while 2.0 * needed / total < floor:
+        needed += 1
+    return needed
+
+
+class TrigramIndex:
+    """Fuzzy lookup over a fixed list of names, ranked by usage count."""
+
+    def __init__(self, names: Sequence[str], counts: Optional[Sequence[int]] = None):
+        self._names = list(names)
+        self._counts = array("q", counts if counts is not None else [0] * len(self._names))
+        self._lengths = array("I", (len(name) for name in self._names))
+        grams: Dict[str, array] = {}
+        for index, name in enumerate(self._names):
+            for gram in set(trigrams(name)):
+                postings = grams.get(gram)
+                if postings is None:
+                    postings = grams[gram] = array("I")
+                postings.append(index)
+        self._postings = grams
+        by_length: Dict[int, array] = {}
+        for index, length in enumerate(self._lengths):
+            bucket = by_length.get(length)
+            if bucket is None:
+                bucket = by_length[length] = array("I")
+            bucket.append(index)
+        self._by_length = by_length
+        self._short = array(
+            "I", (index for index, name in enumerate(self._names) if len(name) <= SHORT_QUERY * 2)
+        )
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _candidates(
+        self, query: str, cutoff: float, top: Optional[int] = None
+    ) -> List[Tuple[float, int]]:
+        """Names that can reach ``cutoff`` and share a trigram, best overlap first.
+
+        ``top`` keeps only that many of the best-overlapping names.
+        """
+        query_grams = set(trigrams(query))
+        shared: Counter = Counter()
+        for gram in query_grams:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                shared.update(postings)
+        if len(query) < SHORT_QUERY:
+            for index in self._short:
+                shared[index] += 0
+        if not shared:
+            return []
+        # SequenceMatcher.ratio() = 2M / (a + b) with M <= min(a, b), so a name can
+        # only reach ``cutoff`` inside this length window (widened for rounding).
+        size = len(query)
+        low = size * cutoff / (2.0 - cutoff) - 1e-9 if cutoff < 2 else size
+        high = size * (2.0 - cutoff) / cutoff + 1e-9 if cutoff > 0 else float("inf")
+        lengths = self._lengths
+        total = len(query_grams)
+        items: Iterable[Tuple[int, int]] = shared.items()
+        if top is not None:
+            # Names sharing under half the best overlap rarely rank in the top few;
+            # dropping them first keeps the Python-level scoring to a few hundred.
+            floor = max(shared.values()) // 2
+            items = [(index, hits) for index, hits in items if hits >= floor]
+        scored = [
+            (2.0 * hits / (total + lengths[index] + 1), index)
+            for index, hits in items
+            if low <= lengths[index] <= high
+        ]
+        if top is not None:
+            return heapq.nlargest(top, scored)
+        scored.sort(reverse=True)
+        return scored
+
+    def _verified(
+        self, query: str, candidates: List[Tuple[float, int]], cutoff: float, pool: int
+    ) -> List[int]:
+        """The first ``pool`` candidates, in overlap order, whose ratio reaches ``cutoff``."""
+        names = self._names
+        size = len(query)
+        letters = list(Counter(query).items())
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        chosen: List[int] = []
+        for _overlap, index in candidates:
+            name = names[index]
+            # quick_ratio()'s bound, without its per-call dict building.
+            common = 0
+            for letter, wanted in letters:
+                found = name.count(letter)
+                common += found if found < wanted else wanted
+            if 2.0 * common / (len(name) + size) < cutoff:
+                continue
+            matcher.set_seq1(name)
+            if matcher.ratio() >= cutoff:
+                chosen.append(index)
+                if len(chosen) >= pool:
+                    break
+        return chosen
+
+    def _closest(
+        self, query: str, candidates: List[Tuple[float, int]], cutoff: float, pool: int
+    ) -> List[int]:
+        """The ``pool`` names with the highest SequenceMatcher ratio, as difflib picks them.
+
+        Names sharing the most trigrams are checked first so the pool fills with
+        strong matches early. Names sharing none are swept afterwards, one length
+        at a time, until the length bound rules out the rest. Every name has to
+        pass the ``real_quick_ratio``/``quick_ratio`` bounds against the weakest
+        pooled match before ``ratio`` is computed.
+        """
+        names = self._names
+        size = len(query)
+        # Deleting the query's characters from a name leaves the ones that can't match.
+        strip = dict.fromkeys(map(ord, query))
+        letters = list(Counter(query).items())
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        # Min-heap of the ``pool`` best (ratio, name, index), ordered like difflib's.
+        best: List[Tuple[float, str, int]] = []
+        floor = cutoff
+
+        def offer(index: int, name: str, total: int) -> None:
+            nonlocal floor
+            common = 0
+            for letter, wanted in letters:
+                found = name.count(letter)
+                common += found if found < wanted else wanted
+            if 2.0 * common / total < floor:
+                return
+            matcher.set_seq1(name)
+            score = matcher.ratio()
+            if score < floor:
+                return
+            entry = (score, name, index)
+            if len(best) < pool:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+            else:
+                return
+            if len(best) == pool:
+                floor = max(cutoff, best[0][0])
+
+        seen = set()
+        for _overlap, index in candidates:
+            seen.add(index)
+            name = names[index]
+            total = len(name) + size
+            if 2.0 * min(len(name) - len(name.translate(strip)), size) / total >= floor:
+                offer(index, name, total)
+        # Longest possible match first: 2 * min(a, b) / (a + b) bounds the ratio.
+        bounds = sorted(
+            ((2.0 * min(length, size) / (length + size), length) for length in self._by_length),
+            reverse=True,
+        )
+        for bound, length in bounds:
+            if bound < floor:
+                break
+            total = length + size
+            need = _needed_matches(floor, total)
+            bucket = [
+                index
+                for index in self._by_length[length]
+                if length - len(names[index].translate(strip)) >= need and index not in seen
+            ]
+            for index in bucket:
+                offer(index, names[index], total)
+        return [index for _score, _name, index in best]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 3,
+        cutoff: float = DEFAULT_CUTOFF,
+        exact: bool = False,
+        pool: Optional[int] = None,
+    ) -> List[str]:
+        """Return up to ``limit`` names similar to ``query``, most used first.
+
+        ``pool`` names (default ``4 * limit``, as the old difflib call used) whose
+        SequenceMatcher ratio reaches ``cutoff`` are re-ranked by count.
+        By default names are taken in trigram-overlap order and at most
+        ``CANDIDATES_PER_RESULT * pool`` of them are checked with ``ratio()``, so a
+        lookup stays around a millisecond; a close name sharing few trigrams can be
+        missed. With ``exact`` the pool is exactly what
+        ``difflib.get_close_matches(query, names, pool, cutoff)`` returns, at tens
+        of milliseconds per lookup.
+        """
+        if limit <= 0 or not query or not self._names:
+            return []
+        pool = max(limit, pool if pool is not None else limit * 4)
+        names = self._names
+        if exact:
+            chosen = self._closest(query, self._candidates(query, cutoff), cutoff, pool)
+        else:
+            top = pool * CANDIDATES_PER_RESULT
+            chosen = self._verified(query, self._candidates(query, cutoff, top), cutoff, pool)
+        chosen.sort(key=lambda index: (-self._counts[index], names[index]))
+        return [names[index] for index in chosen[:limit]]
+
+
+def build_index(names: Iterable[str], counts: Dict[str, int]) -> TrigramIndex:
+    ordered = sorted(names)
+    return TrigramIndex(ordered, [counts.get(name, 0) for name in ordered])
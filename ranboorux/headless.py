@@ -0,0 +1,393 @@
+"""Batch prompt generation without the WebUI.
+
+Runs the script's fetch -> catalog -> strict prefilter -> prompt steps over the
+``ranboorux`` package only, so it works in a plain Python environment without
+gradio or ``modules.*``. Prompts are generated in batches (one booru fetch each)
+on a thread pool and streamed as JSON lines. Every line carries its batch number,
+and a batch is written in one flushed write, so an interrupted run resumes by
+skipping the batches already in the output file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import tag_pipeline as rb_tag_pipeline
+from ranboorux.boorus import PostsResult, as_posts_result, make_booru
+from ranboorux.boorus import common as rb_booru_common
+
+BUNDLED_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "catalogs",
+    "danbooru_tags.csv",
+)
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_WORKERS = 4
+STRICT_EXTRA_ROUNDS = 2
+STRICT_HARVEST_PAGES = 4
+
+
+@dataclass(frozen=True)
+class HeadlessOptions:
+    """Settings for one headless run; field names follow the script's UI options."""
+
+    booru: str = "danbooru"
+    tags: str = ""
+    mature_rating: str = "All"
+    max_pages: int = 10
+    base_positive: str = ""
+    base_negative: str = ""
+    remove_bad_tags: bool = True
+    remove_tags: Tuple[str, ...] = ()
+    favorite_tags: Tuple[str, ...] = ()
+    strict: bool = True
+    shuffle_tags: bool = True
+    chaos_mode: str = "None"
+    chaos_amount: float = 0.5
+    limit_tags: float = 1.0
+    max_tags: int = 0
+    change_dash: bool = False
+    remove_artist_tags: bool = False
+    remove_character_tags: bool = False
+    remove_clothing_tags: bool = False
+    remove_text_tags: bool = False
+    restrict_subject_tags: bool = False
+    remove_furry_tags: bool = False
+    remove_headwear_tags: bool = False
+    remove_girl_suffix_tags: bool = False
+    preserve_hair_eye_colors: bool = False
+    remove_series_tags: bool = False
+    fringe_benefits: bool = True
+    gelbooru_credentials: Optional[Dict[str, str]] = field(default=None, compare=False)
+    compat_base_url: str = ""
+
+    @property
+    def toggles(self) -> Tuple[bool, bool, bool, bool, bool, bool, bool, bool, bool, bool]:
+        return (
+            bool(self.remove_artist_tags),
+            bool(self.remove_character_tags),
+            bool(self.remove_clothing_tags),
+            bool(self.remove_text_tags),
+            bool(self.restrict_subject_tags),
+            bool(self.remove_furry_tags),
+            bool(self.remove_headwear_tags),
+            bool(self.remove_girl_suffix_tags),
+            bool(self.preserve_hair_eye_colors),
+            bool(self.remove_series_tags),
+        )
+
+    @property
+    def prompt_settings(self) -> Tuple[Any, ...]:
+        return (
+            self.shuffle_tags,
+            self.chaos_mode,
+            self.chaos_amount,
+            self.limit_tags,
+            self.max_tags,
+            self.change_dash,
+            self.remove_artist_tags,
+            self.remove_character_tags,
+            self.remove_clothing_tags,
+            self.remove_text_tags,
+            self.restrict_subject_tags,
+            self.remove_furry_tags,
+            self.remove_headwear_tags,
+            self.preserve_hair_eye_colors,
+            self.remove_series_tags,
+        )
+
+
+class PromptGenerator:
+    """Generates prompt records in batches from one booru client.
+
+    The removal context, allowed subjects, colour anchors and the tags query are
+    computed once and shared by every batch; each batch keeps its own tag
+    normalisation cache so worker threads never write to the same dict.
+    """
+
+    def __init__(
+        self,
+        options: HeadlessOptions,
+        *,
+        api: Any = None,
+        catalog: Optional[rb_catalog.TagCatalogProvider] = None,
+        http_client: Any = None,
+    ):
+        self.options = options
+        self.catalog = catalog if catalog is not None and catalog.enabled() else None
+        self.api = api or make_booru(
+            options.booru,
+            fringe_benefits=options.fringe_benefits,
+            gelbooru_credentials=options.gelbooru_credentials,
+            compat_base_url=options.compat_base_url,
+            http_client=http_client,
+        )
+        bad_tags: Set[str] = set(options.remove_tags)
+        if options.remove_bad_tags:
+            bad_tags.update(rb_tag_pipeline.DEFAULT_BAD_TAGS)
+        self.filter_ctx = rb_tag_pipeline.build_removal_context(
+            bad_tags,
+            options.favorite_tags,
+            rb_tag_pipeline.build_synonym_lookup(rb_tag_pipeline.REMOVAL_SYNONYM_GROUPS_RAW),
+        )
+        self.favorites_guard: Set[str] = set(
+            self.filter_ctx.get("favorites", frozenset())  # type: ignore[call-overload]
+        )
+        self.base_colors = rb_tag_pipeline.catalog_color_tags(options.base_positive, self.catalog)
+        self.allowed_subjects = (
+            rb_tag_pipeline.extract_subject_tags(options.base_positive)
+            if options.restrict_subject_tags
+            else set()
+        )
+        self.tags_query = self._tags_query()
+
+    def _compose(self, booru_name: str) -> str:
+        options = self.options
+        tags = rb_booru_common.query_tags(booru_name, options.tags, options.mature_rating)
+        tags, _diag = rb_catalog.apply_catalog(
+            tags,
+            self.catalog,
+            keep_hair_eye=options.preserve_hair_eye_colors,
+            drop_series=options.remove_series_tags,
+            drop_characters=options.remove_character_tags,
+            drop_textual=options.remove_text_tags,
+        )
+        return str(rb_booru_common.format_tags_query(tags))
+
+    def _tags_query(self) -> Any:
+        backend_names = getattr(self.api, "backend_names", None)
+        if backend_names:
+            # Rating tags differ per site, so each federated backend gets its own query.
+            return {name: self._compose(name) for name in backend_names}
+        return self._compose(self.api.booru_name.lower())
+
+    def _rejected(self, post: Dict[str, object], cache: Dict[str, str]) -> bool:
+        catalog = self.catalog
+        rejected, _reason = rb_tag_pipeline.post_rejected_by_filter(
+            post,
+            filter_ctx=self.filter_ctx,
+            toggles=self.options.toggles,
+            base_colors=self.base_colors,
+            allowed_subjects=self.allowed_subjects,
+            cache=cache,
+            favorites_guard=self.favorites_guard,
+            catalog_resolve_alias_fn=catalog.resolve_alias if catalog else None,
+            catalog_is_textual_fn=catalog.is_textual if catalog else None,
+            catalog_is_hair_fn=catalog.is_hair if catalog else None,
+            catalog_is_eye_fn=catalog.is_eye if catalog else None,
+            catalog_category_fn=catalog.category if catalog else None,
+        )
+        return rejected
+
+    def _prefilter(
+        self,
+        posts: List[Dict[str, object]],
+        needed: int,
+        cache: Dict[str, str],
+        exclude_pages: Iterable[int] = (),
+    ) -> Tuple[List[Dict[str, object]], int, bool]:
+        """Drop posts the removal rules reject, fetching extra pages when too few remain.
+
+        Returns (posts, rejected count, relaxed). Posts are drawn with replacement, so
+        the batch only relaxes to prompt-level filtering of the original posts (as the
+        script does) when no post survives at all.
+        """
+        seen = set()
+        kept: List[Dict[str, object]] = []
+        rejected = 0
+
+        def consider(batch: Iterable[Dict[str, object]]) -> None:
+            nonlocal rejected
+            for post in batch:
+                key = (post.get("booru_name"), post.get("id"), post.get("file_url"))
+                if key in seen:
+                    continue
+                seen.add(key)
+                if self._rejected(post, cache):
+                    rejected += 1
+                else:
+                    kept.append(post)
+
+        consider(posts)
+        harvest = getattr(self.api, "harvest_posts", None)
+        rounds = min(STRICT_EXTRA_ROUNDS, 1) if callable(harvest) else STRICT_EXTRA_ROUNDS
+        for _round in range(rounds):
+            if len(kept) >= needed:
+                break
+            try:
+                if callable(harvest):
+                    extra = harvest(
+                        tags_query=self.tags_query,
+                        max_pages=self.options.max_pages,
+                        pages=STRICT_HARVEST_PAGES,
+                        exclude_pages=tuple(exclude_pages),
+                    )
+                else:
+                    extra = self._fetch().posts
+            except Exception as exc:
+                print(f"[R Headless] Warn: extra strict fetch failed: {exc}")
+                break
+            consider(extra or ())
+        if len(kept) < needed and not kept:
+            return list(posts), rejected, True
+        return kept, rejected, False
+
+    def _fetch(self) -> PostsResult:
+        return as_posts_result(
+            self.api.get_posts(tags_query=self.tags_query, max_pages=self.options.max_pages),
+            self.api.booru_name,
+        )
+
+    def generate_batch(
+        self, batch: int, size: int, first_index: int = 0
+    ) -> List[Dict[str, object]]:
+        """Fetch one page of posts and turn ``size`` randomly drawn posts into prompts."""
+        cache: Dict[str, str] = {}
+        fetched = self._fetch()
+        posts = list(fetched.posts)
+        if not posts:
+            raise rb_booru_common.BooruError("No valid posts found matching criteria.")
+        relaxed = False
+        if self.options.strict:
+            skip = () if fetched.page is None else (fetched.page,)
+            posts, _rejected, relaxed = self._prefilter(posts, size, cache, skip)
+        weights: Optional[List[float]] = None
+        if any("pool_weight" in post for post in posts):
+            weights = [float(post.get("pool_weight") or 0.0) for post in posts]  # type: ignore[arg-type]
+            if not any(weights):
+                weights = None
+        chosen = random.choices(posts, weights=weights, k=size)
+        records = []
+        for offset, post in enumerate(chosen):
+            prompt, negative = rb_tag_pipeline.process_prompt(
+                str(post.get("tags") or ""),
+                post=post,
+                base_positive=self.options.base_positive,
+                base_negative=self.options.base_negative,
+                initial_additions="",
+                settings=self.options.prompt_settings,
+                catalog=self.catalog,
+                filter_ctx=self.filter_ctx,
+                base_colors=self.base_colors,
+                cache=cache,
+            )
+            records.append(
+                {
+                    "batch": batch,
+                    "index": first_index + offset,
+                    "prompt": prompt,
+                    "negative_prompt": negative,
+                    "booru": post.get("booru_name") or self.api.booru_name,
+                    "post_id": post.get("id"),
+                    "source": post.get("file_url"),
+                    "relaxed": relaxed,
+                }
+            )
+        return records
+
+
+def completed_batches(path: str, count: int, batch_size: int) -> Set[int]:
+    """Batches fully written to ``path`` for a run of ``count`` prompts.
+
+    A batch counts as done only once ``batch_sizes(count, batch_size)[batch]`` of
+    its records are present. A torn final line, and the partial batch it ends,
+    are trimmed so the resumed run writes that batch again.
+    """
+    sizes = batch_sizes(count, batch_size)
+    found: Dict[int, int] = {}
+    if not os.path.isfile(path):
+        return set()
+    valid_end = 0
+    # Batches are written in one piece, so a crash can only leave the last one short.
+    last_batch: Optional[int] = None
+    last_start = 0
+    with open(path, "rb") as handle:
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            batch = record.get("batch") if isinstance(record, dict) else None
+            if isinstance(batch, int):
+                if batch != last_batch:
+                    last_batch, last_start = batch, valid_end
+                found[batch] = found.get(batch, 0) + 1
+            valid_end += len(line)
+    done = {
+        batch
+        for batch, records in found.items()
+        if 0 <= batch < len(sizes) and records >= sizes[batch]
+    }
+    if last_batch is not None and last_batch not in done:
+        valid_end = last_start
+    if valid_end < os.path.getsize(path):
+        with open(path, "r+b") as handle:
+            handle.truncate(valid_end)
+    return done
+
+
+def batch_sizes(count: int, batch_size: int) -> List[int]:
+    batch_size = max(1, int(batch_size))
+    full, rest = divmod(max(0, int(count)), batch_size)
+    return [batch_size] * full + ([rest] if rest else [])
+
+
+def run(
+    generator: PromptGenerator,
+    out: IO[str],
+    *,
+    count: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    skip: Iterable[int] = (),
+    on_batch: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, int]:
+    """Generate ``count`` prompts into ``out`` as JSON lines; returns run totals.
+
+    Batches run concurrently and are written whole as they finish, so the file is
+    not in index order. Failed batches are reported and left out, which lets a
+    later run with the same output file fill them in.
+    """
+    sizes = batch_sizes(count, batch_size)
+    skip_set = set(skip)
+    pending = [(batch, size) for batch, size in enumerate(sizes) if batch not in skip_set]
+    totals = {
+        "batches": len(sizes),
+        "skipped": len(sizes) - len(pending),
+        "written": 0,
+        "failed": 0,
+    }
+    write_lock = threading.Lock()
+    with ThreadPoolExecutor(
+        max_workers=max(1, int(workers)), thread_name_prefix="ranboorux-headless"
+    ) as pool:
+        futures = {
+            pool.submit(generator.generate_batch, batch, size, batch * batch_size): batch
+            for batch, size in pending
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                records = future.result()
+            except Exception as exc:
+                totals["failed"] += 1
+                print(f"[R Headless] Batch {batch} failed: {exc}")
+                continue
+            payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            with write_lock:
+                out.write(payload)
+                out.flush()
+                totals["written"] += len(records)
+            if on_batch:
+                on_batch(batch, len(records))
+    return totals
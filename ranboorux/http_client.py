@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import io
 import ipaddress
 import json
 import re
 import socket
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Mapping, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Protocol, Tuple
 from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlparse
 
 import requests
@@ -14,10 +17,18 @@ from urllib3 import PoolManager
 from urllib3.connection import HTTPConnection, HTTPSConnection
 from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
+from ranboorux import rate_limit as rb_rate_limit
+
 try:
-    import requests_cache
-except Exception:  # pragma: no cover - requests_cache is optional in host tests
-    requests_cache = None
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional accelerator
+    orjson = None  # type: ignore[assignment]
+
+# requests-cache is optional and slow to import; it is loaded on the first cached session.
+requests_cache: Any = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+_UTF8_ENCODINGS = {"utf-8", "utf8", "utf_8"}
 
 
 SENSITIVE_QUERY_PARAMS = {
@@ -41,6 +52,10 @@ REDIRECT_STATUSES = {301, 302, 303, 307, 308}
 MAX_REDIRECTS = 5
 STREAM_CHUNK_SIZE = 64 * 1024
 DEFAULT_API_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_POOL_CONNECTIONS = 32
+DEFAULT_POOL_MAXSIZE = 8
+DNS_CACHE_TTL_SECONDS = 60.0
+DNS_CACHE_MAX_ENTRIES = 256
 
 
 class ResponseTooLargeError(RuntimeError):
@@ -72,13 +87,217 @@ class BoundedResponse:
         return self.content.decode(self.encoding or "utf-8", errors="replace")
 
     def json(self) -> Any:
-        return json.loads(self.content.decode(self.encoding or "utf-8"))
+        return json_loads(self.content, self.encoding)
 
     def raise_for_status(self) -> None:
         if 400 <= int(self.status_code) < 600:
             raise RuntimeError(f"HTTP status {self.status_code} for {redact_url(self.url)}")
 
 
+@dataclass
+class StreamedResponse:
+    """A response whose size-capped body is read incrementally; close it when done."""
+
+    url: str
+    status_code: int
+    headers: Mapping[str, str]
+    body: BoundedStream
+    encoding: Optional[str] = None
+
+    def peek(self, size: int) -> bytes:
+        return self.body.peek(size)
+
+    def close(self) -> None:
+        self.body.close()
+
+
+class BoundedStream(io.RawIOBase):
+    """Seekable, size-capped file object over a streamed response body.
+
+    Chunks are pulled from the response only as far as the reader asks, into a single
+    growing buffer, so a decoder can read and check the image header before the rest
+    of the body is transferred. Reading past ``max_bytes`` raises
+    ResponseTooLargeError. Leaving a ``with`` block without an error drains the body
+    and passes the complete content to ``on_complete``.
+
+    With ``retain=False`` bytes are dropped once read, so a streaming parser keeps
+    only the unread part in memory; the stream is then forward-only.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        url: str,
+        max_bytes: int,
+        *,
+        on_complete: Optional[Callable[[bytes], None]] = None,
+        on_close: Optional[Callable[[], None]] = None,
+        retain: bool = True,
+    ):
+        super().__init__()
+        self.url = url
+        self.max_bytes = int(max_bytes)
+        self._chunks: Optional[Iterator[bytes]] = iter(chunks)
+        self._buffer = bytearray()
+        self._position = 0
+        self._dropped = 0
+        self._retain = retain
+        self._on_complete = on_complete
+        self._on_close = on_close
+
+    @property
+    def bytes_received(self) -> int:
+        return self._dropped + len(self._buffer)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._chunks is None
+
+    def _fill(self, size: Optional[int]) -> None:
+        while self._chunks is not None and (size is None or len(self._buffer) < size):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._chunks = None
+                break
+            if not chunk:
+                continue
+            if self.bytes_received + len(chunk) > self.max_bytes:
+                self._chunks = None
+                raise ResponseTooLargeError(
+                    f"Response from {redact_url(self.url)} exceeded {self.max_bytes} bytes"
+                )
+            self._buffer.extend(chunk)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._retain
+
+    def tell(self) -> int:
+        return self._dropped + self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if not self._retain:
+            raise io.UnsupportedOperation("stream does not retain read bytes")
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            self._fill(None)
+            position = len(self._buffer) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("negative seek position")
+        self._position = position
+        return position
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            self._fill(None)
+            end = len(self._buffer)
+        else:
+            end = self._position + size
+            self._fill(end)
+            end = min(end, len(self._buffer))
+        data = bytes(self._buffer[self._position : end])
+        self._position = max(self._position, end)
+        if not self._retain:
+            del self._buffer[: self._position]
+            self._dropped += self._position
+            self._position = 0
+        return data
+
+    def peek(self, size: int) -> bytes:
+        """Return up to ``size`` upcoming bytes without consuming them."""
+        end = self._position + size
+        self._fill(end)
+        return bytes(self._buffer[self._position : end])
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def getvalue(self) -> bytes:
+        if not self._retain:
+            raise io.UnsupportedOperation("stream does not retain read bytes")
+        self._fill(None)
+        return bytes(self._buffer)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._chunks = None
+        on_close, self._on_close = self._on_close, None
+        try:
+            if on_close is not None:
+                on_close()
+        finally:
+            super().close()
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        try:
+            if exc_type is None and self._on_complete is not None and not self.closed:
+                content = self.getvalue()
+                try:
+                    self._on_complete(content)
+                except Exception:
+                    pass
+        finally:
+            self.close()
+
+
+def json_loads(content: bytes, encoding: Optional[str] = None) -> Any:
+    """Parse a JSON body straight from bytes, with orjson when it is installed.
+
+    UTF-8 bodies (the norm for booru APIs) skip the intermediate ``str``; other
+    declared encodings are decoded first.
+    """
+    if encoding and encoding.lower() not in _UTF8_ENCODINGS:
+        return json.loads(content.decode(encoding))
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def project_fields(payload: Any, fields: Optional[Iterable[str]]) -> Any:
+    """Keep only ``fields`` on each post in a parsed API payload.
+
+    A list of objects is projected item by item. For an object payload, list-valued
+    entries holding objects are projected (e621 ``posts``, Gelbooru ``post``) and the
+    envelope itself, with counts and ``@attributes``, is left alone.
+    """
+    if fields is None:
+        return payload
+    wanted = frozenset(fields)
+
+    def project(items: list) -> list:
+        return [
+            (
+                {key: value for key, value in item.items() if key in wanted}
+                if isinstance(item, dict)
+                else item
+            )
+            for item in items
+        ]
+
+    if isinstance(payload, list):
+        return project(payload)
+    if isinstance(payload, dict):
+        return {
+            key: (
+                project(value)
+                if isinstance(value, list) and any(isinstance(item, dict) for item in value)
+                else value
+            )
+            for key, value in payload.items()
+        }
+    return payload
+
+
 def redact_url(url: object) -> str:
     text = str(url or "")
     if not text:
@@ -321,26 +540,115 @@ class _SafeHTTPSConnection(HTTPSConnection):
         return sock
 
 
-class _SafeHTTPConnectionPool(HTTPConnectionPool):
+class PoolStats:
+    """Counts pooled connection checkouts per host.
+
+    ``created`` means the checkout had to open a new socket (TCP and, for HTTPS, a TLS
+    handshake); ``reused`` means an idle keep-alive connection was handed out.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, host: str, *, reused: bool) -> None:
+        with self._lock:
+            counts = self._hosts.setdefault(host, {"created": 0, "reused": 0})
+            counts["reused" if reused else "created"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: dict(counts) for host, counts in self._hosts.items()}
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "created": sum(counts["created"] for counts in self._hosts.values()),
+                "reused": sum(counts["reused"] for counts in self._hosts.values()),
+            }
+
+
+class _StatsPoolMixin:
+    stats: Optional[PoolStats] = None
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        stats = self.stats
+        if stats is not None:
+            stats.record(
+                str(getattr(self, "host", "")), reused=getattr(conn, "sock", None) is not None
+            )
+        return conn
+
+
+class _SafeHTTPConnectionPool(_StatsPoolMixin, HTTPConnectionPool):
     ConnectionCls = _SafeHTTPConnection
 
 
-class _SafeHTTPSConnectionPool(HTTPSConnectionPool):
+class _SafeHTTPSConnectionPool(_StatsPoolMixin, HTTPSConnectionPool):
     ConnectionCls = _SafeHTTPSConnection
 
 
+class _SafePoolManager(PoolManager):
+    def __init__(
+        self,
+        *args: Any,
+        host_maxsize: Optional[Mapping[str, int]] = None,
+        stats: Optional[PoolStats] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.host_maxsize = {
+            str(host).lower(): max(1, int(size)) for host, size in (host_maxsize or {}).items()
+        }
+        self.stats = stats
+        self.pool_classes_by_scheme = {
+            "http": _SafeHTTPConnectionPool,
+            "https": _SafeHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        maxsize = self.host_maxsize.get(str(host).lower())
+        if maxsize is not None:
+            if request_context is None:
+                request_context = self.connection_pool_kw.copy()
+            else:
+                request_context = dict(request_context)
+            request_context["maxsize"] = maxsize
+        pool = super()._new_pool(scheme, host, port, request_context)
+        if isinstance(pool, _StatsPoolMixin):
+            pool.stats = self.stats
+        return pool
+
+
 class _SafeHTTPAdapter(HTTPAdapter):
+    """Transport adapter with SSRF-checked connections and per-host keep-alive pools.
+
+    ``pool_maxsize`` bounds idle keep-alive connections kept per host; ``host_maxsize``
+    overrides it for individual hosts (e.g. an image CDN fetched in parallel).
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        host_maxsize: Optional[Mapping[str, int]] = None,
+        stats: Optional[PoolStats] = None,
+    ):
+        self._host_maxsize = dict(host_maxsize or {})
+        self.stats = stats
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
     def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
-        self.poolmanager = PoolManager(
+        self.poolmanager = _SafePoolManager(
             num_pools=connections,
             maxsize=maxsize,
             block=block,
+            host_maxsize=getattr(self, "_host_maxsize", None),
+            stats=getattr(self, "stats", None),
             **pool_kwargs,
         )
-        self.poolmanager.pool_classes_by_scheme = {
-            "http": _SafeHTTPConnectionPool,
-            "https": _SafeHTTPSConnectionPool,
-        }
 
     def proxy_manager_for(self, proxy, **proxy_kwargs):
         manager = super().proxy_manager_for(proxy, **proxy_kwargs)
@@ -352,11 +660,7 @@ class _SafeHTTPAdapter(HTTPAdapter):
         return manager
 
 
-def _resolve_host(hostname: str, port: Optional[int]) -> list[str]:
-    try:
-        return [str(ipaddress.ip_address(hostname))]
-    except ValueError:
-        pass
+def _getaddrinfo_addresses(hostname: str, port: Optional[int]) -> list[str]:
     try:
         infos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
     except OSError as exc:
@@ -371,6 +675,75 @@ def _resolve_host(hostname: str, port: Optional[int]) -> list[str]:
     return addresses
 
 
+class DnsCache:
+    """TTL-bounded cache of successful ``getaddrinfo`` results.
+
+    Only the lookup is cached: callers still vet every cached address with
+    ``_is_public_ip`` and connected sockets are re-checked against their real peer,
+    so a stale or rebound record cannot reach a private address. Failed lookups are
+    never cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DNS_CACHE_TTL_SECONDS,
+        max_entries: int = DNS_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = max(0.0, float(ttl))
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Optional[int]], Tuple[float, Tuple[str, ...]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, hostname: str, port: Optional[int]) -> list[str]:
+        key = (hostname.lower(), port)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        addresses = _getaddrinfo_addresses(hostname, port)
+        if self.ttl > 0:
+            with self._lock:
+                if len(self._entries) >= self.max_entries and key not in self._entries:
+                    self._prune(now)
+                self._entries[key] = (now + self.ttl, tuple(addresses))
+        return addresses
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            oldest = min(self._entries, key=lambda item: self._entries[item][0])
+            del self._entries[oldest]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+DNS_CACHE = DnsCache()
+
+
+def _resolve_host(hostname: str, port: Optional[int]) -> list[str]:
+    try:
+        return [str(ipaddress.ip_address(hostname))]
+    except ValueError:
+        pass
+    return DNS_CACHE.resolve(hostname, port)
+
+
 def validate_outbound_url(url: object) -> str:
     text = str(url or "").strip()
     parsed = urlparse(text)
@@ -387,13 +760,61 @@ def validate_outbound_url(url: object) -> str:
     return text
 
 
+def _check_content_length(response: object, url: str, max_bytes: int) -> None:
+    response_headers = getattr(response, "headers", {}) or {}
+    content_length = (
+        response_headers.get("content-length") if hasattr(response_headers, "get") else None
+    )
+    if content_length:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            return
+        if declared > max_bytes:
+            raise ResponseTooLargeError(
+                f"Response from {redact_url(url)} exceeded {max_bytes} bytes"
+            )
+
+
+def _load_requests_cache() -> Any:
+    global requests_cache
+    if requests_cache is None:
+        try:
+            import requests_cache as module
+        except Exception:  # pragma: no cover - requests_cache is optional in host tests
+            return None
+        requests_cache = module
+    return requests_cache
+
+
+class ImageBlobCache(Protocol):
+    def get(self, url: str) -> Optional[bytes]: ...
+
+    def put(self, url: str, content: bytes) -> None: ...
+
+
 class BooruSession:
-    def __init__(self, *, use_cache: bool = False, expire_after: int = 3600):
+    def __init__(
+        self,
+        *,
+        use_cache: bool = False,
+        expire_after: int = 3600,
+        image_cache: Optional[ImageBlobCache] = None,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        host_pool_maxsize: Optional[Mapping[str, int]] = None,
+        rate_limiter: Optional[rb_rate_limit.HostRateLimiter] = None,
+    ):
         session_factory = getattr(requests, "Session", None)
         self._cache_enabled = bool(use_cache)
+        self.image_cache = image_cache
+        self._pool_maxsize = max(1, int(pool_maxsize))
+        self._host_pool_maxsize = dict(host_pool_maxsize or {})
+        self._pool_stats = PoolStats()
+        self.rate_limiter = rate_limiter or rb_rate_limit.RATE_LIMITER
         self._uncached_session = session_factory() if callable(session_factory) else requests
         self._install_safe_adapter(self._uncached_session)
         if use_cache:
+            requests_cache = _load_requests_cache()
             if requests_cache is None:
                 raise RuntimeError("requests-cache is required when booru request cache is enabled")
             cached_session = getattr(requests_cache, "CachedSession", None)
@@ -409,19 +830,47 @@ class BooruSession:
             return
         self._session = self._uncached_session
 
-    @staticmethod
-    def _install_safe_adapter(session: object) -> None:
+    def _install_safe_adapter(self, session: object) -> None:
         mount = getattr(session, "mount", None)
         if callable(mount):
-            adapter = _SafeHTTPAdapter()
+            adapter = _SafeHTTPAdapter(
+                pool_maxsize=self._pool_maxsize,
+                host_maxsize=self._host_pool_maxsize,
+                stats=self._pool_stats,
+            )
             mount("http://", adapter)
             mount("https://", adapter)
 
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        return self.rate_limiter.stats()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        totals: Dict[str, Any] = dict(self._pool_stats.totals())
+        totals["hosts"] = self._pool_stats.snapshot()
+        return totals
+
     def _session_for_url(self, url: str):
         if self._cache_enabled and _has_sensitive_query(url):
             return self._uncached_session
         return self._session
 
+    def _cache_has_fresh(self, session: object, url: str, headers: Mapping[str, str]) -> bool:
+        """Whether requests-cache will answer ``url`` without a network round trip."""
+        if session is self._uncached_session:
+            return False
+        cache = getattr(session, "cache", None)
+        create_key = getattr(cache, "create_key", None)
+        get_response = getattr(cache, "get_response", None)
+        if not callable(create_key) or not callable(get_response):
+            return False
+        try:
+            cached = get_response(
+                create_key(requests.Request("GET", url, headers=headers).prepare())
+            )
+        except Exception:
+            return False
+        return cached is not None and getattr(cached, "is_expired", True) is False
+
     def get(
         self,
         url: str,
@@ -429,12 +878,13 @@ class BooruSession:
         headers: Optional[Mapping[str, str]] = None,
         timeout: int = 30,
         stream: bool = False,
+        bypass_response_cache: bool = False,
     ):
         try:
             current_url = validate_outbound_url(url)
             request_headers = dict(headers or {})
             history_urls = []
-            chain_is_sensitive = _has_sensitive_query(current_url)
+            chain_is_sensitive = bypass_response_cache or _has_sensitive_query(current_url)
 
             for _ in range(MAX_REDIRECTS + 1):
                 if chain_is_sensitive:
@@ -444,6 +894,10 @@ class BooruSession:
 
                 history_urls.append((session, current_url))
 
+                # Cache hits don't reach the host, so they don't spend its tokens.
+                cached = self._cache_has_fresh(session, current_url, request_headers)
+                if not cached:
+                    self.rate_limiter.acquire(current_url)
                 response = session.get(
                     current_url,
                     headers=request_headers,
@@ -452,6 +906,13 @@ class BooruSession:
                     stream=stream,
                 )
                 status_code = getattr(response, "status_code", None)
+                if getattr(response, "from_cache", False) is not True:
+                    if cached:
+                        # The entry expired in between; the request went out after all.
+                        self.rate_limiter.acquire(current_url)
+                    self.rate_limiter.observe(
+                        current_url, status_code, getattr(response, "headers", None)
+                    )
                 if status_code not in REDIRECT_STATUSES:
                     return response
                 location = (getattr(response, "headers", {}) or {}).get("location")
@@ -464,6 +925,8 @@ class BooruSession:
 
                     if chain_is_sensitive:
                         for hist_session, hist_url in history_urls:
+                            if hist_session is self._uncached_session:
+                                continue
                             delete_fn = getattr(hist_session, "delete", None)
                             if callable(delete_fn):
                                 try:
@@ -482,18 +945,13 @@ class BooruSession:
             raise sanitize_exception(exc) from None
 
     def _read_bounded_response(self, response: object, url: str, max_bytes: int) -> bytes:
-        response_headers = getattr(response, "headers", {}) or {}
-        content_length = (
-            response_headers.get("content-length") if hasattr(response_headers, "get") else None
-        )
-        if content_length:
-            try:
-                if int(content_length) > max_bytes:
-                    raise ResponseTooLargeError(
-                        f"Response from {redact_url(url)} exceeded {max_bytes} bytes"
-                    )
-            except ValueError:
-                pass
+        try:
+            _check_content_length(response, url, max_bytes)
+        except Exception:
+            close = getattr(response, "close", None)
+            if callable(close):
+                close()
+            raise
 
         chunks: list[bytes] = []
         total = 0
@@ -522,6 +980,34 @@ class BooruSession:
             if callable(close):
                 close()
 
+    def _stream_bounded_response(
+        self, response: object, url: str, max_bytes: int
+    ) -> StreamedResponse:
+        """Wrap a ``stream=True`` response so its body is parsed as it arrives."""
+        try:
+            _check_content_length(response, url, max_bytes)
+        except Exception:
+            close = getattr(response, "close", None)
+            if callable(close):
+                close()
+            raise
+        iter_content = getattr(response, "iter_content", None)
+        if callable(iter_content):
+            chunks: Iterable[bytes] = iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        else:
+            chunks = (getattr(response, "content", b"") or b"",)
+        close = getattr(response, "close", None)
+        body = BoundedStream(
+            chunks, url, max_bytes, on_close=close if callable(close) else None, retain=False
+        )
+        return StreamedResponse(
+            url=str(getattr(response, "url", url) or url),
+            status_code=int(getattr(response, "status_code", 200) or 200),
+            headers=getattr(response, "headers", {}) or {},
+            body=body,
+            encoding=getattr(response, "encoding", None),
+        )
+
     def get_json(
         self,
         url: str,
@@ -529,7 +1015,9 @@ class BooruSession:
         headers: Optional[Mapping[str, str]] = None,
         timeout: int = 30,
         max_bytes: int = DEFAULT_API_MAX_BYTES,
+        fields: Optional[Iterable[str]] = None,
     ) -> Any:
+        """Fetch and parse a JSON body; ``fields`` projects each post (see project_fields)."""
         response = self.get(url, headers=headers, timeout=timeout, stream=True)
         try:
             response.raise_for_status()
@@ -545,9 +1033,11 @@ class BooruSession:
             content = self._read_bounded_response(response, url, max_bytes)
             encoding = getattr(response, "encoding", None)
             try:
-                return json.loads(content.decode(encoding or "utf-8"))
+                payload = json_loads(content, encoding)
             except Exception as exc:
                 raise BooruResponseError(sanitize_exception_text(str(exc))) from exc
+            del content
+            return project_fields(payload, fields)
         except Exception:
             close = getattr(response, "close", None)
             if callable(close):
@@ -579,15 +1069,27 @@ class BooruSession:
                 close()
             raise
 
-    def get_bytes(
+    def _image_cache_for(self, url: str) -> Optional[ImageBlobCache]:
+        if self.image_cache is None or _has_sensitive_query(url):
+            return None
+        return self.image_cache
+
+    def _open_image_response(
         self,
         url: str,
         *,
-        headers: Optional[Mapping[str, str]] = None,
-        timeout: int = 30,
-        max_bytes: int = 25 * 1024 * 1024,
-    ) -> bytes:
-        response = self.get(url, headers=headers, timeout=timeout, stream=True)
+        headers: Optional[Mapping[str, str]],
+        timeout: int,
+        max_bytes: int,
+        bypass_response_cache: bool,
+    ):
+        response = self.get(
+            url,
+            headers=headers,
+            timeout=timeout,
+            stream=True,
+            bypass_response_cache=bypass_response_cache,
+        )
         try:
             response.raise_for_status()
             response_headers = getattr(response, "headers", {}) or {}
@@ -598,15 +1100,126 @@ class BooruSession:
                 raise InvalidContentTypeError(
                     f"Response from {redact_url(url)} was not an image ({content_type})"
                 )
-            return self._read_bounded_response(response, url, max_bytes)
+            _check_content_length(response, url, max_bytes)
         except Exception:
             close = getattr(response, "close", None)
             if callable(close):
                 close()
             raise
+        return response
+
+    def get_bytes(
+        self,
+        url: str,
+        *,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: int = 30,
+        max_bytes: int = 25 * 1024 * 1024,
+    ) -> bytes:
+        image_cache = self._image_cache_for(url)
+        if image_cache is not None:
+            cached = image_cache.get(url)
+            if cached is not None and len(cached) <= max_bytes:
+                return cached
+        response = self._open_image_response(
+            url,
+            headers=headers,
+            timeout=timeout,
+            max_bytes=max_bytes,
+            bypass_response_cache=image_cache is not None,
+        )
+        content = self._read_bounded_response(response, url, max_bytes)
+        if image_cache is not None:
+            try:
+                image_cache.put(url, content)
+            except Exception:
+                pass
+        return content
+
+    def open_image_stream(
+        self,
+        url: str,
+        *,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: int = 30,
+        max_bytes: int = 25 * 1024 * 1024,
+    ) -> BoundedStream:
+        """Open an image for incremental decoding, e.g. ``Image.open(stream)``.
+
+        Use it as a context manager: the body is only downloaded as far as the reader
+        gets, and it is stored in the image cache once the block exits cleanly.
+        """
+        image_cache = self._image_cache_for(url)
+        if image_cache is not None:
+            cached = image_cache.get(url)
+            if cached is not None and len(cached) <= max_bytes:
+                return BoundedStream((cached,), url, max_bytes)
+        response = self._open_image_response(
+            url,
+            headers=headers,
+            timeout=timeout,
+            max_bytes=max_bytes,
+            bypass_response_cache=image_cache is not None,
+        )
+        iter_content = getattr(response, "iter_content", None)
+        if callable(iter_content):
+            chunks: Iterable[bytes] = iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        else:
+            chunks = (getattr(response, "content", b"") or b"",)
+        close = getattr(response, "close", None)
+        return BoundedStream(
+            chunks,
+            url,
+            max_bytes,
+            on_complete=(
+                (lambda content: image_cache.put(url, content)) if image_cache is not None else None
+            ),
+            on_close=close if callable(close) else None,
+        )
 
     def close(self) -> None:
         for session in (self._session, self._uncached_session):
             close = getattr(session, "close", None)
             if callable(close):
                 close()
+
+
+class SessionManager:
+    """Keeps one long-lived BooruSession per (cache enabled, expire_after) setting.
+
+    Reusing the session across generations keeps warm keep-alive pools and the
+    opened requests-cache backend; a new session is only built when the settings
+    change, and every session is closed by ``close_all``.
+    """
+
+    def __init__(self, factory: Callable[..., BooruSession] = BooruSession):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._sessions: Dict[Tuple[bool, int], BooruSession] = {}
+
+    def acquire(
+        self,
+        *,
+        use_cache: bool = False,
+        expire_after: int = 3600,
+        image_cache: Optional[ImageBlobCache] = None,
+    ) -> BooruSession:
+        key = (bool(use_cache), int(expire_after))
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._factory(
+                    use_cache=key[0], expire_after=key[1], image_cache=image_cache
+                )
+                self._sessions[key] = session
+            return session
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
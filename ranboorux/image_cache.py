@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_DECODED_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_BLOB_SUFFIX = ".bin"
+
+
+@dataclass
+class _DiskEntry:
+    path: str
+    size: int
+    digest: str
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(str(url).encode("utf-8")).hexdigest()
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class DiskImageCache:
+    """Size-bounded on-disk store for downloaded source image bytes.
+
+    Blobs live at ``<root>/<key[:2]>/<key>-<sha256>.bin`` where ``key`` hashes the URL
+    and the suffix hashes the content, so a truncated or edited file is detected and
+    dropped on read. Least recently used blobs are evicted once ``max_bytes`` is hit.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, _DiskEntry]"] = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _scan(self) -> "OrderedDict[str, _DiskEntry]":
+        if self._entries is not None:
+            return self._entries
+        found = []
+        if os.path.isdir(self.root):
+            for shard in os.listdir(self.root):
+                shard_dir = os.path.join(self.root, shard)
+                if len(shard) != 2 or not os.path.isdir(shard_dir):
+                    continue
+                for name in os.listdir(shard_dir):
+                    if not name.endswith(_BLOB_SUFFIX):
+                        continue
+                    key, _, digest = name[: -len(_BLOB_SUFFIX)].partition("-")
+                    if not key or not digest:
+                        continue
+                    path = os.path.join(shard_dir, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, key, _DiskEntry(path, stat.st_size, digest)))
+        found.sort(key=lambda item: item[0])
+        entries: "OrderedDict[str, _DiskEntry]" = OrderedDict()
+        for _mtime, key, entry in found:
+            stale = entries.pop(key, None)
+            if stale is not None:
+                self._remove_file(stale.path)
+            entries[key] = entry
+        self._entries = entries
+        self._total_bytes = sum(entry.size for entry in entries.values())
+        return entries
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _drop(self, key: str) -> None:
+        entries = self._scan()
+        entry = entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+            self._remove_file(entry.path)
+
+    def get(self, url: str) -> Optional[bytes]:
+        key = url_key(url)
+        with self._lock:
+            entry = self._scan().get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+        try:
+            with open(entry.path, "rb") as handle:
+                content = handle.read()
+        except OSError:
+            content = None
+        with self._lock:
+            if content is None or content_digest(content) != entry.digest:
+                self._drop(key)
+                self.misses += 1
+                return None
+            entries = self._scan()
+            if key in entries:
+                entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(entry.path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, url: str, content: bytes) -> None:
+        size = len(content)
+        if not content or size > self.max_bytes:
+            return
+        key = url_key(url)
+        digest = content_digest(content)
+        shard_dir = os.path.join(self.root, key[:2])
+        path = os.path.join(shard_dir, f"{key}-{digest}{_BLOB_SUFFIX}")
+        os.makedirs(shard_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=shard_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            self._remove_file(temp_path)
+            raise
+        with self._lock:
+            entries = self._scan()
+            previous = entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.size
+                if previous.path != path:
+                    self._remove_file(previous.path)
+            entries[key] = _DiskEntry(path, size, digest)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and entries:
+                oldest_key = next(iter(entries))
+                self._drop(oldest_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._scan().keys()):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._scan()
+            return {
+                "entries": len(entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def decoded_image_key(booru_name: object, post: Dict[str, Any]) -> Optional[Tuple[str, str, str]]:
+    file_url = post.get("file_url") if isinstance(post, dict) else None
+    if not file_url:
+        return None
+    post_id = post.get("id")
+    return (str(booru_name or "").lower(), "" if post_id is None else str(post_id), str(file_url))
+
+
+def decoded_image_bytes(image: object) -> int:
+    size = getattr(image, "size", None)
+    if isinstance(size, tuple) and len(size) == 2:
+        width, height = size
+    else:
+        width, height = getattr(image, "width", 0), getattr(image, "height", 0)
+    getbands = getattr(image, "getbands", None)
+    try:
+        bands = len(getbands()) if callable(getbands) else 3
+    except Exception:
+        bands = 3
+    try:
+        return max(1, int(width) * int(height) * max(1, bands))
+    except (TypeError, ValueError):
+        return 1
+
+
+class DecodedImageCache:
+    """Memory-bounded LRU of decoded source images shared across generations.
+
+    Entries are sized by their pixel buffer (``width * height * bands``) and evicted
+    least recently used first once the byte budget is exceeded. Cached images are
+    shared references, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_DECODED_CACHE_MAX_BYTES):
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Optional[Hashable]) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Optional[Hashable], image: Any) -> None:
+        if key is None or image is None:
+            return
+        size = decoded_image_bytes(image)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (image, size)
+            self._total_bytes += size
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            _key, (_image, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
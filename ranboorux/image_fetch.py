@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlparse
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 4
+NON_IMAGE_EXTENSIONS = (".mp4", ".webm", ".zip", ".swf")
+
+T = TypeVar("T")
+
+
+@dataclass
+class FetchOutcome(Generic[T]):
+    url: Optional[str]
+    value: Optional[T] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.value is not None
+
+
+class HostLimiter:
+    """Caps how many downloads may hit the same host at once."""
+
+    def __init__(self, per_host: int = DEFAULT_PER_HOST_LIMIT):
+        self._per_host = max(1, int(per_host))
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore_for(self, url: str) -> threading.BoundedSemaphore:
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self._per_host)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        semaphore = self._semaphore_for(url)
+        with semaphore:
+            yield
+
+
+def fetch_concurrently(
+    urls: Sequence[Optional[str]],
+    fetch: Callable[[str], T],
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+) -> List[FetchOutcome[T]]:
+    """Run ``fetch`` once per unique URL on a bounded pool, keeping input order.
+
+    Repeated URLs share the first occurrence's outcome, so a batch that reuses one
+    source image downloads and decodes it once. Empty entries are passed through
+    untouched and a failure in one download is recorded on its own outcome instead
+    of aborting the batch.
+    """
+    outcomes: List[FetchOutcome[T]] = [FetchOutcome(url=url) for url in urls]
+    first_index: Dict[str, int] = {}
+    for index, url in enumerate(urls):
+        if url and url not in first_index:
+            first_index[url] = index
+    pending = list(first_index.values())
+    if not pending:
+        return outcomes
+
+    limiter = HostLimiter(per_host_limit)
+
+    def _run(index: int) -> None:
+        url = urls[index] or ""
+        try:
+            with limiter.slot(url):
+                outcomes[index].value = fetch(url)
+        except Exception as exc:
+            outcomes[index].error = exc
+
+    workers = max(1, min(int(max_workers), len(pending)))
+    if workers == 1:
+        for index in pending:
+            _run(index)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ranboorux-fetch") as pool:
+            list(pool.map(_run, pending))
+
+    for index, url in enumerate(urls):
+        if not url:
+            continue
+        leader = first_index[url]
+        if leader != index:
+            outcomes[index].value = outcomes[leader].value
+            outcomes[index].error = outcomes[leader].error
+    return outcomes
+
+
+def unique_url_count(urls: Sequence[Optional[str]]) -> int:
+    return len({url for url in urls if url})
+
+
+@dataclass(frozen=True)
+class Rendition:
+    kind: str
+    url: Optional[str]
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    @property
+    def pixels(self) -> int:
+        return (self.width or 0) * (self.height or 0)
+
+
+def select_rendition(
+    post: Mapping[str, Any], target: Optional[Tuple[int, int]] = None
+) -> Rendition:
+    """Pick the smallest rendition of a post that still covers ``target`` (w, h).
+
+    Falls back to the original file when there is no target, when the original size
+    is unknown, or when no downscaled copy is large enough.
+    """
+    original = Rendition(
+        "original", post.get("file_url"), post.get("width") or None, post.get("height") or None
+    )
+    if not target or not original.pixels:
+        return original
+    target_width, target_height = target
+    best = original
+    for entry in post.get("renditions") or ():
+        if not isinstance(entry, Mapping):
+            continue
+        candidate = Rendition(
+            str(entry.get("kind") or "sample"),
+            entry.get("url"),
+            entry.get("width"),
+            entry.get("height"),
+        )
+        url = (candidate.url or "").lower().split("?", 1)[0]
+        if not url or url.endswith(NON_IMAGE_EXTENSIONS):
+            continue
+        if (candidate.width or 0) < target_width or (candidate.height or 0) < target_height:
+            continue
+        if candidate.pixels < best.pixels:
+            best = candidate
+    return best
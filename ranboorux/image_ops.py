@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Optional, Tuple
 
 from PIL import Image
 
@@ -28,3 +28,44 @@ def resize_image(
         bottom = (new_height + height) / 2
         return img_resized.crop((left, top, right, bottom))
     return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def orientation_label(width: int, height: int) -> str:
+    aspect_ratio = width / height
+    if aspect_ratio > 1.33:
+        return "Wide"
+    if aspect_ratio < 0.75:
+        return "Tall"
+    return "Square-ish"
+
+
+def orientation_target(width: int, height: int) -> Tuple[int, int]:
+    """Img2Img size for a source image when not cropping to the generation size.
+
+    Keeps the aspect ratio with the longer side around 1152 px (min 512 px on the
+    shorter side) and rounds to multiples of 8; square-ish images stay between
+    512 and 1024 px.
+    """
+    aspect_ratio = width / height
+    label = orientation_label(width, height)
+    if label == "Wide":
+        target_width = 1152
+        target_height = int(target_width / aspect_ratio)
+        if target_height < 512:
+            target_height = 512
+            target_width = int(target_height * aspect_ratio)
+        return (target_width // 8) * 8, (target_height // 8) * 8
+    if label == "Tall":
+        target_height = 1152
+        target_width = int(target_height * aspect_ratio)
+        if target_width < 512:
+            target_width = 512
+            target_height = int(target_width / aspect_ratio)
+        return (target_width // 8) * 8, (target_height // 8) * 8
+    max_dim = max(width, height)
+    if max_dim > 1024:
+        return 1024, 1024
+    if max_dim < 512:
+        return 512, 512
+    max_dim = (max_dim // 8) * 8
+    return max_dim, max_dim
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Optional
+
+HEADER_PROBE_BYTES = 64 * 1024
+HEADER_PROBE_STEP = 4 * 1024
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOF markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) share the range.
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    format: str
+    width: int
+    height: int
+    animated: bool = False
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+def _probe_png(data: bytes) -> Optional[ImageHeader]:
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", data[16:24])
+    # APNG announces itself with an acTL chunk before the first IDAT.
+    offset = 8
+    while offset + 8 <= len(data):
+        length = struct.unpack(">I", data[offset : offset + 4])[0]
+        chunk_type = data[offset + 4 : offset + 8]
+        if chunk_type == b"acTL":
+            return ImageHeader("PNG", width, height, animated=True)
+        if chunk_type == b"IDAT":
+            break
+        offset += 12 + length
+    return ImageHeader("PNG", width, height)
+
+
+def _probe_jpeg(data: bytes) -> Optional[ImageHeader]:
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        length = struct.unpack(">H", data[offset + 2 : offset + 4])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5 : offset + 9])
+            return ImageHeader("JPEG", width, height)
+        if marker == 0xDA:
+            return None
+        offset += 2 + length
+    return None
+
+
+def _probe_webp(data: bytes) -> Optional[ImageHeader]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8X":
+        flags = data[20]
+        width = 1 + int.from_bytes(data[24:27], "little")
+        height = 1 + int.from_bytes(data[27:30], "little")
+        return ImageHeader("WEBP", width, height, animated=bool(flags & 0x02))
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[26:30])
+        return ImageHeader("WEBP", width & 0x3FFF, height & 0x3FFF)
+    if chunk == b"VP8L" and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], "little")
+        return ImageHeader("WEBP", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    return None
+
+
+def probe_header(data: bytes) -> Optional[ImageHeader]:
+    """Read dimensions (and animation for PNG/WebP) from the leading bytes of an image.
+
+    Returns ``None`` when the format is unknown or more bytes are needed.
+    """
+    if data.startswith(_PNG_SIGNATURE):
+        return _probe_png(data)
+    if data.startswith(b"\xff\xd8"):
+        return _probe_jpeg(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _probe_webp(data)
+    return None
+
+
+def probe_stream(stream: Any, limit: int = HEADER_PROBE_BYTES) -> Optional[ImageHeader]:
+    """Probe a seekable stream a few KB at a time, then rewind it to the start."""
+    data = b""
+    header = None
+    try:
+        while len(data) < limit:
+            chunk = stream.read(min(HEADER_PROBE_STEP, limit - len(data)))
+            if not chunk:
+                break
+            data += chunk
+            header = probe_header(data)
+            if header is not None:
+                break
+    finally:
+        stream.seek(0)
+    return header
+
+
+def rejection_reason(
+    width: int,
+    height: int,
+    *,
+    max_pixels: int,
+    animated: bool = False,
+    allow_animated: bool = False,
+) -> Optional[str]:
+    if width <= 0 or height <= 0:
+        return "image has invalid dimensions"
+    if width * height > max_pixels:
+        return f"image exceeds {max_pixels} pixels ({width}x{height})"
+    if animated and not allow_animated:
+        return "image is animated"
+    return None
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_RATE = 8.0
+DEFAULT_BURST = 8
+# Documented or observed read limits for the booru API hosts (requests/second, burst).
+HOST_LIMITS: Dict[str, Tuple[float, int]] = {
+    "danbooru.donmai.us": (10.0, 10),
+    "api.rule34.xxx": (3.0, 3),
+    "e621.net": (2.0, 2),
+    "gelbooru.com": (4.0, 4),
+}
+MIN_RATE = 0.2
+THROTTLE_STATUSES = {429, 503}
+DEFAULT_THROTTLE_DELAY = 1.0
+MAX_BLOCK_SECONDS = 120.0
+# Reset headers larger than this are epoch timestamps rather than delta seconds.
+_EPOCH_THRESHOLD = 1_000_000_000
+
+
+def _header(headers: Optional[Mapping[str, Any]], name: str) -> Optional[str]:
+    if not headers or not hasattr(headers, "get"):
+        return None
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    return None if value is None else str(value).strip()
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse a ``Retry-After`` value (delta seconds or HTTP date) into seconds from now."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+def _reset_delay(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return parse_retry_after(value)
+    if reset > _EPOCH_THRESHOLD:
+        reset -= time.time()
+    return max(0.0, reset)
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts to server feedback.
+
+    ``reserve`` takes a token and returns how long the caller has to wait for it, so
+    concurrent callers queue up at ``rate`` per second instead of bursting together.
+    Throttle responses halve the rate and block the bucket for the server's requested
+    delay; each successful response recovers a tenth of the configured rate.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rate = max(MIN_RATE, float(rate))
+        self.rate = self.max_rate
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._last = clock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._last:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1.0
+            # ``_last`` sits in the future while the bucket is blocked.
+            ready_at = self._last + max(0.0, -self._tokens) / self.rate
+            return max(0.0, ready_at - now)
+
+    def block_for(self, seconds: float) -> float:
+        """Hold every request for at least ``seconds``; returns the effective block."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            until = now + min(MAX_BLOCK_SECONDS, max(0.0, float(seconds)))
+            if until > self._last:
+                self._last = until
+                self._tokens = min(self._tokens, 1.0)
+            return max(0.0, self._last - now)
+
+    def throttle(self, retry_after: Optional[float] = None) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = max(MIN_RATE, self.rate / 2.0)
+        return self.block_for(DEFAULT_THROTTLE_DELAY if retry_after is None else retry_after)
+
+    def recover(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(self._clock())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10.0)
+
+
+class HostRateLimiter:
+    """Shares one adaptive token bucket per host across sessions, threads and runs.
+
+    Callers ``acquire`` before each request and ``observe`` the response, which reads
+    ``Retry-After`` and ``X-RateLimit-Remaining``/``-Reset`` style headers. Retry
+    loops call ``backoff`` instead of sleeping, so the delay is applied to every
+    request to that host. Time spent waiting is recorded per host for ``stats``.
+    """
+
+    def __init__(
+        self,
+        default_rate: float = DEFAULT_RATE,
+        default_burst: int = DEFAULT_BURST,
+        host_limits: Optional[Mapping[str, Tuple[float, int]]] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.default_rate = float(default_rate)
+        self.default_burst = int(default_burst)
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return (urlparse(str(url)).hostname or "").lower()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = self._host(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(host, (self.default_rate, self.default_burst))
+                bucket = TokenBucket(rate, burst, clock=self._clock)
+                self._buckets[host] = bucket
+                self._stats[host] = {
+                    "requests": 0,
+                    "waits": 0,
+                    "waited_seconds": 0.0,
+                    "throttled": 0,
+                    "retries": 0,
+                }
+            return bucket
+
+    def _record(self, url: str, **changes: float) -> None:
+        host = self._host(url)
+        with self._lock:
+            entry = self._stats.get(host)
+            if entry is None:
+                return
+            for key, value in changes.items():
+                entry[key] += value
+
+    def acquire(self, url: str) -> float:
+        """Block until a request to ``url``'s host is allowed; returns seconds waited."""
+        wait = self.bucket_for(url).reserve()
+        if wait > 0:
+            self._sleep(wait)
+            self._record(url, requests=1, waits=1, waited_seconds=wait)
+        else:
+            self._record(url, requests=1)
+        return wait
+
+    def observe(self, url: str, status_code: object, headers: Optional[Mapping[str, Any]]) -> None:
+        bucket = self.bucket_for(url)
+        if status_code in THROTTLE_STATUSES:
+            bucket.throttle(parse_retry_after(_header(headers, "Retry-After")))
+            self._record(url, throttled=1)
+            return
+        remaining = _header(headers, "X-RateLimit-Remaining") or _header(
+            headers, "RateLimit-Remaining"
+        )
+        if remaining is not None:
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                exhausted = False
+            if exhausted:
+                delay = _reset_delay(
+                    _header(headers, "X-RateLimit-Reset") or _header(headers, "RateLimit-Reset")
+                )
+                bucket.block_for(DEFAULT_THROTTLE_DELAY if delay is None else delay)
+                return
+        if isinstance(status_code, int) and status_code < 400:
+            bucket.recover()
+
+    def backoff(self, url: str, attempt: int, *, base: float = 1.0, cap: float = 30.0) -> float:
+        """Delay the host exponentially after a failed ``attempt`` (1-based).
+
+        A longer ``Retry-After`` already recorded by ``observe`` wins. Returns the
+        delay the next ``acquire`` will apply.
+        """
+        delay = min(float(cap), float(base) * (2 ** max(0, int(attempt) - 1)))
+        self._record(url, retries=1)
+        return self.bucket_for(url).block_for(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hosts = {
+                host: dict(entry, rate=round(self._buckets[host].rate, 3))
+                for host, entry in self._stats.items()
+            }
+        totals: Dict[str, Any] = {
+            key: sum(entry[key] for entry in hosts.values())
+            for key in ("requests", "waits", "waited_seconds", "throttled", "retries")
+        }
+        totals["hosts"] = hosts
+        return totals
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._stats.clear()
+
+
+RATE_LIMITER = HostRateLimiter()
@@ -69,6 +69,7 @@ UI_ARGUMENT_FIELDS: Tuple[str, ...] = (
     "lora_blacklist",
     "anima_auto_detect",
     "anima_tune_img2img",
+    "decoded_image_cache_mb",
 )
 
 
@@ -91,6 +92,7 @@ class ImageWorkflowOptions:
     use_same_seed: object
     reuse_cached_posts: object
     use_cache: object
+    decoded_image_cache_mb: object
 
 
 @dataclass(frozen=True)
@@ -193,6 +195,7 @@ class RunOptions:
     lora_blacklist: object
     anima_auto_detect: bool = True
     anima_tune_img2img: bool = True
+    decoded_image_cache_mb: object = 256
 
     @classmethod
     def from_script_args(cls, args: Sequence[object]) -> "RunOptions":
@@ -227,6 +230,7 @@ class RunOptions:
             use_same_seed=self.use_same_seed,
             reuse_cached_posts=self.reuse_cached_posts,
             use_cache=self.use_cache,
+            decoded_image_cache_mb=self.decoded_image_cache_mb,
         )
 
     @property
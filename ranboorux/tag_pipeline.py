@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import random
 import re
 import unicodedata
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Protocol, Set, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Set, Tuple, Union
 
 # --- Regex Patterns ---
 _DASH_UNDERSCORE_RE = re.compile(r"[_\-]+")
@@ -345,6 +346,67 @@ _SUBJECT_TAGS = {
     "4people",
 }
 
+# Removed when "remove bad tags" is on: text, watermarks, censoring and meta tags.
+DEFAULT_BAD_TAGS = (
+    "mixed-language_text",
+    "watermark",
+    "text",
+    "english_text",
+    "speech_bubble",
+    "signature",
+    "artist_name",
+    "censored",
+    "bar_censor",
+    "translation",
+    "twitter_username",
+    "twitter_logo",
+    "patreon_username",
+    "commentary_request",
+    "tagme",
+    "commentary",
+    "character_name",
+    "mosaic_censoring",
+    "instagram_username",
+    "text_focus",
+    "english_commentary",
+    "comic",
+    "translation_request",
+    "fake_text",
+    "translated",
+    "paid_reward_available",
+    "thought_bubble",
+    "multiple_views",
+    "silent_comic",
+    "out-of-frame_censoring",
+    "symbol-only_commentary",
+    "3koma",
+    "2koma",
+    "character_watermark",
+    "spoken_question_mark",
+    "japanese_text",
+    "spanish_text",
+    "language_text",
+    "fanbox_username",
+    "commission",
+    "original",
+    "ai_generated",
+    "stable_diffusion",
+    "tagme_(artist)",
+    "text_bubble",
+    "qr_code",
+    "chinese_commentary",
+    "korean_text",
+    "partial_commentary",
+    "chinese_text",
+    "copyright_request",
+    "heart_censor",
+    "censored_nipples",
+    "page_number",
+    "scan",
+    "fake_magazine_cover",
+    "korean_commentary",
+)
+
 REMOVAL_SYNONYM_GROUPS_RAW = (
     {"grayscale", "greyscale", "monochrome"},
     {"1girl", "1female", "1woman"},
@@ -365,7 +427,7 @@ class CatalogResolver(Protocol):
     def is_textual(self, tag: str) -> bool: ...
     def is_hair(self, tag: str) -> bool: ...
     def is_eye(self, tag: str) -> bool: ...
-    def category(self, tag: str) -> int: ...
+    def category(self, tag: str) -> Optional[int]: ...
 
 
 # --- Core Tag Pipeline Functions ---
@@ -433,6 +495,21 @@ def normalize_tag(tag: str) -> str:
     return normalized
 
 
+def normalize_cached(tag: str, cache: Dict[str, str], catalog_resolve_alias_fn=None) -> str:
+    """``normalize_tag`` plus catalog alias resolution, memoised in ``cache``."""
+    cached = cache.get(tag)
+    if cached is not None:
+        return cached
+    normalized = normalize_tag(tag)
+    if normalized and catalog_resolve_alias_fn:
+        catalog_token = normalized.replace(" ", "_")
+        canonical = catalog_resolve_alias_fn(catalog_token)
+        if canonical and canonical != catalog_token:
+            normalized = canonical.replace("_", " ")
+    cache[tag] = normalized
+    return normalized
+
+
 def build_synonym_lookup(groups_raw: Iterable[Iterable[str]]) -> Dict[str, Set[str]]:
     lookup: Dict[str, Set[str]] = {}
     for group in groups_raw:
@@ -607,6 +684,48 @@ def extract_color_tags(text: str) -> Tuple[Set[str], Set[str]]:
     return hair_tags, eye_tags
 
 
+def _classified_catalog(catalog: CatalogResolver, keys: List[str]) -> Optional[CatalogResolver]:
+    """Classify ``keys`` in one catalog pass when the catalog supports it."""
+    from ranboorux import catalog as rb_catalog
+
+    return rb_catalog.classified(catalog, keys)
+
+
+def catalog_color_tags(
+    text: str, catalog: Optional[CatalogResolver] = None
+) -> Tuple[Set[str], Set[str]]:
+    """Hair and eye colour tags in ``text``, including catalog aliases of them."""
+    hair_tags: Set[str] = set()
+    eye_tags: Set[str] = set()
+    if not text or not isinstance(text, str):
+        return hair_tags, eye_tags
+    tokens = [token.strip() for token in _TAG_SPLIT_RE.split(text) if token.strip()]
+    normalized_tokens = [
+        (normalize_tag(token) or "").strip().lower() or canonicalize_raw_tag(token)
+        for token in tokens
+    ]
+    if catalog:
+        catalog = _classified_catalog(
+            catalog, [normalized.replace(" ", "_") for normalized in normalized_tokens]
+        )
+    for normalized in normalized_tokens:
+        if not normalized:
+            continue
+        if catalog:
+            token_key = normalized.replace(" ", "_")
+            if catalog.is_hair(token_key):
+                canonical = catalog.resolve_alias(token_key)
+                hair_tags.add(canonical.replace("_", " ") if canonical else normalized)
+            if catalog.is_eye(token_key):
+                canonical = catalog.resolve_alias(token_key)
+                eye_tags.add(canonical.replace("_", " ") if canonical else normalized)
+        if normalized in _HAIR_COLOR_TAGS_NORMALIZED:
+            hair_tags.add(normalized)
+        if normalized in _EYE_COLOR_TAGS_NORMALIZED:
+            eye_tags.add(normalized)
+    return hair_tags, eye_tags
+
+
 def extract_subject_tags(text: str) -> Set[str]:
     if not text:
         return set()
@@ -784,20 +903,6 @@ def normalize_post_tags(
         else:
             buckets[key] = []
 
-    def get_normalized_cached(tag_val: str) -> str:
-        cached = cache.get(tag_val)
-        if cached is not None:
-            return cached
-        normalized = normalize_tag(tag_val)
-        if normalized:
-            if catalog_resolve_alias_fn:
-                catalog_token = normalized.replace(" ", "_")
-                canonical = catalog_resolve_alias_fn(catalog_token)
-                if canonical and canonical != catalog_token:
-                    normalized = canonical.replace("_", " ")
-        cache[tag_val] = normalized
-        return normalized
-
     for key, values in buckets.items():
         cleaned: List[str] = []
         for tag in values:
@@ -807,7 +912,7 @@ def normalize_post_tags(
             if not cleaned_tag:
                 continue
             cleaned.append(cleaned_tag)
-            normalized = get_normalized_cached(cleaned_tag)
+            normalized = normalize_cached(cleaned_tag, cache, catalog_resolve_alias_fn)
             if normalized:
                 normalized_tags.add(normalized)
         buckets[key] = cleaned
@@ -846,23 +951,9 @@ def post_rejected_by_filter(
     _, buckets = normalize_post_tags(post, cache, catalog_resolve_alias_fn)
     primary_subject: Optional[str] = None
 
-    def get_normalized_cached(tag_val: str) -> str:
-        cached = cache.get(tag_val)
-        if cached is not None:
-            return cached
-        normalized = normalize_tag(tag_val)
-        if normalized:
-            if catalog_resolve_alias_fn:
-                catalog_token = normalized.replace(" ", "_")
-                canonical = catalog_resolve_alias_fn(catalog_token)
-                if canonical and canonical != catalog_token:
-                    normalized = canonical.replace("_", " ")
-        cache[tag_val] = normalized
-        return normalized
-
     for bucket_name, tags in buckets.items():
         for raw_tag in tags:
-            normalized_tag = get_normalized_cached(raw_tag)
+            normalized_tag = normalize_cached(raw_tag, cache, catalog_resolve_alias_fn)
             if normalized_tag and normalized_tag in favorites_guard:
                 continue
             canonical_tag = normalized_tag or canonicalize_raw_tag(raw_tag)
@@ -940,3 +1031,231 @@ def post_rejected_by_filter(
                 return True, {**reason_base, "rule": "removal-list"}
 
     return False, None
+
+
+# --- Prompt Assembly ---
+
+_PROMPT_SPLIT_RE = re.compile(r"[\,\t\s]+")
+
+
+def generate_chaos(pos_tags: str, neg_tags: str, chaos_amount: float) -> Tuple[str, str]:
+    pos_tag_list = split_prompt_tags(pos_tags)
+    neg_tag_list = split_prompt_tags(neg_tags)
+    chaos_list = list(set(pos_tag_list + neg_tag_list))
+    if not chaos_list:
+        return pos_tags, neg_tags
+    random.shuffle(chaos_list)
+    len_list = round(len(chaos_list) * chaos_amount)
+    neg_add = chaos_list[:len_list]
+    pos_add = chaos_list[len_list:]
+    final_pos = list(set(pos_tag_list) - set(neg_add)) + pos_add
+    final_neg = list(set(neg_tag_list) - set(pos_add)) + neg_add
+    return ",".join(dedupe_keep_order(final_pos)), ",".join(dedupe_keep_order(final_neg))
+
+
+def _post_removal_sets(
+    post: Optional[Dict[str, object]], remove_artist: bool, remove_character: bool
+) -> Tuple[Set[str], Set[str]]:
+    """Artist and character/copyright tags of ``post`` in raw and normalised form."""
+    if not isinstance(post, dict):
+        return set(), set()
+    artist_meta = [t for t in post.get("artist_tags") or [] if isinstance(t, str)]  # type: ignore[attr-defined]
+    character_meta = [t for t in post.get("character_tags") or [] if isinstance(t, str)]  # type: ignore[attr-defined]
+    artist_norm = {normalize_tag(t) for t in artist_meta}
+    char_norm = {normalize_tag(t) for t in character_meta}
+    copyright_meta = [t for t in post.get("copyright_tags") or [] if isinstance(t, str)]  # type: ignore[attr-defined]
+    if remove_character and copyright_meta:
+        char_norm.update(normalize_tag(t) for t in copyright_meta)
+        char_norm.update((t or "").strip().lower() for t in copyright_meta)
+    artist_norm.update((t or "").strip().lower() for t in artist_meta)
+    char_norm.update((t or "").strip().lower() for t in character_meta)
+    raw_all_tags = post.get("tags") or ""
+    general_tags = (
+        [t.strip() for t in _TAG_SPLIT_RE.split(raw_all_tags) if t.strip()]
+        if isinstance(raw_all_tags, str)
+        else []
+    )
+    if remove_character:
+        for tag in general_tags:
+            tag_norm = normalize_tag(tag)
+            if ("(" in tag and ")" in tag and not tag.strip().startswith("(")) or any(
+                tag_norm.endswith(suffix)
+                for suffix in (" series", " franchise", " character", " characters")
+            ):
+                char_norm.add(tag_norm)
+                char_norm.add(tag.strip().lower())
+    if remove_artist:
+        for tag in general_tags:
+            tag_norm = normalize_tag(tag)
+            if (
+                tag_norm.startswith("artist:")
+                or tag_norm.endswith(" artist")
+                or " drawn by" in tag_norm
+            ):
+                artist_norm.add(tag_norm)
+                artist_norm.add(tag.strip().lower())
+    return artist_norm, char_norm
+
+
+def process_prompt(
+    raw_prompt: str,
+    *,
+    post: Optional[Dict[str, object]],
+    base_positive: str,
+    base_negative: str,
+    initial_additions: str,
+    settings: Tuple[Any, ...],
+    catalog: Optional[CatalogResolver] = None,
+    filter_ctx: Optional[Dict[str, object]] = None,
+    base_colors: Tuple[Set[str], Set[str]] = (set(), set()),
+    subject_text: str = "",
+    cache: Optional[Dict[str, str]] = None,
+) -> Tuple[str, str]:
+    """Turn one post's tags into a (positive, negative) prompt pair.
+
+    ``settings`` is the 15-tuple the script builds per run: shuffle, chaos mode and
+    amount, limit percentage, max tag count, change-dash and the nine removal or
+    preservation flags. Tags from ``post``'s artist/character metadata are removed
+    when the matching flag is set; ``subject_text`` adds allowed subjects on top of
+    ``base_positive`` and ``initial_additions``.
+    """
+    (
+        shuffle_tags,
+        chaos_mode,
+        chaos_amount,
+        limit_tags_pct,
+        max_tags_count,
+        change_dash,
+        remove_artist_tags,
+        remove_character_tags,
+        remove_clothing_tags,
+        remove_text_tags,
+        restrict_subject_tags,
+        remove_furry_tags,
+        remove_headwear_tags,
+        preserve_hair_eye_colors,
+        remove_series_tags,
+    ) = settings
+    current_prompt = f"{initial_additions},{raw_prompt}" if initial_additions else raw_prompt
+    prompt_tags = [tag.strip() for tag in _PROMPT_SPLIT_RE.split(current_prompt) if tag.strip()]
+    base_hair_colors = set(base_colors[0] or ())
+    base_eye_colors = set(base_colors[1] or ())
+    norm_cache: Dict[str, str] = {} if cache is None else cache
+    try:
+        artist_norm, char_norm = _post_removal_sets(
+            post, bool(remove_artist_tags), bool(remove_character_tags)
+        )
+        allowed_subjects: Set[str] = set()
+        if restrict_subject_tags:
+            allowed_subjects.update(extract_subject_tags(base_positive))
+            allowed_subjects.update(extract_subject_tags(initial_additions))
+            allowed_subjects.update(extract_subject_tags(subject_text))
+        favorites_guard: Set[str] = set()
+        if filter_ctx:
+            favorites_guard = set(filter_ctx.get("favorites", frozenset()))  # type: ignore[call-overload]
+        if catalog:
+            catalog = _classified_catalog(
+                catalog,
+                [
+                    (normalize_tag(tag) or canonicalize_raw_tag(tag)).replace(" ", "_")
+                    for tag in prompt_tags
+                ],
+            )
+        resolve_alias_fn = catalog.resolve_alias if catalog else None
+        filtered_prompt_tags = []
+        primary_subject = None
+        for t in prompt_tags:
+            t_norm = normalize_cached(t, norm_cache, resolve_alias_fn)
+            canonical_tag = t_norm or canonicalize_raw_tag(t)
+            t_orig = (t or "").strip().lower()
+            if t_norm and t_norm in favorites_guard:
+                filtered_prompt_tags.append(t)
+                continue
+            should_remove = False
+            if remove_artist_tags and (
+                t_norm in artist_norm
+                or t_orig in artist_norm
+                or (t_norm and t_norm.endswith(" artist"))
+            ):
+                should_remove = True
+            elif remove_character_tags and (
+                t_norm in char_norm
+                or t_orig in char_norm
+                or ("(" in t and ")" in t and not t.strip().startswith("("))
+                or (t_norm and (t_norm.endswith(" series") or t_norm.endswith(" franchise")))
+            ):
+                should_remove = True
+            if not should_remove and remove_clothing_tags and is_clothing_tag(t):
+                should_remove = True
+            if (
+                not should_remove
+                and remove_text_tags
+                and is_textual_tag(t, catalog.is_textual if catalog else None)
+            ):
+                should_remove = True
+            if not should_remove and remove_furry_tags and is_furry_tag(t):
+                should_remove = True
+            if not should_remove and remove_headwear_tags and is_headwear_tag(t):
+                should_remove = True
+            if (
+                not should_remove
+                and remove_series_tags
+                and is_series_tag(t, catalog.category if catalog else None)
+            ):
+                should_remove = True
+            if not should_remove and preserve_hair_eye_colors:
+                if base_hair_colors and canonical_tag in base_hair_colors:
+                    pass
+                elif base_eye_colors and canonical_tag in base_eye_colors:
+                    pass
+                elif (
+                    base_hair_colors
+                    and is_hair_color_tag(t, catalog.is_hair if catalog else None)
+                    and canonical_tag not in base_hair_colors
+                ):
+                    should_remove = True
+                elif (
+                    base_eye_colors
+                    and is_eye_color_tag(t, catalog.is_eye if catalog else None)
+                    and canonical_tag not in base_eye_colors
+                ):
+                    should_remove = True
+            if not should_remove and restrict_subject_tags and is_subject_tag(t):
+                if allowed_subjects:
+                    if t_norm not in allowed_subjects:
+                        should_remove = True
+                else:
+                    if primary_subject is None:
+                        primary_subject = t_norm
+                    elif t_norm != primary_subject:
+                        should_remove = True
+            if not should_remove and filter_ctx and t_norm:
+                should_remove = tag_matches_removal(t_norm, filter_ctx)
+            if not should_remove:
+                filtered_prompt_tags.append(t)
+        prompt_tags = filtered_prompt_tags
+    except Exception:
+        # fallback: ignore removal if anything goes wrong
+        pass
+    current_prompt = ",".join(prompt_tags)
+    if shuffle_tags:
+        tags_list = [t.strip() for t in current_prompt.split(",") if t.strip()]
+        random.shuffle(tags_list)
+        current_prompt = ",".join(tags_list)
+    current_negative = base_negative
+    if chaos_mode == "Shuffle All":
+        current_prompt, current_negative = generate_chaos(
+            current_prompt, current_negative, chaos_amount
+        )
+    elif chaos_mode == "Shuffle Negative":
+        _, current_negative = generate_chaos("", current_negative, chaos_amount)
+    if limit_tags_pct < 1.0:
+        current_prompt = limit_prompt_tags(current_prompt, limit_tags_pct, "Limit")
+    if max_tags_count > 0:
+        current_prompt = limit_prompt_tags(current_prompt, max_tags_count, "Max")
+    if change_dash:
+        current_prompt = current_prompt.replace("_", " ")
+        current_negative = current_negative.replace("_", " ")
+    if base_positive:
+        current_prompt = f"{base_positive}, {current_prompt}" if current_prompt else base_positive
+    return remove_repeated_tags(current_prompt), remove_repeated_tags(current_negative)
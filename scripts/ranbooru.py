@@ -1,5 +1,3 @@
-import csv
-import difflib
 import json
 import logging
 import os
@@ -8,11 +6,10 @@ import re
 import shutil
 import sys
 import traceback
-import unicodedata
+import weakref
 from contextlib import ExitStack, contextmanager
 from datetime import datetime
-from io import BytesIO
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import gradio as gr
 import modules.scripts as scripts
@@ -29,18 +26,29 @@ try:
     from modules.ui_components import InputAccordion
 except ImportError:
     InputAccordion = gr.Accordion
+try:
+    from modules import script_callbacks
+except ImportError:
+    script_callbacks = None
 from modules.scripts import basedir
 
 from ranboorux import catalog as rb_catalog
+from ranboorux import catalog_index as rb_catalog_index
+from ranboorux import catalog_registry as rb_catalog_registry
 from ranboorux import http_client as rb_http_client
+from ranboorux import image_cache as rb_image_cache
+from ranboorux import image_fetch as rb_image_fetch
 from ranboorux import image_ops as rb_image_ops
+from ranboorux import image_probe as rb_image_probe
 from ranboorux import loranado as rb_loranado
 from ranboorux import mutation_scope as rb_mutation_scope
 from ranboorux import run_options as rb_run_options
 from ranboorux import tag_pipeline as rb_tag_pipeline
 from ranboorux import user_store as rb_user_store
 from ranboorux.anima_detect import get_anima_model_info
-from ranboorux.boorus import Booru
+from ranboorux.boorus import Booru, as_posts_result, make_booru
+from ranboorux.boorus import common as rb_booru_common
+from ranboorux.boorus import federated as rb_federated
 from ranboorux.integrations import adetailer as rb_adetailer_integration
 from ranboorux.integrations import adetailer_orchestration as rb_adetailer_orch
 from ranboorux.integrations import adetailer_runtime as rb_adetailer_runtime
@@ -71,6 +79,22 @@ BUNDLED_CATALOG_DIR = os.path.join(EXTENSION_ROOT, "data", "catalogs")
 BUNDLED_CATALOG_PATH = os.path.join(BUNDLED_CATALOG_DIR, "danbooru_tags.csv")
 USER_CATALOGS_DIR = os.path.join(USER_DATA_DIR, "catalogs")
 os.makedirs(USER_CATALOGS_DIR, exist_ok=True)
+IMAGE_CACHE_DIR = os.path.join(USER_DATA_DIR, "cache", "images")
+BOORU_SESSIONS = rb_http_client.SessionManager()
+# Live Script instances, so unloading can hand their shared catalogs back.
+SCRIPT_INSTANCES: "weakref.WeakSet[Script]" = weakref.WeakSet()
+
+
+def _on_script_unloaded() -> None:
+    BOORU_SESSIONS.close_all()
+    for script in list(SCRIPT_INSTANCES):
+        script._set_catalog(NoopCatalog())
+    rb_catalog_registry.CATALOGS.stop()
+
+
+if script_callbacks is not None:
+    script_callbacks.on_script_unloaded(_on_script_unloaded)
+
 
 REMOVAL_SYNONYM_GROUPS_RAW: Tuple[Set[str], ...] = (
     {"grayscale", "greyscale", "monochrome"},
@@ -122,37 +146,29 @@ COLORED_BG = [
 ]
 ADD_BG = ["outdoors", "indoors"]
 BW_BG = ["monochrome", "greyscale", "grayscale"]
-POST_AMOUNT = 100
-COUNT = 100
+POST_AMOUNT = rb_booru_common.POST_AMOUNT
 DEBUG = False
 MAX_SOURCE_IMAGE_BYTES = 25 * 1024 * 1024
 MAX_SOURCE_IMAGE_PIXELS = 50_000_000
 MAX_SOURCE_IMAGE_FRAMES = 1
+MAX_IMAGE_FETCH_WORKERS = 8
+MAX_IMAGE_FETCH_PER_HOST = 4
+IMAGE_DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DECODED_IMAGE_CACHE_DEFAULT_MB = 256
+DECODED_IMAGE_CACHE_MAX_MB = 2048
+# (booru, weight) pairs queried by the "federated" option; weights set each backend's
+# share of random picks. Gelbooru is only included when credentials are configured.
+FEDERATED_BACKENDS: Tuple[Tuple[str, float], ...] = rb_federated.DEFAULT_BACKENDS
+FEDERATED_BACKEND_TIMEOUT = rb_federated.DEFAULT_BACKEND_TIMEOUT
 
 _ranbooru_logger = logging.getLogger("ranboorux")
 
-RATING_TYPES = {
-    "none": {"All": "All"},
-    "full": {"All": "All", "Safe": "safe", "Questionable": "questionable", "Explicit": "explicit"},
-    "single": {"All": "All", "Safe": "g", "Sensitive": "s", "Questionable": "q", "Explicit": "e"},
-}
-
-RATINGS = {
-    "e621": RATING_TYPES["full"],
-    "danbooru": RATING_TYPES["single"],
-    "aibooru": RATING_TYPES["full"],
-    "yande.re": RATING_TYPES["full"],
-    "konachan": RATING_TYPES["full"],
-    "safebooru": RATING_TYPES["none"],
-    "rule34": RATING_TYPES["full"],
-    "xbooru": RATING_TYPES["full"],
-    "gelbooru": RATING_TYPES["single"],
-    "gelbooru-compatible": RATING_TYPES["single"],
-}
+RATING_TYPES = rb_booru_common.RATING_TYPES
+RATINGS = rb_booru_common.RATINGS
 
 STRICT_IMG2IMG_EXTRA_ROUNDS = 2
+STRICT_IMG2IMG_HARVEST_PAGES = 4
 STRICT_IMG2IMG_LOG_SAMPLE = 5
-_TAG_SPLIT_RE = re.compile(r"[,\s]+")
 _LORANADO_PONY_PATTERNS: Tuple[re.Pattern, ...] = (
     re.compile(r"(?<![a-z0-9])pony(?![a-z0-9])"),
     re.compile(r"(?<![a-z0-9])pony[ _-]*xl(?![a-z0-9])"),
@@ -209,14 +225,7 @@ def _sanitize_gelbooru_credential(value: Optional[str]) -> str:
 
 
 def _sanitize_gelbooru_compat_base_url(value: Optional[str]) -> str:
-    if not isinstance(value, str):
-        return ""
-    sanitized = value.strip()
-    if not sanitized:
-        return ""
-    if not re.match(r"^https?://", sanitized, re.IGNORECASE):
-        sanitized = f"https://{sanitized}"
-    return sanitized.rstrip("/")
+    return rb_booru_common.sanitize_base_url(value)
 
 
 def _load_gelbooru_credentials_from_disk() -> Optional[Dict[str, str]]:
@@ -249,6 +258,7 @@ POST_ID_UNSUPPORTED_ERRORS = {
     "konachan": "Konachan does not support post IDs",
     "yande.re": "Yande.re does not support post IDs",
     "e621": "e621 does not support post IDs",
+    "federated": "Federated search does not support post IDs",
 }
 
 
@@ -260,9 +270,7 @@ def check_booru_exceptions(booru, post_id, tags):
 
 
 def _split_tag_string(value: Optional[str]) -> List[str]:
-    if not isinstance(value, str):
-        return []
-    return [tag for tag in _TAG_SPLIT_RE.split(value.strip()) if tag]
+    return rb_booru_common.split_tag_string(value)
 
 
 def _coerce_multiselect_values(value: object) -> List[str]:
@@ -285,9 +293,7 @@ def _coerce_multiselect_values(value: object) -> List[str]:
 
 
 def _split_tag_string_override(value: object) -> Optional[List[str]]:
-    if value is None or not isinstance(value, str):
-        return None
-    return _split_tag_string(value)
+    return rb_booru_common.split_tag_string_override(value)
 
 
 POST_URL_TEMPLATES = {
@@ -323,298 +329,16 @@ def get_original_post_url(post):
 
 
 def generate_chaos(pos_tags, neg_tags, chaos_amount):
-    pos_tag_list = rb_tag_pipeline.split_prompt_tags(pos_tags)
-    neg_tag_list = rb_tag_pipeline.split_prompt_tags(neg_tags)
-    chaos_list = list(set(pos_tag_list + neg_tag_list))
-    if not chaos_list:
-        return pos_tags, neg_tags
-    random.shuffle(chaos_list)
-    len_list = round(len(chaos_list) * chaos_amount)
-    neg_add = chaos_list[:len_list]
-    pos_add = chaos_list[len_list:]
-    final_pos = list(set(pos_tag_list) - set(neg_add)) + pos_add
-    final_neg = list(set(neg_tag_list) - set(pos_add)) + neg_add
-    return ",".join(rb_tag_pipeline.dedupe_keep_order(final_pos)), ",".join(
-        rb_tag_pipeline.dedupe_keep_order(final_neg)
-    )
-
-
-class BooruError(Exception):
-    pass
-
-
-class TagCatalogProvider:
-    """Interface for optional tag catalog backends."""
-
-    def enabled(self) -> bool:
-        return False
-
-    def resolve_alias(self, tag: str) -> str:
-        return tag if isinstance(tag, str) else ""
-
-    def category(self, tag: str) -> Optional[int]:
-        return None
-
-    def is_textual(self, tag: str) -> bool:
-        return False
-
-    def is_hair(self, tag: str) -> bool:
-        return False
-
-    def is_eye(self, tag: str) -> bool:
-        return False
-
-    def canonical(self, tag: str) -> str:
-        return self.resolve_alias(tag)
-
-    def has(self, tag: str) -> bool:
-        return False
-
-    def suggestions(self, tag: str, limit: int = 3) -> List[str]:
-        return []
-
-
-class NoopCatalog(TagCatalogProvider):
-    pass
-
-
-class CsvCatalog(TagCatalogProvider):
-    _TEXTUAL_SEED: Set[str] = {
-        "text",
-        "english_text",
-        "japanese_text",
-        "chinese_text",
-        "korean_text",
-        "translated",
-        "translation",
-        "commentary",
-        "artist_commentary",
-        "author_commentary",
-        "publisher_commentary",
-        "speech_bubble",
-        "speech_bubbles",
-        "dialogue",
-        "dialog",
-        "subtitle",
-        "subtitles",
-        "caption",
-        "captions",
-        "watermark",
-        "logo",
-        "signature",
-        "url",
-        "filename",
-        "thought_bubble",
-        "thought_balloon",
-        "notice",
-    }
-    _TEXTUAL_KEYWORDS: Tuple[str, ...] = (
-        "text",
-        "commentary",
-        "speech_bubble",
-        "thought_bubble",
-        "watermark",
-        "logo",
-        "subtitle",
-        "caption",
-        "dialog",
-        "dialogue",
-        "filename",
-        "url",
-        "signature",
-        "credit",
-    )
-    _TEXTUAL_PREFIXES: Tuple[str, ...] = (
-        "translated_",
-        "translation_",
-        "english_",
-        "japanese_",
-        "korean_",
-        "chinese_",
-    )
-    _TEXTUAL_SUFFIXES: Tuple[str, ...] = (
-        "_text",
-        "_commentary",
-        "_logo",
-        "_watermark",
-        "_subtitle",
-        "_caption",
-        "_speech",
-        "_bubble",
-    )
-    _HAIR_SUFFIXES: Tuple[str, ...] = ("_hair",)
-    _EYE_SUFFIXES: Tuple[str, ...] = ("_eyes", "_eye")
-
-    def __init__(self, path: str):
-        self._path = path
-        self._mtime = 0.0
-        self._aliases: Dict[str, str] = {}
-        self._cats: Dict[str, int] = {}
-        self._counts: Dict[str, int] = {}
-        self._textual: Set[str] = set()
-        self._hair: Set[str] = set()
-        self._eyes: Set[str] = set()
-        self._all_tags: Set[str] = set()
-        self._load()
-
-    @staticmethod
-    def _normalize_name(value: str) -> str:
-        if not isinstance(value, str):
-            return ""
-        cleaned = unicodedata.normalize("NFKC", value).strip().lower()
-        if not cleaned:
-            return ""
-        cleaned = cleaned.replace("-", "_").replace(" ", "_")
-        cleaned = re.sub(r"_+", "_", cleaned)
-        return cleaned
-
-    def _looks_textual(self, tag: str) -> bool:
-        if not tag:
-            return False
-        if tag in self._TEXTUAL_SEED:
-            return True
-        if any(keyword in tag for keyword in self._TEXTUAL_KEYWORDS):
-            return True
-        if any(tag.startswith(prefix) for prefix in self._TEXTUAL_PREFIXES):
-            return True
-        if any(tag.endswith(suffix) for suffix in self._TEXTUAL_SUFFIXES):
-            return True
-        return False
-
-    def _process_row(self, row: List[str], columns: Optional[Dict[str, int]] = None) -> None:
-        def _safe_get(idx: Optional[int]) -> str:
-            if idx is None:
-                return ""
-            if idx < 0 or idx >= len(row):
-                return ""
-            return row[idx]
-
-        if columns:
-            raw_name = _safe_get(columns.get("tag"))
-            if not raw_name:
-                raw_name = _safe_get(columns.get("name"))
-            cat_val = _safe_get(columns.get("category"))
-            count_val = _safe_get(columns.get("count"))
-            alias_field = _safe_get(columns.get("alias"))
-            if not alias_field:
-                alias_field = _safe_get(columns.get("aliases"))
-        else:
-            raw_name = row[0] if len(row) > 0 else ""
-            cat_val = row[1] if len(row) > 1 else ""
-            count_val = row[2] if len(row) > 2 else ""
-            alias_field = row[3] if len(row) > 3 else ""
-
-        name = self._normalize_name(raw_name)
-        if not name:
-            return
-        try:
-            category = int(cat_val) if cat_val is not None and str(cat_val).strip() != "" else 0
-        except Exception:
-            category = 0
-        try:
-            count = int(count_val) if count_val is not None and str(count_val).strip() != "" else 0
-        except Exception:
-            count = 0
-        self._cats[name] = category
-        self._counts[name] = count
-        self._all_tags.add(name)
-        if category == 0:
-            if any(name.endswith(suffix) for suffix in self._HAIR_SUFFIXES):
-                self._hair.add(name)
-            if any(name.endswith(suffix) for suffix in self._EYE_SUFFIXES):
-                self._eyes.add(name)
-        if self._looks_textual(name):
-            self._textual.add(name)
-        if alias_field:
-            for alias_candidate in re.split(r"[\s,]+", alias_field):
-                alias_name = self._normalize_name(alias_candidate)
-                if not alias_name or alias_name == name:
-                    continue
-                self._aliases[alias_name] = name
-
-    def _load(self) -> None:
-        if not os.path.isfile(self._path):
-            raise FileNotFoundError(self._path)
-        self._mtime = os.path.getmtime(self._path)
-        self._aliases.clear()
-        self._cats.clear()
-        self._counts.clear()
-        self._textual = set(self._TEXTUAL_SEED)
-        self._hair.clear()
-        self._eyes.clear()
-        self._all_tags.clear()
-        with open(self._path, newline="", encoding="utf-8") as handle:
-            reader = csv.reader(handle)
-            first_row = next(reader, None)
-            if first_row is None:
-                raise ValueError("CSV file is empty")
-            header_map: Optional[Dict[str, int]] = None
-            lowered = [str(cell or "").strip().lower() for cell in first_row]
-            if len(lowered) >= 3 and lowered[0] in ("tag", "name") and lowered[1] == "category":
-                header_map = {name: idx for idx, name in enumerate(lowered)}
-            else:
-                self._process_row(first_row, None)
-            for row in reader:
-                self._process_row(row, header_map)
-        # Include alias forms for hair/eye lookup convenience
-        for alias, canonical in list(self._aliases.items()):
-            if canonical in self._hair:
-                self._hair.add(alias)
-            if canonical in self._eyes:
-                self._eyes.add(alias)
-
-    def maybe_reload(self) -> None:
-        try:
-            current = os.path.getmtime(self._path)
-        except OSError:
-            return
-        if current != self._mtime:
-            self._load()
-
-    def enabled(self) -> bool:
-        return True
+    return rb_tag_pipeline.generate_chaos(pos_tags, neg_tags, chaos_amount)
 
-    def resolve_alias(self, tag: str) -> str:
-        normalized = self._normalize_name(tag)
-        if not normalized:
-            return ""
-        return self._aliases.get(normalized, normalized)
-
-    def category(self, tag: str) -> Optional[int]:
-        canonical = self.resolve_alias(tag)
-        return self._cats.get(canonical)
 
-    def is_textual(self, tag: str) -> bool:
-        canonical = self.resolve_alias(tag)
-        return canonical in self._textual or self._looks_textual(canonical)
+BooruError = rb_booru_common.BooruError
 
-    def is_hair(self, tag: str) -> bool:
-        canonical = self.resolve_alias(tag)
-        return canonical in self._hair
 
-    def is_eye(self, tag: str) -> bool:
-        canonical = self.resolve_alias(tag)
-        return canonical in self._eyes
-
-    def canonical(self, tag: str) -> str:
-        return self.resolve_alias(tag)
-
-    def has(self, tag: str) -> bool:
-        canonical = self.resolve_alias(tag)
-        return canonical in self._cats
-
-    def suggestions(self, tag: str, limit: int = 3) -> List[str]:
-        if limit <= 0 or not self._all_tags:
-            return []
-        normalized = self._normalize_name(tag)
-        if not normalized:
-            return []
-        pool = list(self._all_tags)
-        matches = difflib.get_close_matches(normalized, pool, n=max(limit * 4, limit), cutoff=0.6)
-        if not matches:
-            return []
-        matches.sort(key=lambda name: (-self._counts.get(name, 0), name))
-        return matches[:limit]
+TagCatalogProvider = rb_catalog.TagCatalogProvider
+NoopCatalog = rb_catalog.NoopCatalog
+CsvCatalog = rb_catalog.CsvCatalog
+BinaryCatalog = rb_catalog_index.BinaryCatalog
 
 
 class Script(scripts.Script):
@@ -668,20 +392,26 @@ class Script(scripts.Script):
         self._tag_diag_md = None
         self._tag_catalog_status_text: str = "Catalog mode: ON - Bundled default"
         self._tag_catalog_linter_limit: int = 3
-        self._catalog_subject_anchors = None
         self._loranado_scan_cache: Dict[str, Dict[str, object]] = {}
-        self._http_client = rb_http_client.BooruSession(use_cache=False)
+        self._http_client = BOORU_SESSIONS.acquire(use_cache=False)
+        SCRIPT_INSTANCES.add(self)
         self._load_tag_catalog_preferences()
 
     sorting_priority = 1  # Highest priority to run before ALL other extensions
     previous_loras = ""
     last_img = []
     real_steps = 0
-    version = "1.8-Refactored"
+    version = rb_booru_common.CLIENT_VERSION
     original_prompt = ""
     run_img2img_pass = False
     img2img_denoising = 0.75
     cache_installed_by_us = False
+    # Page the most recent fetch read; strict pre-filter harvests skip it.
+    _last_fetched_page: Optional[int] = None
+    _disk_image_cache: Optional[rb_image_cache.DiskImageCache] = None
+    _decoded_image_cache = rb_image_cache.DecodedImageCache(
+        DECODED_IMAGE_CACHE_DEFAULT_MB * 1024 * 1024
+    )
     _adetailer_support_enabled = False
     _post_adetailer_enabled = False
     _manual_adetailer_prev_enabled = False
@@ -826,7 +556,7 @@ class Script(scripts.Script):
         if not self._use_tag_catalog:
             return "Catalog mode: ON - Bundled default"
         catalog = getattr(self, "_catalog", None)
-        if not isinstance(catalog, CsvCatalog):
+        if not isinstance(catalog, (CsvCatalog, BinaryCatalog)):
             selected = self._resolve_catalog_path()
             if not selected:
                 return "Catalog mode: ON - No catalog selected"
@@ -834,8 +564,8 @@ class Script(scripts.Script):
             return f"Catalog mode: ON - {source_label}: {os.path.basename(selected)} (not loaded)"
         source_label = "Bundled" if self._catalog_source == "bundled" else "Custom"
         filename = os.path.basename(catalog._path)
-        tag_count = len(getattr(catalog, "_all_tags", set()))
-        alias_count = len(getattr(catalog, "_aliases", {}))
+        tag_count = catalog.tag_count()
+        alias_count = catalog.alias_count()
         return f"Catalog mode: ON - {source_label}: {filename}\nTags: {tag_count:,} | Aliases: {alias_count:,}"
 
     def _active_catalog(self) -> Optional[TagCatalogProvider]:
@@ -858,31 +588,42 @@ class Script(scripts.Script):
                         return None
                 else:
                     return None
-        try:
-            if hasattr(catalog, "maybe_reload"):
-                catalog.maybe_reload()  # type: ignore[call-arg]
-        except Exception:
-            pass
+        if isinstance(catalog, TagCatalogProvider):
+            try:
+                # Shared catalogs are read-only; follow file edits by swapping versions.
+                catalog = rb_catalog_registry.CATALOGS.refresh(catalog)
+                self._catalog = catalog
+            except Exception:
+                pass
         return catalog if isinstance(catalog, TagCatalogProvider) and catalog.enabled() else None
 
+    def _set_catalog(self, catalog: TagCatalogProvider) -> None:
+        previous = getattr(self, "_catalog", None)
+        self._catalog = catalog
+        # Re-acquiring the same shared catalog took a second reference; drop the old one.
+        if previous is not None:
+            rb_catalog_registry.CATALOGS.release(previous)
+
     def _load_tag_catalog(self) -> Tuple[bool, str]:
         path_value = self._resolve_catalog_path()
         if not path_value:
             self._set_catalog_source("bundled")
             path_value = self._resolve_catalog_path()
             if not path_value:
-                self._catalog = NoopCatalog()
+                self._set_catalog(NoopCatalog())
                 return False, "Catalog load failed: bundled catalog path is not set"
         valid, validation_msg = self._validate_csv_format(path_value)
         if not valid:
-            self._catalog = NoopCatalog()
+            self._set_catalog(NoopCatalog())
             return False, f"Catalog load failed: {validation_msg}"
         try:
-            self._catalog = CsvCatalog(path_value)
+            self._set_catalog(rb_catalog_registry.CATALOGS.acquire(path_value))
+            # File edits are picked up by the registry's watcher thread.
+            rb_catalog_registry.CATALOGS.watch()
             self._tag_catalog_status_text = self._format_catalog_status()
             return True, self._tag_catalog_status_text
         except Exception as exc:
-            self._catalog = NoopCatalog()
+            self._set_catalog(NoopCatalog())
             return False, f"Catalog load failed: {exc}"
 
     def _render_tag_diag(self, diag: Dict[str, object]) -> str:
@@ -947,101 +688,23 @@ class Script(scripts.Script):
         drop_characters: bool,
         drop_textual: bool,
     ) -> Tuple[List[str], Dict[str, object]]:
-        diag: Dict[str, object] = {
-            "mode": "catalog",
-            "rules": {
-                "drop_series": bool(drop_series),
-                "drop_characters": bool(drop_characters),
-                "drop_textual": bool(drop_textual),
-                "keep_hair_eye": bool(keep_hair_eye),
-            },
-            "kept": [],
-            "dropped": [],
-            "normalized": [],
-            "unknown": [],
-        }
         catalog = self._active_catalog()
-        if not catalog:
-            self._tag_catalog_diag = diag
-            self._update_tag_diag()
-            return list(tags), diag
-
-        subject_anchors = getattr(self, "_catalog_subject_anchors", None)
-        if subject_anchors is None:
-            subject_anchors = {s.replace(" ", "_") for s in rb_tag_pipeline._SUBJECT_TAGS}
-            self._catalog_subject_anchors = subject_anchors
-
-        kept: List[str] = []
-        seen: Set[str] = set()
-        normalized_records: List[Dict[str, str]] = []
-        dropped_records: List[Dict[str, str]] = []
-        unknown_records: List[Dict[str, object]] = []
-        preserved_hair_eye: Set[str] = set()
-        original_subjects: List[str] = []
-
-        for raw in tags:
-            tag = (raw or "").strip()
-            if not tag:
-                continue
-            negated = tag.startswith("-")
-            base = tag[1:] if negated else tag
-            base_compact = re.sub(r"\s+", "_", base.strip().lower())
-            base_compact = re.sub(r"_+", "_", base_compact)
-            if not base_compact:
-                continue
-            if ":" in base_compact:
-                canonical = base_compact
-            else:
-                canonical = catalog.resolve_alias(base_compact) or base_compact
-                if canonical != base_compact:
-                    normalized_records.append({"from": base_compact, "to": canonical})
-            final_tag = f"-{canonical}" if negated else canonical
-            if final_tag in seen:
-                continue
-            seen.add(final_tag)
-
-            category = catalog.category(canonical)
-            is_hair = catalog.is_hair(canonical)
-            is_eye = catalog.is_eye(canonical)
-            if canonical in subject_anchors:
-                original_subjects.append(canonical)
-
-            reason: Optional[str] = None
-            if drop_series and category == 3:
-                reason = "series"
-            elif drop_characters and category == 4:
-                reason = "character"
-            elif drop_textual and catalog.is_textual(canonical):
-                reason = "textual"
-
-            if reason and not (keep_hair_eye and (is_hair or is_eye)):
-                dropped_records.append({"tag": final_tag, "reason": reason})
-                continue
-
-            if keep_hair_eye and (is_hair or is_eye):
-                preserved_hair_eye.add(final_tag)
-
-            if not catalog.has(canonical) and ":" not in canonical:
-                suggestions = catalog.suggestions(canonical, self._tag_catalog_linter_limit)
-                unknown_records.append({"tag": canonical, "suggestions": suggestions})
-
-            kept.append(final_tag)
-
-        if original_subjects and not any(t.lstrip("-") in subject_anchors for t in kept):
-            kept.append(original_subjects[0])
-
-        diag["kept"] = kept
-        diag["dropped"] = dropped_records
-        diag["normalized"] = normalized_records
-        diag["unknown"] = unknown_records
-        if preserved_hair_eye:
-            diag["preserved"] = sorted(preserved_hair_eye)
-
+        kept, diag = rb_catalog.apply_catalog(
+            tags,
+            catalog,
+            keep_hair_eye=keep_hair_eye,
+            drop_series=drop_series,
+            drop_characters=drop_characters,
+            drop_textual=drop_textual,
+            suggestion_limit=self._tag_catalog_linter_limit,
+        )
         self._tag_catalog_diag = diag
         self._update_tag_diag()
-        print(
-            f"[TagCatalog] mode={diag['mode']} kept={len(kept)} dropped={len(dropped_records)} unknown={len(unknown_records)}"
-        )
+        if catalog:
+            print(
+                f"[TagCatalog] mode={diag['mode']} kept={len(kept)} "
+                f"dropped={len(diag['dropped'])} unknown={len(diag['unknown'])}"  # type: ignore[arg-type]
+            )
         return kept, diag
 
     def _load_personal_lists(self) -> Tuple[Set[str], Set[str]]:
@@ -1052,18 +715,10 @@ class Script(scripts.Script):
         return personal, favorites
 
     def _normalize_cached(self, tag: str, cache: Dict[str, str]) -> str:
-        if tag in cache:
-            return cache[tag]
-        normalized = self._normalize_tag(tag)
-        if normalized:
-            catalog = self._active_catalog()
-            if catalog:
-                catalog_token = normalized.replace(" ", "_")
-                canonical = catalog.resolve_alias(catalog_token)
-                if canonical and canonical != catalog_token:
-                    normalized = canonical.replace("_", " ")
-        cache[tag] = normalized
-        return normalized
+        catalog = self._active_catalog()
+        return rb_tag_pipeline.normalize_cached(
+            tag, cache, catalog.resolve_alias if catalog else None
+        )
 
     def _expand_with_synonyms(self, normalized_tag: str, target_set: Set[str]) -> None:
         rb_tag_pipeline.expand_with_synonyms(normalized_tag, target_set, self._synonym_lookup)
@@ -1357,7 +1012,7 @@ class Script(scripts.Script):
     def _update_gelbooru_ui_visibility(self, booru_name: Optional[str]):
         booru_name = (booru_name or "").strip().lower()
         has_saved = self._get_saved_gelbooru_credentials() is not None
-        if booru_name == "gelbooru":
+        if booru_name in ("gelbooru", "federated"):
             if has_saved:
                 message = self._gelbooru_saved_message()
                 return (
@@ -1400,31 +1055,9 @@ class Script(scripts.Script):
         return _gr_component_update(gr.Textbox, value=self._gelbooru_compat_base_url)
 
     def _extract_color_tags(self, text: str) -> tuple[set[str], set[str]]:
-        hair_tags: set[str] = set()
-        eye_tags: set[str] = set()
         if not text or not isinstance(text, str):
-            return hair_tags, eye_tags
-        catalog = self._active_catalog()
-        tokens = [token.strip() for token in re.split(r"[\s,]+", text) if token.strip()]
-        for token in tokens:
-            normalized = (self._normalize_tag(token) or "").strip().lower()
-            if not normalized:
-                normalized = self._canonicalize_raw_tag(token)
-            if not normalized:
-                continue
-            if catalog:
-                token_key = normalized.replace(" ", "_")
-                if catalog.is_hair(token_key):
-                    canonical = catalog.resolve_alias(token_key)
-                    hair_tags.add(canonical.replace("_", " ") if canonical else normalized)
-                if catalog.is_eye(token_key):
-                    canonical = catalog.resolve_alias(token_key)
-                    eye_tags.add(canonical.replace("_", " ") if canonical else normalized)
-            if normalized in rb_tag_pipeline._HAIR_COLOR_TAGS_NORMALIZED:
-                hair_tags.add(normalized)
-            if normalized in rb_tag_pipeline._EYE_COLOR_TAGS_NORMALIZED:
-                eye_tags.add(normalized)
-        return hair_tags, eye_tags
+            return set(), set()
+        return rb_tag_pipeline.catalog_color_tags(text, self._active_catalog())
 
     def _extract_subject_tags(self, text: str) -> set:
         return rb_tag_pipeline.extract_subject_tags(text)
@@ -1471,7 +1104,7 @@ class Script(scripts.Script):
         posts: List[Dict[str, object]],
         *,
         api: Booru,
-        tags_query: str,
+        tags_query: Union[str, Dict[str, str]],
         post_id: Optional[str],
         num_images_needed: int,
         max_pages: int,
@@ -1479,6 +1112,7 @@ class Script(scripts.Script):
         toggles: Tuple[bool, bool, bool, bool, bool, bool, bool, bool, bool, bool],
         base_colors: Tuple[Set[str], Set[str]],
         allowed_subjects: Set[str],
+        fetched_page: Optional[int] = None,
     ) -> Tuple[List[Dict[str, object]], List[Dict[str, object]], bool, bool]:
         if not posts:
             return [], [], False, False
@@ -1544,11 +1178,24 @@ class Script(scripts.Script):
 
         relaxed = False
         rounds = max(0, int(STRICT_IMG2IMG_EXTRA_ROUNDS))
+        # Boorus that can harvest fetch several random pages concurrently in one round
+        # instead of walking extra rounds serially.
+        harvest = getattr(api, "harvest_posts", None)
+        if callable(harvest):
+            rounds = min(rounds, 1)
         for round_index in range(rounds):
             try:
-                extra_posts = api.get_posts(
-                    tags_query=tags_query, max_pages=max_pages, post_id=None
-                )
+                if callable(harvest):
+                    extra_posts = harvest(
+                        tags_query=tags_query,
+                        max_pages=max_pages,
+                        pages=STRICT_IMG2IMG_HARVEST_PAGES,
+                        exclude_pages=() if fetched_page is None else (fetched_page,),
+                    )
+                else:
+                    extra_posts = as_posts_result(
+                        api.get_posts(tags_query=tags_query, max_pages=max_pages, post_id=None)
+                    ).posts
             except Exception as exc:
                 print(f"[R Strict] Warn: extra fetch round {round_index + 1} failed: {exc}")
                 break
@@ -1813,7 +1460,7 @@ class Script(scripts.Script):
                 self._set_catalog_source("bundled")
             ok, message = self._load_tag_catalog()
             if not ok:
-                self._catalog = NoopCatalog()
+                self._set_catalog(NoopCatalog())
             self._tag_catalog_status_text = message
             self._save_tag_catalog_preferences()
             return (
@@ -1841,7 +1488,7 @@ class Script(scripts.Script):
             if self._use_tag_catalog:
                 ok, message = self._load_tag_catalog()
                 if not ok:
-                    self._catalog = NoopCatalog()
+                    self._set_catalog(NoopCatalog())
                     self._tag_catalog_status_text = message
                 else:
                     self._tag_catalog_status_text = self._format_catalog_status()
@@ -1869,12 +1516,12 @@ class Script(scripts.Script):
                 if self._custom_catalog_path:
                     ok, message = self._load_tag_catalog()
                     if not ok:
-                        self._catalog = NoopCatalog()
+                        self._set_catalog(NoopCatalog())
                         self._tag_catalog_status_text = message
                     else:
                         self._tag_catalog_status_text = self._format_catalog_status()
                 else:
-                    self._catalog = NoopCatalog()
+                    self._set_catalog(NoopCatalog())
                     self._tag_catalog_status_text = "Catalog mode: ON - No path set"
             else:
                 self._tag_catalog_status_text = self._format_catalog_status()
@@ -1893,7 +1540,7 @@ class Script(scripts.Script):
             if self._use_tag_catalog:
                 ok, message = self._load_tag_catalog()
                 if not ok:
-                    self._catalog = NoopCatalog()
+                    self._set_catalog(NoopCatalog())
                     self._tag_catalog_status_text = message
                 else:
                     self._tag_catalog_status_text = self._format_catalog_status()
@@ -2324,6 +1971,7 @@ class Script(scripts.Script):
                 "yande.re",
                 "aibooru",
                 "e621",
+                "federated",
             ]
             booru = gr.Dropdown(booru_list, label="Booru", value="danbooru")
             with gr.Group(visible=False) as gelbooru_credentials_group:
@@ -2532,6 +2180,14 @@ class Script(scripts.Script):
                         value=False,
                         info="Leave disabled to fetch fresh images every generation. Enable when you want RanbooruX to reuse the previously cached posts.",
                     )
+                    decoded_image_cache_mb = gr.Slider(
+                        label="Decoded image cache (MB)",
+                        value=DECODED_IMAGE_CACHE_DEFAULT_MB,
+                        minimum=0,
+                        maximum=DECODED_IMAGE_CACHE_MAX_MB,
+                        step=64,
+                        info="Keeps decoded source images in memory so repeat runs over the same posts skip download and decode. 0 disables.",
+                    )
             with gr.Group():
                 (
                     use_search_txt,
@@ -2695,6 +2351,7 @@ class Script(scripts.Script):
             lora_blacklist,
             anima_auto_detect,
             anima_tune_img2img,
+            decoded_image_cache_mb,
         ]
         return rb_run_options.RunComponents.from_sequence(components).script_args()
 
@@ -2956,66 +2613,38 @@ class Script(scripts.Script):
 
         print(f"[R Orientation] Original: {x}x{y}, aspect_ratio: {aspect_ratio:.3f}")
 
-        # Calculate dimensions that maintain aspect ratio while staying within reasonable bounds
-        # Target around 1024 pixels for the longer dimension, minimum 512 for shorter
-        if aspect_ratio > 1.33:  # Wide image
-            # Landscape - width is longer
-            target_width = 1152
-            target_height = int(target_width / aspect_ratio)
-            # Ensure minimum height
-            if target_height < 512:
-                target_height = 512
-                target_width = int(target_height * aspect_ratio)
-
-            # Round to multiples of 8 for better compatibility
-            target_width = (target_width // 8) * 8
-            target_height = (target_height // 8) * 8
-
-            result = [target_width, target_height]
-            print(f"[R Orientation] Wide image -> {result[0]}x{result[1]} (rounded to 8px)")
-            return result
-        elif aspect_ratio < 0.75:  # Tall image
-            # Portrait - height is longer
-            target_height = 1152
-            target_width = int(target_height * aspect_ratio)
-            # Ensure minimum width
-            if target_width < 512:
-                target_width = 512
-                target_height = int(target_width / aspect_ratio)
-
-            # Round to multiples of 8 for better compatibility
-            target_width = (target_width // 8) * 8
-            target_height = (target_height // 8) * 8
-
-            result = [target_width, target_height]
-            print(f"[R Orientation] Tall image -> {result[0]}x{result[1]} (rounded to 8px)")
-            return result
-        else:
-            # Square-ish - use balanced dimensions based on original size
-            # Scale to reasonable size while maintaining square aspect
-            max_dim = max(x, y)
-            if max_dim > 1024:
-                result = [1024, 1024]
-            elif max_dim < 512:
-                result = [512, 512]
-            else:
-                # Use original dimensions if they're reasonable, rounded to 8px
-                max_dim = (max_dim // 8) * 8
-                result = [max_dim, max_dim]
-            print(f"[R Orientation] Square-ish image -> {result[0]}x{result[1]} (rounded to 8px)")
-            return result
+        # Target around 1152 pixels for the longer side (min 512 for the shorter one);
+        # square-ish images keep their size between 512 and 1024, all rounded to 8px.
+        result = list(rb_image_ops.orientation_target(x, y))
+        label = rb_image_ops.orientation_label(x, y)
+        print(f"[R Orientation] {label} image -> {result[0]}x{result[1]} (rounded to 8px)")
+        return result
 
     def _setup_cache(self, use_cache):
-        old_client = getattr(self, "_http_client", None)
-        if old_client is not None:
-            try:
-                old_client.close()
-            except Exception as exc:
-                print(f"[R] Warn: Failed to close previous booru session: {exc}")
-        self._http_client = rb_http_client.BooruSession(use_cache=bool(use_cache))
+        self._http_client = BOORU_SESSIONS.acquire(
+            use_cache=bool(use_cache),
+            image_cache=self._source_image_disk_cache() if use_cache else None,
+        )
         print(f"[R] Booru request cache {'enabled' if use_cache else 'disabled'} for this run.")
         return False
 
+    @classmethod
+    def _source_image_disk_cache(cls) -> rb_image_cache.DiskImageCache:
+        cache = cls._disk_image_cache
+        if cache is None:
+            cache = rb_image_cache.DiskImageCache(IMAGE_CACHE_DIR, IMAGE_DISK_CACHE_MAX_BYTES)
+            cls._disk_image_cache = cache
+        return cache
+
+    @classmethod
+    def _configure_decoded_image_cache(cls, budget_mb: object) -> None:
+        try:
+            megabytes = float(budget_mb)
+        except (TypeError, ValueError):
+            megabytes = float(DECODED_IMAGE_CACHE_DEFAULT_MB)
+        megabytes = max(0.0, min(megabytes, float(DECODED_IMAGE_CACHE_MAX_MB)))
+        cls._decoded_image_cache.resize(int(megabytes * 1024 * 1024))
+
     def _prepare_tags(
         self,
         ui_tags,
@@ -3030,67 +2659,7 @@ class Script(scripts.Script):
     ):
         bad_tags = set()
         if remove_default_bad:
-            bad_tags.update(
-                [
-                    "mixed-language_text",
-                    "watermark",
-                    "text",
-                    "english_text",
-                    "speech_bubble",
-                    "signature",
-                    "artist_name",
-                    "censored",
-                    "bar_censor",
-                    "translation",
-                    "twitter_username",
-                    "twitter_logo",
-                    "patreon_username",
-                    "commentary_request",
-                    "tagme",
-                    "commentary",
-                    "character_name",
-                    "mosaic_censoring",
-                    "instagram_username",
-                    "text_focus",
-                    "english_commentary",
-                    "comic",
-                    "translation_request",
-                    "fake_text",
-                    "translated",
-                    "paid_reward_available",
-                    "thought_bubble",
-                    "multiple_views",
-                    "silent_comic",
-                    "out-of-frame_censoring",
-                    "symbol-only_commentary",
-                    "3koma",
-                    "2koma",
-                    "character_watermark",
-                    "spoken_question_mark",
-                    "japanese_text",
-                    "spanish_text",
-                    "language_text",
-                    "fanbox_username",
-                    "commission",
-                    "original",
-                    "ai_generated",
-                    "stable_diffusion",
-                    "tagme_(artist)",
-                    "text_bubble",
-                    "qr_code",
-                    "chinese_commentary",
-                    "korean_text",
-                    "partial_commentary",
-                    "chinese_text",
-                    "copyright_request",
-                    "heart_censor",
-                    "censored_nipples",
-                    "page_number",
-                    "scan",
-                    "fake_magazine_cover",
-                    "korean_commentary",
-                ]
-            )
+            bad_tags.update(rb_tag_pipeline.DEFAULT_BAD_TAGS)
         if ui_remove_tags:
             bad_tags.update([t.strip() for t in ui_remove_tags.split(",") if t.strip()])
         if use_remove_file and remove_file:
@@ -3153,65 +2722,26 @@ class Script(scripts.Script):
     def _get_booru_api(
         self, booru_name, fringe_benefits, gelbooru_credentials: Optional[Dict[str, str]] = None
     ):
-        from ranboorux.boorus.gelbooru import Gelbooru, GelbooruCompatible
-        from ranboorux.boorus.simple import (
-            AIBooru,
-            Danbooru,
-            Konachan,
-            Rule34,
-            Safebooru,
-            XBooru,
-            Yandere,
-            e621,
-        )
-
         booru_name = (booru_name or "").strip().lower()
+        compat_base_url = ""
         if booru_name == "gelbooru-compatible":
-            base_url = _sanitize_gelbooru_compat_base_url(
+            compat_base_url = _sanitize_gelbooru_compat_base_url(
                 getattr(self, "_gelbooru_compat_base_url", "")
             )
-            if not base_url:
-                raise ValueError(
-                    "Please enter a Gelbooru-compatible Base URL (e.g., https://realbooru.com)."
-                )
-            self._gelbooru_compat_base_url = base_url
-            api = GelbooruCompatible(base_url)
-            api.http = self._http_client
-            return api
-
-        booru_apis = {
-            "gelbooru": Gelbooru(fringe_benefits, gelbooru_credentials),
-            "danbooru": Danbooru(),
-            "xbooru": XBooru(),
-            "rule34": Rule34(),
-            "safebooru": Safebooru(),
-            "konachan": Konachan(),
-            "yande.re": Yandere(),
-            "aibooru": AIBooru(),
-            "e621": e621(),
-        }
-        if booru_name not in booru_apis:
-            raise ValueError(f"Booru '{booru_name}' not implemented.")
-        api = booru_apis.get(booru_name)
-        if api is not None:
-            api.http = self._http_client
-        return api
+            if compat_base_url:
+                self._gelbooru_compat_base_url = compat_base_url
+        return make_booru(
+            booru_name,
+            fringe_benefits=fringe_benefits,
+            gelbooru_credentials=gelbooru_credentials,
+            compat_base_url=compat_base_url,
+            http_client=self._http_client,
+            federated_backends=FEDERATED_BACKENDS,
+            federated_timeout=FEDERATED_BACKEND_TIMEOUT,
+        )
 
-    def _fetch_booru_posts(self, api, search_tags, mature_rating, max_pages, post_id):
-        add_tags_list = []
-        # Don't add search_tags to tags_query when using post_id - causes API confusion
-        if search_tags and not post_id:
-            add_tags_list.extend([t.strip() for t in search_tags.split(",") if t.strip()])
-        booru_name = api.booru_name.lower()
-        if (
-            mature_rating != "All"
-            and booru_name in RATINGS
-            and mature_rating in RATINGS[booru_name]
-        ):
-            rating_tag = RATINGS[booru_name][mature_rating]
-            if rating_tag != "All":
-                add_tags_list.append(f"rating:{rating_tag}")
-        add_tags_list.append("-animated")
+    def _compose_tags_query(self, booru_name, search_tags, mature_rating, post_id):
+        add_tags_list = rb_booru_common.query_tags(booru_name, search_tags, mature_rating, post_id)
         if add_tags_list:
             add_tags_list, _ = self._apply_optional_catalog(
                 add_tags_list,
@@ -3220,10 +2750,35 @@ class Script(scripts.Script):
                 drop_characters=bool(getattr(self, "_remove_character_tags", False)),
                 drop_textual=bool(getattr(self, "_remove_text_tags", False)),
             )
-        tags_query = f"&tags={'+'.join(add_tags_list)}" if add_tags_list else ""
-        print(f"[R] Query Tags: '{tags_query}' (post_id={post_id})")
+        return rb_booru_common.format_tags_query(add_tags_list)
+
+    def _fetch_booru_posts(self, api, search_tags, mature_rating, max_pages, post_id):
+        backend_names = getattr(api, "backend_names", None)
+        tags_query: Union[str, Dict[str, str]]
+        if backend_names:
+            # Rating tags differ per site, so a federated search sends each backend its own query.
+            tags_query = {
+                name: self._compose_tags_query(name, search_tags, mature_rating, post_id)
+                for name in backend_names
+            }
+            for name, query in tags_query.items():
+                print(f"[R] Query Tags ({name}): '{query}'")
+        else:
+            tags_query = self._compose_tags_query(
+                api.booru_name.lower(), search_tags, mature_rating, post_id
+            )
+            print(f"[R] Query Tags: '{tags_query}' (post_id={post_id})")
         try:
-            all_posts = api.get_posts(tags_query=tags_query, max_pages=max_pages, post_id=post_id)
+            result = as_posts_result(
+                api.get_posts(tags_query=tags_query, max_pages=max_pages, post_id=post_id),
+                api.booru_name,
+            )
+            self._last_fetched_page = result.page
+            _log(
+                f"{api.booru_name}: {len(result.posts)} post(s) from page {result.page} "
+                f"in {result.elapsed:.2f}s (reported total: {result.total})"
+            )
+            all_posts = result.posts
             if not all_posts:
                 raise ValueError("No valid posts found matching criteria after fetching.")
             return all_posts, tags_query
@@ -3252,15 +2807,27 @@ class Script(scripts.Script):
                     reverse=reverse,
                 )
         available_count = len(all_posts)
+        # Federated pools weight each post by its backend's share; plain pools stay uniform.
+        pool_weights = None
+        if any("pool_weight" in post for post in all_posts):
+            pool_weights = [float(post.get("pool_weight") or 0.0) for post in all_posts]
+            if not any(pool_weights):
+                pool_weights = None
         selected_indices = []
         if post_id:
             selected_indices = [0] * num_images_needed
         elif same_prompt:
-            chosen_index = random.randrange(available_count) if sorting_order == "Random" else 0
+            chosen_index = (
+                random.choices(range(available_count), weights=pool_weights)[0]
+                if sorting_order == "Random"
+                else 0
+            )
             selected_indices = [chosen_index] * num_images_needed
         else:
             if sorting_order == "Random":
-                selected_indices = random.choices(range(available_count), k=num_images_needed)
+                selected_indices = random.choices(
+                    range(available_count), weights=pool_weights, k=num_images_needed
+                )
             else:
                 indices_to_use = list(range(min(available_count, num_images_needed)))
                 selected_indices = indices_to_use + [indices_to_use[-1]] * (
@@ -3283,20 +2850,51 @@ class Script(scripts.Script):
                 f"downloaded image has {frame_count} frames; maximum is {MAX_SOURCE_IMAGE_FRAMES}"
             )
 
-    def _fetch_images(self, posts_to_fetch, use_same_image, booru_name, fringe_benefits):
+    def _prescreen_source_rendition(self, rendition) -> Optional[ValueError]:
+        if not rendition.width or not rendition.height:
+            return None
+        reason = rb_image_probe.rejection_reason(
+            rendition.width, rendition.height, max_pixels=MAX_SOURCE_IMAGE_PIXELS
+        )
+        return ValueError(f"post metadata: {reason}") if reason else None
+
+    def _source_fetch_target(self, posts, crop_target=None) -> Optional[Tuple[int, int]]:
+        """Size the img2img pass will resize sources to, used to pick booru renditions."""
+        if crop_target:
+            try:
+                width, height = int(crop_target[0]), int(crop_target[1])
+            except (TypeError, ValueError, IndexError):
+                return None
+            return (width, height) if width > 0 and height > 0 else None
+        first = posts[0] if posts else None
+        width = first.get("width") if isinstance(first, dict) else None
+        height = first.get("height") if isinstance(first, dict) else None
+        if not width or not height:
+            return None
+        # Mirrors check_orientation(), which postprocess applies to the first image.
+        return rb_image_ops.orientation_target(int(width), int(height))
+
+    def _fetch_images(
+        self, posts_to_fetch, use_same_image, booru_name, fringe_benefits, crop_target=None
+    ):
         print("[R] Fetching images...")
         fetched_images = []
-        image_urls = [post.get("file_url") for post in posts_to_fetch]
+        source_posts = list(posts_to_fetch)
+        image_urls = [post.get("file_url") for post in source_posts]
         if not any(url for url in image_urls if url):
             print("[R] Warn: No valid file_urls found.")
             return []
         first_valid_url = None
         if use_same_image:
-            first_valid_url = next((url for url in image_urls if url), None)
+            first_valid_index = next((i for i, url in enumerate(image_urls) if url), None)
+            first_valid_url = (
+                image_urls[first_valid_index] if first_valid_index is not None else None
+            )
             if not first_valid_url:
                 print("[R] Warn: Cannot use same image, first URL invalid.")
                 return []
-            image_urls = [first_valid_url] * len(posts_to_fetch)
+            image_urls = [first_valid_url] * len(source_posts)
+            source_posts = [source_posts[first_valid_index]] * len(source_posts)
         try:
             api = self._get_booru_api(
                 booru_name, fringe_benefits, getattr(self, "_gelbooru_effective_credentials", None)
@@ -3304,53 +2902,156 @@ class Script(scripts.Script):
         except ValueError as e:
             print(f"[R] Error getting API for image fetch: {e}")
             return []
+        fetch_target = self._source_fetch_target(source_posts, crop_target)
+        renditions = [rb_image_fetch.select_rendition(post, fetch_target) for post in source_posts]
+        downsized = sum(1 for rendition in renditions if rendition.kind != "original")
+        if downsized and fetch_target:
+            print(
+                f"[R] Using smaller booru renditions for {downsized} image(s); "
+                f"img2img target is {fetch_target[0]}x{fetch_target[1]}."
+            )
+        image_urls = [rendition.url for rendition in renditions]
+        decoded_cache = self._decoded_image_cache
+        cache_keys = [
+            (
+                rb_image_cache.decoded_image_key(
+                    booru_name, {"id": post.get("id"), "file_url": url}
+                )
+                if decoded_cache.max_bytes
+                else None
+            )
+            for post, url in zip(source_posts, image_urls)
+        ]
+        cached_images = [decoded_cache.get(key) if key else None for key in cache_keys]
+        reused = sum(1 for image in cached_images if image is not None)
+        if reused:
+            print(f"[R] Reusing {reused} decoded source image(s) from memory.")
+        prescreen_errors = [
+            self._prescreen_source_rendition(rendition) if cached is None else None
+            for rendition, cached in zip(renditions, cached_images)
+        ]
+        downloadable = [
+            (
+                url
+                if url
+                and cached is None
+                and rejected is None
+                and url.startswith(("http://", "https://"))
+                else None
+            )
+            for url, cached, rejected in zip(image_urls, cached_images, prescreen_errors)
+        ]
+        announced: Set[str] = set()
+        for i, img_url in enumerate(downloadable):
+            if img_url and img_url not in announced:
+                announced.add(img_url)
+                safe_url = rb_http_client.redact_url(img_url)
+                print(f"[R] Fetching {i+1}/{len(image_urls)}: {safe_url[:80]}...")
+        unique_count = rb_image_fetch.unique_url_count(downloadable)
+        repeated = sum(1 for url in downloadable if url) - unique_count
+        if repeated > 0:
+            print(f"[R] {repeated} repeated source URL(s) will reuse {unique_count} download(s).")
+        outcomes = rb_image_fetch.fetch_concurrently(
+            downloadable,
+            lambda url: self._download_source_image(url, self._get_image_fetch_headers(api, url)),
+            max_workers=MAX_IMAGE_FETCH_WORKERS,
+            per_host_limit=MAX_IMAGE_FETCH_PER_HOST,
+        )
+        for outcome, cached, rejected in zip(outcomes, cached_images, prescreen_errors):
+            if cached is not None:
+                outcome.value = cached
+            elif rejected is not None:
+                outcome.error = rejected
         fetched_count = 0
-        for i, img_url in enumerate(image_urls):
-            img_to_append = None
-            try:
-                if img_url and img_url.startswith(("http://", "https://")):
-                    safe_url = rb_http_client.redact_url(img_url)
-                    print(f"[R] Fetching {i+1}/{len(image_urls)}: {safe_url[:80]}...")
-                    content = self._http_client.get_bytes(
-                        img_url,
-                        headers=self._get_image_fetch_headers(api, img_url),
-                        timeout=30,
-                        max_bytes=MAX_SOURCE_IMAGE_BYTES,
+        for i, (img_url, outcome) in enumerate(zip(image_urls, outcomes)):
+            if outcome.ok:
+                fetched_count += 1
+                if cached_images[i] is None:
+                    decoded_cache.put(cache_keys[i], outcome.value)
+                print(f"[R] Successfully fetched image {i+1}: {outcome.value.size}")
+            elif outcome.error is not None:
+                safe_msg = rb_http_client.safe_exception_message(
+                    "Image fetch", img_url, outcome.error
+                )
+                print(f"[R] Error fetching image {i+1}: {safe_msg}")
+            elif img_url:
+                if any(
+                    site in img_url.lower()
+                    for site in ["pixiv.net", "pximg.net", "twitter.com", "x.com"]
+                ):
+                    print(
+                        f"[R] Skipped external site URL {i+1}: {rb_http_client.redact_url(img_url)[:80]} (not a direct image)"
                     )
-                    img_data = BytesIO(content)
-                    source_image = Image.open(img_data)
-                    try:
-                        self._validate_source_image(source_image)
-                        img_to_append = source_image.convert("RGB")
-                    finally:
-                        close = getattr(source_image, "close", None)
-                        if callable(close) and img_to_append is not source_image:
-                            close()
-                    fetched_count += 1
-                    print(f"[R] Successfully fetched image {i+1}: {img_to_append.size}")
-                elif img_url:
-                    if any(
-                        site in img_url.lower()
-                        for site in ["pixiv.net", "pximg.net", "twitter.com", "x.com"]
-                    ):
-                        print(
-                            f"[R] Skipped external site URL {i+1}: {rb_http_client.redact_url(img_url)[:80]} (not a direct image)"
-                        )
-                    else:
-                        print(
-                            f"[R] Invalid URL protocol {i+1}: {rb_http_client.redact_url(img_url)[:80]}"
-                        )
                 else:
-                    print(f"[R] No URL available for image {i+1}")
-            except Exception as e:
-                safe_msg = rb_http_client.safe_exception_message("Image fetch", img_url, e)
-                print(f"[R] Error fetching image {i+1}: {safe_msg}")
-            fetched_images.append(img_to_append)
+                    print(
+                        f"[R] Invalid URL protocol {i+1}: {rb_http_client.redact_url(img_url)[:80]}"
+                    )
+            else:
+                print(f"[R] No URL available for image {i+1}")
+            fetched_images.append(outcome.value)
         print(f"[R] Fetched {fetched_count} images.")
         if None in fetched_images:
             print("[R] Warn: Some images failed.")
+        self._log_connection_pool_stats()
         return fetched_images
 
+    def _log_connection_pool_stats(self) -> None:
+        pool_stats = getattr(getattr(self, "_http_client", None), "pool_stats", None)
+        if not callable(pool_stats):
+            return
+        try:
+            stats = pool_stats()
+        except Exception:
+            return
+        print(
+            f"[R] Connection pool: {stats.get('created', 0)} opened, "
+            f"{stats.get('reused', 0)} reused keep-alive connection(s)."
+        )
+        rate_limit_stats = getattr(self._http_client, "rate_limit_stats", None)
+        if not callable(rate_limit_stats):
+            return
+        try:
+            limits = rate_limit_stats()
+        except Exception:
+            return
+        if limits.get("waits") or limits.get("throttled"):
+            print(
+                f"[R] Rate limiter: {limits.get('waits', 0)} request(s) waited "
+                f"{limits.get('waited_seconds', 0.0):.1f}s in total, "
+                f"{limits.get('throttled', 0)} throttled response(s) this session."
+            )
+
+    def _download_source_image(self, img_url: str, headers: dict):
+        # Image.open only parses the header, so oversized or animated images are
+        # rejected before the remaining body is transferred.
+        with self._http_client.open_image_stream(
+            img_url,
+            headers=headers,
+            timeout=30,
+            max_bytes=MAX_SOURCE_IMAGE_BYTES,
+        ) as stream:
+            header = rb_image_probe.probe_stream(stream)
+            if header is not None:
+                reason = rb_image_probe.rejection_reason(
+                    header.width,
+                    header.height,
+                    max_pixels=MAX_SOURCE_IMAGE_PIXELS,
+                    animated=header.animated,
+                    allow_animated=MAX_SOURCE_IMAGE_FRAMES > 1,
+                )
+                if reason:
+                    raise ValueError(f"downloaded {reason}")
+            source_image = Image.open(stream)
+            converted = None
+            try:
+                self._validate_source_image(source_image)
+                converted = source_image.convert("RGB")
+            finally:
+                close = getattr(source_image, "close", None)
+                if callable(close) and converted is not source_image:
+                    close()
+        return converted
+
     def _get_image_fetch_headers(self, api, img_url: str) -> dict:
         base = dict(api.headers)
         if "gelbooru" in img_url.lower() or "img4.gelbooru.com" in img_url.lower():
@@ -3367,223 +3068,28 @@ class Script(scripts.Script):
     def _process_single_prompt(
         self, index, raw_prompt, base_positive, base_negative, initial_additions, settings
     ):
-        (
-            shuffle_tags,
-            chaos_mode,
-            chaos_amount,
-            limit_tags_pct,
-            max_tags_count,
-            change_dash,
-            remove_artist_tags,
-            remove_character_tags,
-            remove_clothing_tags,
-            remove_text_tags,
-            restrict_subject_tags,
-            remove_furry_tags,
-            remove_headwear_tags,
-            preserve_hair_eye_colors,
-            remove_series_tags,
-        ) = settings
-        current_prompt = f"{initial_additions},{raw_prompt}" if initial_additions else raw_prompt
-        prompt_tags = [tag.strip() for tag in re.split(r"[\,\t\s]+", current_prompt) if tag.strip()]
-        base_hair_colors = set(getattr(self, "_base_hair_color_tags", set()) or [])
-        base_eye_colors = set(getattr(self, "_base_eye_color_tags", set()) or [])
-        # If removal flags are set, remove tags coming from selected post's artist/character lists
-        try:
-            post_meta = (
-                self._selected_posts[index]
-                if hasattr(self, "_selected_posts") and index < len(self._selected_posts)
-                else {}
-            )
-            artist_tags_meta = (
-                post_meta.get("artist_tags", []) if isinstance(post_meta, dict) else []
-            )
-            character_tags_meta = (
-                post_meta.get("character_tags", []) if isinstance(post_meta, dict) else []
-            )
-            norm = self._normalize_tag
-            artist_norm = {norm(t) for t in artist_tags_meta if isinstance(t, str)}
-            char_norm = {norm(t) for t in character_tags_meta if isinstance(t, str)}
-            if isinstance(post_meta, dict):
-                copyright_tags_meta = post_meta.get("copyright_tags") or []
-                if remove_character_tags and copyright_tags_meta:
-                    char_norm.update({norm(t) for t in copyright_tags_meta if isinstance(t, str)})
-                    char_norm.update(
-                        {
-                            (t or "").strip().lower()
-                            for t in copyright_tags_meta
-                            if isinstance(t, str)
-                        }
-                    )
-            artist_norm.update(
-                {(t or "").strip().lower() for t in artist_tags_meta if isinstance(t, str)}
-            )
-            char_norm.update(
-                {(t or "").strip().lower() for t in character_tags_meta if isinstance(t, str)}
-            )
-            general_tags = []
-            if isinstance(post_meta, dict):
-                raw_all_tags = post_meta.get("tags") or ""
-                if isinstance(raw_all_tags, str):
-                    general_tags = [
-                        t.strip() for t in re.split(r"[\s,]+", raw_all_tags) if t.strip()
-                    ]
-            if remove_character_tags and general_tags:
-                for tag in general_tags:
-                    tag_norm = norm(tag)
-                    if ("(" in tag and ")" in tag and not tag.strip().startswith("(")) or any(
-                        tag_norm.endswith(suffix)
-                        for suffix in (" series", " franchise", " character", " characters")
-                    ):
-                        char_norm.add(tag_norm)
-                        char_norm.add(tag.strip().lower())
-            if remove_artist_tags and general_tags:
-                for tag in general_tags:
-                    tag_norm = norm(tag)
-                    if (
-                        tag_norm.startswith("artist:")
-                        or tag_norm.endswith(" artist")
-                        or " drawn by" in tag_norm
-                    ):
-                        artist_norm.add(tag_norm)
-                        artist_norm.add(tag.strip().lower())
-            allowed_subjects = set()
-            if restrict_subject_tags:
-                allowed_subjects.update(self._extract_subject_tags(base_positive))
-                allowed_subjects.update(self._extract_subject_tags(initial_additions))
-                allowed_subjects.update(
-                    self._extract_subject_tags(getattr(self, "original_prompt", ""))
-                )
-            filter_ctx = getattr(self, "_removal_context", None)
-            favorites_guard: Set[str] = set()
-            if filter_ctx:
-                favorites_guard = set(filter_ctx.get("favorites", frozenset()))  # type: ignore[arg-type]
-            catalog = self._active_catalog()
-            norm_cache = getattr(self, "_tag_normal_cache", {})
-            if not isinstance(norm_cache, dict):
-                norm_cache = {}
-                self._tag_normal_cache = norm_cache
-            filtered_prompt_tags = []
-            primary_subject = None
-            for t in prompt_tags:
-                t_norm = self._normalize_cached(t, norm_cache)
-                canonical_tag = t_norm or self._canonicalize_raw_tag(t)
-                t_orig = (t or "").strip().lower()
-                is_favorite = bool(t_norm and t_norm in favorites_guard)
-                if is_favorite:
-                    filtered_prompt_tags.append(t)
-                    continue
-                should_remove = False
-                if remove_artist_tags and (
-                    t_norm in artist_norm
-                    or t_orig in artist_norm
-                    or (t_norm and t_norm.endswith(" artist"))
-                ):
-                    should_remove = True
-                elif remove_character_tags and (
-                    t_norm in char_norm
-                    or t_orig in char_norm
-                    or ("(" in t and ")" in t and not t.strip().startswith("("))
-                    or (t_norm and (t_norm.endswith(" series") or t_norm.endswith(" franchise")))
-                ):
-                    should_remove = True
-                if (
-                    not should_remove
-                    and remove_clothing_tags
-                    and rb_tag_pipeline.is_clothing_tag(t)
-                ):
-                    should_remove = True
-                if (
-                    not should_remove
-                    and remove_text_tags
-                    and rb_tag_pipeline.is_textual_tag(t, catalog.is_textual if catalog else None)
-                ):
-                    should_remove = True
-                if not should_remove and remove_furry_tags and rb_tag_pipeline.is_furry_tag(t):
-                    should_remove = True
-                if (
-                    not should_remove
-                    and remove_headwear_tags
-                    and rb_tag_pipeline.is_headwear_tag(t)
-                ):
-                    should_remove = True
-                if (
-                    not should_remove
-                    and remove_series_tags
-                    and rb_tag_pipeline.is_series_tag(t, catalog.category if catalog else None)
-                ):
-                    should_remove = True
-                if not should_remove and preserve_hair_eye_colors:
-                    if base_hair_colors and canonical_tag in base_hair_colors:
-                        pass
-                    elif base_eye_colors and canonical_tag in base_eye_colors:
-                        pass
-                    elif (
-                        base_hair_colors
-                        and rb_tag_pipeline.is_hair_color_tag(
-                            t, catalog.is_hair if catalog else None
-                        )
-                        and canonical_tag not in base_hair_colors
-                    ):
-                        should_remove = True
-                    elif (
-                        base_eye_colors
-                        and rb_tag_pipeline.is_eye_color_tag(t, catalog.is_eye if catalog else None)
-                        and canonical_tag not in base_eye_colors
-                    ):
-                        should_remove = True
-                if (
-                    not should_remove
-                    and restrict_subject_tags
-                    and rb_tag_pipeline.is_subject_tag(t)
-                ):
-                    subject_norm = t_norm
-                    if allowed_subjects:
-                        if subject_norm not in allowed_subjects:
-                            should_remove = True
-                    else:
-                        if primary_subject is None:
-                            primary_subject = subject_norm
-                        elif subject_norm != primary_subject:
-                            should_remove = True
-                if not should_remove and filter_ctx and t_norm:
-                    should_remove = self._tag_matches_removal(t_norm, filter_ctx)
-                if not should_remove:
-                    filtered_prompt_tags.append(t)
-            prompt_tags = filtered_prompt_tags
-        except Exception:
-            # fallback: ignore removal if anything goes wrong
-            pass
-        current_prompt = ",".join(prompt_tags)
-        if shuffle_tags:
-            tags_list = [t.strip() for t in current_prompt.split(",") if t.strip()]
-            random.shuffle(tags_list)
-            current_prompt = ",".join(tags_list)
-        current_negative = base_negative
-        if chaos_mode == "Shuffle All":
-            current_prompt, current_negative = generate_chaos(
-                current_prompt, current_negative, chaos_amount
-            )
-        elif chaos_mode == "Shuffle Negative":
-            _, current_negative = generate_chaos("", current_negative, chaos_amount)
-        if limit_tags_pct < 1.0:
-            current_prompt = rb_tag_pipeline.limit_prompt_tags(
-                current_prompt, limit_tags_pct, "Limit"
-            )
-        if max_tags_count > 0:
-            current_prompt = rb_tag_pipeline.limit_prompt_tags(
-                current_prompt, max_tags_count, "Max"
-            )
-        if change_dash:
-            current_prompt = current_prompt.replace("_", " ")
-            current_negative = current_negative.replace("_", " ")
-        if base_positive:
-            current_prompt = (
-                f"{base_positive}, {current_prompt}" if current_prompt else base_positive
-            )
-        current_prompt = rb_tag_pipeline.remove_repeated_tags(current_prompt)
-        current_negative = rb_tag_pipeline.remove_repeated_tags(current_negative)
-        return current_prompt, current_negative
+        selected_posts = getattr(self, "_selected_posts", None) or []
+        post_meta = selected_posts[index] if index < len(selected_posts) else {}
+        norm_cache = getattr(self, "_tag_normal_cache", {})
+        if not isinstance(norm_cache, dict):
+            norm_cache = {}
+            self._tag_normal_cache = norm_cache
+        return rb_tag_pipeline.process_prompt(
+            raw_prompt,
+            post=post_meta,
+            base_positive=base_positive,
+            base_negative=base_negative,
+            initial_additions=initial_additions,
+            settings=settings,
+            catalog=self._active_catalog(),
+            filter_ctx=getattr(self, "_removal_context", None),
+            base_colors=(
+                set(getattr(self, "_base_hair_color_tags", set()) or []),
+                set(getattr(self, "_base_eye_color_tags", set()) or []),
+            ),
+            subject_text=getattr(self, "original_prompt", ""),
+            cache=norm_cache,
+        )
 
     def _apply_loranado(
         self,
@@ -3835,13 +3341,7 @@ class Script(scripts.Script):
             pass
         self._adetailer_state.reset()
 
-        http_client = getattr(self, "_http_client", None)
-        if http_client is not None:
-            try:
-                http_client.close()
-            except Exception as exc:
-                print(f"[R Post] Warn: Failed to close booru session: {exc}")
-        self._http_client = rb_http_client.BooruSession(use_cache=False)
+        self._http_client = BOORU_SESSIONS.acquire(use_cache=False)
         if hasattr(self, "cache_installed_by_us"):
             try:
                 del self.cache_installed_by_us
@@ -4143,6 +3643,7 @@ class Script(scripts.Script):
             use_same_seed = options.use_same_seed
             reuse_cached_posts = options.reuse_cached_posts
             use_cache = options.use_cache
+            decoded_image_cache_mb = options.decoded_image_cache_mb
             log_prompt_sources_ui = options.log_prompt_sources
             remove_artist_tags_ui = options.remove_artist_tags
             remove_character_tags_ui = options.remove_character_tags
@@ -4183,6 +3684,7 @@ class Script(scripts.Script):
         self._post_crop_center = bool(crop_center)
         self._post_use_cache = bool(use_cache)
         self._reuse_cached_posts = bool(reuse_cached_posts)
+        self._configure_decoded_image_cache(decoded_image_cache_mb)
         self._adetailer_support_enabled = bool(enable_adetailer_support)
         self._post_adetailer_enabled = self._adetailer_support_enabled
         prev_manual_state = getattr(self, "_manual_adetailer_prev_enabled", False)
@@ -4205,7 +3707,7 @@ class Script(scripts.Script):
             self._is_anima_model = False
 
         self._current_booru_name = booru
-        if booru == "gelbooru":
+        if booru in ("gelbooru", "federated"):
             self._gelbooru_effective_credentials = self._resolve_gelbooru_credentials(
                 gelbooru_api_key_ui, gelbooru_user_id_ui
             )
@@ -4320,7 +3822,7 @@ class Script(scripts.Script):
             self._set_catalog_source("bundled")
         ok, message = self._load_tag_catalog()
         if not ok:
-            self._catalog = NoopCatalog()
+            self._set_catalog(NoopCatalog())
         self._tag_catalog_status_text = message
         self._save_tag_catalog_preferences()
         self._update_catalog_status(message)
@@ -4473,6 +3975,7 @@ class Script(scripts.Script):
                             toggles=toggles_tuple,
                             base_colors=base_colors_tuple,
                             allowed_subjects=allowed_subjects,
+                            fetched_page=self._last_fetched_page,
                         )
                     )
                     self._strict_img2img_active = strict_active
@@ -4530,7 +4033,11 @@ class Script(scripts.Script):
 
                 if use_img2img or use_ip:
                     self.last_img = self._fetch_images(
-                        selected_posts, use_last_img, booru, fringe_benefits
+                        selected_posts,
+                        use_last_img,
+                        booru,
+                        fringe_benefits,
+                        crop_target=(p.width, p.height) if crop_center else None,
                     )
             else:
                 # Use cached values
@@ -5811,16 +5318,13 @@ class Script(scripts.Script):
         except Exception as e:
             print(f"[R ProcessBatchPre] Error: {e}")
 
-    @classmethod
-    def random_number(self, sorting_order, size):
-        global COUNT
-        effective_count = COUNT
-        if effective_count <= 0:
-            print("[R] Warn: COUNT zero in random_number.")
+    def random_number(self, sorting_order, size, count):
+        if count <= 0:
+            print("[R] Warn: post count zero in random_number.")
             return []
         if size <= 0:
             return []
-        max_index = effective_count
+        max_index = count
         if sorting_order in ("Score Descending", "Score Ascending"):
             weights = np.arange(1, max_index + 1)
             weights = weights.astype(float)
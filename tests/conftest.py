@@ -14,6 +14,42 @@ def pytest_addoption(parser):
     )
 
 
+@pytest.fixture(autouse=True)
+def reset_dns_cache():
+    from ranboorux import http_client
+
+    http_client.DNS_CACHE.clear()
+    yield
+    http_client.DNS_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    from ranboorux import rate_limit
+
+    rate_limit.RATE_LIMITER.clear()
+    yield
+    rate_limit.RATE_LIMITER.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_total_counts():
+    from ranboorux.boorus.counts import TOTAL_COUNTS
+
+    TOTAL_COUNTS.clear()
+    yield
+    TOTAL_COUNTS.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog_registry():
+    from ranboorux.catalog_registry import CATALOGS
+
+    CATALOGS.clear()
+    yield
+    CATALOGS.clear()
+
+
 @pytest.fixture(autouse=True)
 def stub_modules(tmp_path, request):
     gradio_version = request.config.getoption("--gradio-version")
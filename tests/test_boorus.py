@@ -0,0 +1,445 @@
+import re
+import threading
+import time
+
+import pytest
+
+
+def test_harvest_posts_fetches_distinct_pages_and_dedupes_by_id(monkeypatch):
+    from ranboorux.boorus.simple import Danbooru
+
+    booru = Danbooru()
+    requested = []
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def fake_fetch(url, fields=None):
+        page = int(re.search(r"&page=(\d+)", url).group(1))
+        with lock:
+            requested.append(page)
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        # Neighbouring pages overlap by one post, as happens when new uploads shift pages.
+        return [{"id": page * 10 + offset, "tags": "a"} for offset in range(3)] + [
+            {"id": (page + 1) * 10, "tags": "a"}
+        ]
+
+    monkeypatch.setattr(booru, "_fetch_data", fake_fetch)
+    monkeypatch.setattr(booru, "_probe_total", lambda _tags_query: None)
+    monkeypatch.setattr(Danbooru, "MAX_CONCURRENT_PAGES", 2)
+
+    posts = booru.harvest_posts(tags_query="&tags=a", max_pages=4, pages=4)
+
+    assert sorted(requested) == [1, 2, 3, 4]
+    assert active["peak"] <= 2
+    ids = [post["id"] for post in posts]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {10, 11, 12, 20, 21, 22, 30, 31, 32, 40, 41, 42, 50}
+
+
+def test_harvest_posts_skips_failed_pages_and_excluded_pages(monkeypatch):
+    from ranboorux.boorus.simple import Safebooru
+
+    booru = Safebooru()
+    requested = []
+
+    def fake_fetch(url, fields=None):
+        page = int(re.search(r"&pid=(\d+)", url).group(1))
+        requested.append(page)
+        if page == 1:
+            raise RuntimeError("boom")
+        return [{"id": page, "tags": "a"}]
+
+    monkeypatch.setattr(booru, "_fetch_data", fake_fetch)
+    monkeypatch.setattr(booru, "_probe_total", lambda _tags_query: None)
+
+    posts = booru.harvest_posts(max_pages=3, pages=5, exclude_pages={2})
+
+    assert sorted(requested) == [0, 1]
+    assert [post["id"] for post in posts] == [0]
+
+
+def test_strict_prefilter_harvests_extra_pages_in_one_round(stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    calls = []
+
+    class HarvestingApi:
+        booru_name = "Danbooru"
+
+        def get_posts(self, **_kwargs):
+            raise AssertionError("serial extra rounds should not be used")
+
+        def harvest_posts(self, **kwargs):
+            calls.append(kwargs)
+            return [{"id": index, "tags": "1girl", "booru_name": "Danbooru"} for index in range(5)]
+
+    kept, _rejections, active, relaxed = script._apply_strict_img2img_prefilter(
+        [{"id": 99, "tags": "1girl", "booru_name": "Danbooru"}],
+        api=HarvestingApi(),
+        tags_query="&tags=1girl",
+        post_id=None,
+        num_images_needed=4,
+        max_pages=10,
+        filter_ctx=None,
+        toggles=(False,) * 10,
+        base_colors=(set(), set()),
+        allowed_subjects=set(),
+        fetched_page=4,
+    )
+
+    assert active and not relaxed
+    assert len(kept) == 4
+    assert calls == [
+        {
+            "tags_query": "&tags=1girl",
+            "max_pages": 10,
+            "pages": ranbooru.STRICT_IMG2IMG_HARVEST_PAGES,
+            "exclude_pages": (4,),
+        }
+    ]
+
+
+class _StubBackend:
+    def __init__(self, booru_name, posts, delay=0.0, error=None):
+        from ranboorux.boorus.simple import Danbooru
+
+        self.booru_name = booru_name
+        self.http = None
+        self.queries = []
+        self._delay = delay
+        self._error = error
+        self._raw = posts
+        self._standardizer = Danbooru()
+
+    def get_posts(self, tags_query="", max_pages=10, post_id=None):
+        self.queries.append(tags_query)
+        time.sleep(self._delay)
+        if self._error:
+            raise self._error
+        posts = self._standardizer._standardize_posts(self._raw)
+        for post in posts:
+            post["booru_name"] = self.booru_name
+        return posts
+
+
+def test_federated_merges_backends_and_drops_cross_posts():
+    from ranboorux.boorus.federated import FederatedBooru
+
+    md5 = "0123456789abcdef0123456789abcdef"
+    danbooru = _StubBackend(
+        "Danbooru",
+        [
+            {"id": 1, "md5": md5, "file_url": "https://d.test/1.png"},
+            {
+                "id": 2,
+                "source": "https://www.pixiv.net/artworks/7/",
+                "file_url": "https://d.test/2.png",
+            },
+        ],
+    )
+    gelbooru = _StubBackend(
+        "Gelbooru",
+        [
+            {"id": 10, "hash": md5.upper(), "file_url": "https://g.test/10.png"},
+            {
+                "id": 11,
+                "source": "http://pixiv.net/artworks/7",
+                "file_url": "https://g.test/11.png",
+            },
+            {"id": 12, "file_url": "https://g.test/12.png"},
+        ],
+    )
+    safebooru = _StubBackend("Safebooru", [{"id": 20, "file_url": "https://s.test/20.png"}])
+    federated = FederatedBooru([(danbooru, 1.0), (gelbooru, 2.0), (safebooru, 0.5)])
+
+    result = federated.get_posts(tags_query={"danbooru": "&tags=a", "gelbooru": "&tags=b"})
+    posts = result.posts
+
+    assert sorted((post["booru_name"], post["id"]) for post in posts) == [
+        ("Danbooru", 1),
+        ("Danbooru", 2),
+        ("Gelbooru", 12),
+        ("Safebooru", 20),
+    ]
+    weights = {post["id"]: post["pool_weight"] for post in posts}
+    assert weights == {1: 0.5, 2: 0.5, 12: 2.0, 20: 0.5}
+    assert danbooru.queries == ["&tags=a"]
+    assert gelbooru.queries == ["&tags=b"]
+    assert safebooru.queries == [""]
+
+
+def test_federated_keeps_same_source_posts_with_different_md5s():
+    from ranboorux.boorus.federated import FederatedBooru
+
+    source = "https://twitter.com/artist/status/42"
+    danbooru = _StubBackend(
+        "Danbooru",
+        [
+            {"id": 1, "md5": "a" * 32, "source": source, "file_url": "https://d.test/1.png"},
+            {"id": 2, "md5": "b" * 32, "source": source, "file_url": "https://d.test/2.png"},
+        ],
+    )
+    gelbooru = _StubBackend(
+        "Gelbooru",
+        [
+            {"id": 10, "hash": "c" * 32, "source": source, "file_url": "https://g.test/10.png"},
+            {"id": 11, "hash": "b" * 32, "file_url": "https://g.test/11.png"},
+        ],
+    )
+    safebooru = _StubBackend(
+        "Safebooru", [{"id": 20, "source": source, "file_url": "https://s.test/20.png"}]
+    )
+    federated = FederatedBooru([(danbooru, 1.0), (gelbooru, 1.0), (safebooru, 1.0)])
+
+    posts = federated.get_posts().posts
+
+    assert sorted((post["booru_name"], post["id"]) for post in posts) == [
+        ("Danbooru", 1),
+        ("Danbooru", 2),
+        ("Gelbooru", 10),
+    ]
+
+
+def test_federated_skips_slow_and_failing_backends():
+    from ranboorux.boorus.federated import FederatedBooru
+
+    fast = _StubBackend("Danbooru", [{"id": 1, "file_url": "https://d.test/1.png"}])
+    slow = _StubBackend("Gelbooru", [{"id": 2, "file_url": "https://g.test/2.png"}], delay=1.0)
+    broken = _StubBackend("Safebooru", [], error=RuntimeError("boom"))
+    federated = FederatedBooru([(fast, 1.0), (slow, 1.0), (broken, 1.0)], timeout=0.1)
+
+    started = time.monotonic()
+    posts = federated.get_posts(tags_query="&tags=a").posts
+
+    assert time.monotonic() - started < 0.8
+    assert [post["id"] for post in posts] == [1]
+
+
+def test_federated_raises_when_every_backend_fails(stub_modules):
+    import scripts.ranbooru as ranbooru
+    from ranboorux.boorus.federated import FederatedBooru
+
+    broken = _StubBackend("Danbooru", [], error=RuntimeError("boom"))
+
+    with pytest.raises(ranbooru.BooruError):
+        FederatedBooru([(broken, 1.0)]).get_posts()
+
+
+def test_script_sends_each_federated_backend_its_own_rating(monkeypatch, stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    monkeypatch.setattr(script, "_apply_optional_catalog", lambda tags, **_kwargs: (tags, None))
+    seen = {}
+
+    class FakeFederated:
+        booru_name = "Federated"
+        backend_names = ["danbooru", "safebooru"]
+
+        def get_posts(self, tags_query="", max_pages=10, post_id=None):
+            seen.update(tags_query)
+            return [{"id": 1}]
+
+    script._fetch_booru_posts(FakeFederated(), "1girl", "Explicit", 5, None)
+
+    assert seen == {
+        "danbooru": "&tags=1girl+rating:e+-animated",
+        "safebooru": "&tags=1girl+-animated",
+    }
+
+
+def test_select_posts_draws_by_pool_weight(stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    posts = [{"id": 1, "pool_weight": 0.0}, {"id": 2, "pool_weight": 1.0}]
+
+    selected = script._select_posts(posts, "Random", 6, None, False)
+
+    assert [post["id"] for post in selected] == [2] * 6
+
+
+def test_total_count_cache_expires_entries():
+    from ranboorux.boorus.counts import TotalCountCache
+
+    now = {"t": 0.0}
+    cache = TotalCountCache(ttl=10, clock=lambda: now["t"])
+    cache.put(("danbooru", "", "&tags=a"), 250)
+
+    assert cache.get(("danbooru", "", "&tags=a")) == 250
+    now["t"] = 11.0
+    assert cache.get(("danbooru", "", "&tags=a")) is None
+
+
+def test_count_probe_clamps_pages_and_is_cached(monkeypatch):
+    from ranboorux.boorus.simple import Danbooru
+
+    booru = Danbooru()
+    probes = []
+    pages = []
+
+    def fake_fetch(url, fields=None):
+        if "/counts/posts.json" in url:
+            probes.append(url)
+            return {"counts": {"posts": 150}}
+        pages.append(int(re.search(r"&page=(\d+)", url).group(1)))
+        return [{"id": index} for index in range(booru.page_size)]
+
+    monkeypatch.setattr(booru, "_fetch_data", fake_fetch)
+    for _ in range(12):
+        booru.get_posts(tags_query="&tags=rare_tag", max_pages=50)
+
+    assert probes == ["https://danbooru.donmai.us/counts/posts.json?tags=rare_tag"]
+    assert set(pages) <= {1, 2}
+
+
+def test_dapi_count_probe_reads_xml_total(monkeypatch):
+    from ranboorux.boorus.simple import Safebooru
+
+    booru = Safebooru()
+    probed = []
+    requested = []
+
+    class FakeHttp:
+        def get_text(self, url, **_kwargs):
+            probed.append(url)
+            return type("R", (), {"text": '<?xml version="1.0"?><posts count="0" offset="0"/>'})()
+
+    def fake_fetch(url, fields=None):
+        requested.append(int(re.search(r"&pid=(\d+)", url).group(1)))
+        return []
+
+    booru.http = FakeHttp()
+    monkeypatch.setattr(booru, "_fetch_data", fake_fetch)
+
+    assert booru.get_posts(tags_query="&tags=nothing", max_pages=20).posts == []
+    assert probed == [
+        "https://safebooru.org/index.php?page=dapi&s=post&q=index&limit=0&tags=nothing"
+    ]
+    assert requested == [0]
+
+
+def test_empty_page_shrinks_range_and_retries_inside_it(monkeypatch):
+    from ranboorux.boorus.simple import Konachan
+
+    booru = Konachan()
+    requested = []
+
+    def fake_fetch(url, fields=None):
+        page = int(re.search(r"&page=(\d+)", url).group(1))
+        requested.append(page)
+        return [{"id": page}] if page == 1 else []
+
+    monkeypatch.setattr(booru, "_fetch_data", fake_fetch)
+    monkeypatch.setattr(booru, "_probe_total", lambda _tags_query: None)
+    monkeypatch.setattr("random.choice", lambda options: options[-1])
+
+    result = booru.get_posts(tags_query="&tags=a", max_pages=10)
+
+    assert requested == [10, 9]
+    assert result.posts == [] and result.page == 9
+    requested.clear()
+    booru.get_posts(tags_query="&tags=a", max_pages=10)
+    assert requested == [8, 7]
+    # A short page pins the exact total, so only pages up to it are picked from now on.
+    booru._learn_total("&tags=a", 2, [{"id": 1}] * 5, None)
+    assert list(booru._page_range(10, booru._known_total("&tags=a"))) == [1, 2]
+
+
+def test_countless_full_pages_never_shrink_the_probed_total(monkeypatch):
+    import json
+
+    from ranboorux import http_client
+    from ranboorux.boorus import gelbooru
+    from ranboorux.boorus.counts import TOTAL_COUNTS
+
+    monkeypatch.setattr(gelbooru, "_DAPI_FORMATS", {})
+    booru = gelbooru.GelbooruCompatible("https://barelist.test")
+    requested = []
+
+    def fake_request(url):
+        requested.append(int(re.search(r"&pid=(\d+)", url).group(1)))
+        body = json.dumps([{"id": index, "tags": "a"} for index in range(booru.page_size)])
+        return http_client.BoundedResponse(
+            url=url, status_code=200, headers={}, content=body.encode("utf-8")
+        )
+
+    monkeypatch.setattr(booru, "_perform_request", fake_request)
+    monkeypatch.setattr(booru, "_probe_total", lambda _tags_query: 50000)
+
+    for _ in range(6):
+        result = booru.get_posts(tags_query="&tags=a", max_pages=50)
+        assert len(result.posts) == booru.page_size and result.total is None
+
+    assert TOTAL_COUNTS.get(booru._count_key("&tags=a")) == 50000
+    assert len(set(requested)) > 1
+    # A short page still pins the exact total; a full one never lowers it again.
+    booru._learn_total("&tags=a", 3, [{"id": 1}] * 5, None)
+    booru._learn_total("&tags=a", 1, [{"id": 1}] * booru.page_size, 120)
+    assert TOTAL_COUNTS.get(booru._count_key("&tags=a")) == 305
+
+
+def test_post_field_projection_keeps_standardized_posts_identical():
+    from ranboorux import http_client
+    from ranboorux.boorus.simple import Danbooru, Safebooru, e621
+
+    danbooru_post = {
+        "id": 3,
+        "rating": "g",
+        "score": 12,
+        "md5": "a" * 32,
+        "tag_string": "1girl solo",
+        "tag_string_artist": "someone",
+        "large_file_url": "https://cdn.test/3.png",
+        "image_width": 800,
+        "image_height": 600,
+        "media_asset": {
+            "variants": [
+                {"type": "720x720", "url": "https://cdn.test/s.jpg", "width": 720, "height": 540}
+            ]
+        },
+        "uploader_id": 9,
+        "tag_string_general": "1girl solo",
+        "pixiv_id": None,
+    }
+    e621_post = {
+        "id": 4,
+        "tags": {"general": ["wolf"], "artist": ["painter"]},
+        "score": {"total": 5},
+        "file": {"url": "https://e621.test/4.png", "width": 10, "height": 10, "md5": "b" * 32},
+        "sample": {"url": "https://e621.test/4s.png", "width": 5, "height": 5},
+        "relationships": {"parent_id": None},
+    }
+    safebooru_post = {"id": 5, "tags": "solo", "directory": "ab", "image": "5.png", "owner": "x"}
+
+    for booru, raw in (
+        (Danbooru(), danbooru_post),
+        (e621(), e621_post),
+        (Safebooru(), safebooru_post),
+    ):
+        (projected,) = http_client.project_fields([raw], booru.POST_FIELDS)
+        assert set(projected) < set(raw)
+        assert booru._standardize_post(projected) == booru._standardize_post(raw)
+
+
+def test_get_posts_returns_result_metadata_without_module_globals(monkeypatch):
+    from ranboorux.boorus.gelbooru import Gelbooru
+
+    booru = Gelbooru(True, {"api_key": "key", "user_id": "1"})
+
+    def fake_fetch(url, fields=None):
+        return {"@attributes": {"count": 250}, "post": [{"id": 1}, {"id": 2}]}
+
+    monkeypatch.setattr(booru, "_fetch_data", fake_fetch)
+    monkeypatch.setattr("random.choice", lambda options: options[0])
+
+    result = booru.get_posts(tags_query="&tags=a", max_pages=5)
+
+    assert [post["id"] for post in result.posts] == [1, 2]
+    assert (result.total, result.page, result.booru_name) == (250, 0, "Gelbooru")
+    assert result.elapsed >= 0.0
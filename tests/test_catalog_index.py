@@ -0,0 +1,142 @@
+import os
+import time
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import catalog_index
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED = os.path.join(REPO_ROOT, "data", "catalogs", "danbooru_tags.csv")
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _assert_same_answers(csv_catalog, binary, probes):
+    for probe in probes:
+        assert binary.resolve_alias(probe) == csv_catalog.resolve_alias(probe), probe
+        assert binary.category(probe) == csv_catalog.category(probe), probe
+        assert binary.has(probe) == csv_catalog.has(probe), probe
+        assert binary.is_hair(probe) == csv_catalog.is_hair(probe), probe
+        assert binary.is_eye(probe) == csv_catalog.is_eye(probe), probe
+        assert binary.is_textual(probe) == csv_catalog.is_textual(probe), probe
+
+
+def test_binary_catalog_matches_csv_catalog(tmp_path):
+    path = _write(
+        tmp_path / "tags.csv",
+        "tag,category,count,alias\n"
+        "1girl,0,1000,\n"
+        'naruto,4,500,"uchiwa,ナルト"\n'
+        "blue_hair,0,1500,azure hair\n"
+        "green_eyes,0,1200,emerald_eyes\n"
+        "speech_bubble,0,300,\n"
+        "café_(series),3,7,\n"
+        "solo,0,900,\n",
+    )
+    csv_catalog = rb_catalog.CsvCatalog(path)
+    binary = catalog_index.BinaryCatalog(path, catalog_index.compile_catalog(path))
+
+    _assert_same_answers(
+        csv_catalog,
+        binary,
+        [
+            "1girl",
+            "Uchiwa",
+            "ナルト",
+            "azure hair",
+            "emerald-eyes",
+            "speech bubble",
+            "CAFÉ_(series)",
+            "unknown_tag",
+            "",
+            "blue__hair",
+        ],
+    )
+    assert binary.tag_count() == 7
+    assert binary.alias_count() == csv_catalog.alias_count() == 5
+    assert binary.suggestions("1gril") == csv_catalog.suggestions("1gril")
+
+
+def test_bundled_catalog_compiles_to_equivalent_index(tmp_path):
+    index = catalog_index.compile_catalog(BUNDLED, str(tmp_path / "bundled.rbxcat"))
+    csv_catalog = rb_catalog.CsvCatalog(BUNDLED)
+    binary = catalog_index.BinaryCatalog(BUNDLED, index)
+
+    probes = sorted(csv_catalog._all_tags)[::97] + sorted(csv_catalog._aliases)[::211]
+    _assert_same_answers(csv_catalog, binary, probes)
+    assert binary.tag_count() == csv_catalog.tag_count()
+    assert binary.alias_count() == csv_catalog.alias_count()
+
+
+def test_open_catalog_compiles_once_and_recompiles_edited_csv(tmp_path, monkeypatch):
+    path = _write(tmp_path / "tags.csv", "tag,category,count,alias\nsolo,0,10,alone\n")
+    catalog = catalog_index.open_catalog(path)
+    assert isinstance(catalog, catalog_index.BinaryCatalog)
+    assert catalog_index.index_is_current(path)
+
+    compiled = []
+    original = catalog_index.compile_catalog
+    monkeypatch.setattr(
+        catalog_index,
+        "compile_catalog",
+        lambda *a, **kw: compiled.append(a) or original(*a, **kw),
+    )
+    catalog_index.open_catalog(path)
+    assert compiled == []
+
+    _write(tmp_path / "tags.csv", "tag,category,count,alias\nsolo,0,10,alone\nhat,0,5,cap\n")
+    stamp = time.time() + 5
+    os.utime(path, (stamp, stamp))
+    previous_map = catalog._map
+    catalog.maybe_reload()
+    assert len(compiled) == 1
+    assert previous_map.closed and not catalog._map.closed
+    assert catalog.resolve_alias("cap") == "hat" and catalog.has("hat")
+
+
+def test_open_catalog_falls_back_to_csv_when_index_cannot_be_written(tmp_path, monkeypatch):
+    path = _write(tmp_path / "tags.csv", "tag,category,count,alias\nsolo,0,10,alone\n")
+
+    def read_only(*_args):
+        raise PermissionError("read-only install")
+
+    monkeypatch.setattr(catalog_index, "compile_catalog", read_only)
+    catalog = catalog_index.open_catalog(path)
+
+    assert isinstance(catalog, rb_catalog.CsvCatalog)
+    assert catalog.resolve_alias("alone") == "solo"
+
+
+def test_registry_refresh_recompiles_the_index_from_changed_rows_only(tmp_path, monkeypatch):
+    from ranboorux.catalog_registry import CatalogRegistry
+
+    rows = "".join(f"tag_{idx},0,{idx},alias_{idx}\n" for idx in range(50))
+    path = _write(tmp_path / "tags.csv", "tag,category,count,alias\n" + rows)
+    registry = CatalogRegistry()
+    current = registry.acquire(path)
+    assert isinstance(current, catalog_index.BinaryCatalog)
+
+    parsed = []
+    original = rb_catalog.CsvCatalog._parse_row
+    monkeypatch.setattr(
+        rb_catalog.CsvCatalog,
+        "_parse_row",
+        lambda self, row, columns=None: parsed.append(row[0]) or original(self, row, columns),
+    )
+    probes = ["tag_7", "alias_7", "hat", "cap", "tag_49", "brown_hair"]
+    for stamp, extra in ((5, "hat,0,5,cap\n"), (10, "hat,0,5,cap\nbrown_hair,0,3,\n")):
+        edited = rows.replace("tag_7,0,7,alias_7\n", "tag_7,3,7,alias_7\n")
+        _write(tmp_path / "tags.csv", "tag,category,count,alias\n" + edited + extra)
+        later = time.time() + stamp
+        os.utime(path, (later, later))
+        parsed.clear()
+        fresh = registry.refresh(current)
+
+        assert isinstance(fresh, catalog_index.BinaryCatalog) and fresh is not current
+        assert parsed == (["tag_7", "hat"] if stamp == 5 else ["brown_hair"])
+        _assert_same_answers(rb_catalog.CsvCatalog(path), fresh, probes)
+        # The replaced version was unused, so the registry dropped and unmapped it.
+        assert current._map.closed
+        current = fresh
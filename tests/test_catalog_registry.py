@@ -0,0 +1,127 @@
+import os
+import time
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import catalog_registry as registry_module
+from ranboorux.catalog_registry import CATALOGS, CatalogRegistry
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _touch_later(path):
+    stamp = time.time() + 5
+    os.utime(path, (stamp, stamp))
+
+
+def _no_stat(path):
+    raise AssertionError(f"unexpected stat of {path}")
+
+
+def test_scripts_share_one_catalog_instance(tmp_path):
+    import scripts.ranbooru as ranbooru
+
+    path = _write(tmp_path / "tags.csv", "tag,category,count,alias\nsolo,0,10,alone\n")
+    txt2img, img2img = ranbooru.Script(), ranbooru.Script()
+    for script in (txt2img, img2img):
+        script._use_tag_catalog = True
+        script._catalog_source = "custom"
+        script._custom_catalog_path = path
+        script._tag_catalog_path = path
+        ok, message = script._load_tag_catalog()
+        assert ok, message
+
+    assert txt2img._catalog is img2img._catalog
+    assert txt2img._active_catalog() is img2img._catalog
+    assert CATALOGS.stats()["loads"] == 1
+
+    # Reloading the same file keeps a single reference per script.
+    txt2img._load_tag_catalog()
+    img2img._set_catalog(ranbooru.NoopCatalog())
+    txt2img._set_catalog(ranbooru.NoopCatalog())
+    assert CATALOGS.stats()["in_use"] == 0
+
+
+def test_script_unload_releases_catalogs_and_stops_the_watcher(tmp_path):
+    import scripts.ranbooru as ranbooru
+
+    path = _write(tmp_path / "tags.csv", "tag,category,count,alias\nsolo,0,10,alone\n")
+    script = ranbooru.Script()
+    script._catalog_source = "custom"
+    script._custom_catalog_path = path
+    ok, message = script._load_tag_catalog()
+    assert ok, message
+    assert CATALOGS.stats()["in_use"] == 1 and CATALOGS._watcher is not None
+
+    ranbooru._on_script_unloaded()
+
+    assert isinstance(script._catalog, ranbooru.NoopCatalog)
+    assert CATALOGS.stats()["in_use"] == 0
+    assert CATALOGS._watcher is None
+
+
+def test_registry_refcounts_idles_and_follows_file_edits(tmp_path):
+    opened = []
+
+    def opener(path):
+        opened.append(path)
+        return rb_catalog.CsvCatalog(path)
+
+    registry = CatalogRegistry(opener=opener, max_idle=1)
+    first = _write(tmp_path / "a.csv", "tag,category,count,alias\nsolo,0,10,alone\n")
+    second = _write(tmp_path / "b.csv", "tag,category,count,alias\nhat,0,5,cap\n")
+
+    a = registry.acquire(first)
+    assert registry.acquire(first) is a
+    registry.release(a)
+    registry.release(a)
+    assert registry.acquire(first) is a  # still idle-cached after the last release
+    registry.release(a)
+    registry.release(registry.acquire(second))  # evicts a from the idle cache
+    assert registry.acquire(first) is not a
+    assert len(opened) == 3
+
+    current = registry.acquire(first)
+    assert registry.refresh(current) is current
+    _write(tmp_path / "a.csv", "tag,category,count,alias\nsolo,0,10,alone\nsmile,0,9,grin\n")
+    _touch_later(tmp_path / "a.csv")
+    fresh = registry.refresh(current)
+    assert fresh is not current and fresh.resolve_alias("grin") == "smile"
+    assert current.resolve_alias("grin") == "grin"  # shared objects are never mutated
+    registry.release(rb_catalog.NoopCatalog())  # unknown objects are ignored
+
+
+def test_watcher_reports_edits_and_reloads_only_changed_rows(tmp_path, monkeypatch):
+    opened = []
+
+    def opener(path):
+        opened.append(path)
+        return rb_catalog.CsvCatalog(path)
+
+    registry = CatalogRegistry(opener=opener)
+    rows = "".join(f"tag_{idx},0,{idx},alias_{idx}\n" for idx in range(50))
+    path = _write(tmp_path / "tags.csv", "tag,category,count,alias\n" + rows)
+    current = registry.acquire(path)
+    registry.watch(interval=60)  # scans are driven by hand below
+    try:
+        edited = rows.replace("tag_7,0,7,alias_7\n", "tag_7,3,7,alias_7\n")
+        _write(tmp_path / "tags.csv", "tag,category,count,alias\n" + edited + "hat,0,5,cap\n")
+        _touch_later(tmp_path / "tags.csv")
+
+        monkeypatch.setattr(registry_module, "catalog_key", _no_stat)
+        assert registry.refresh(current) is current  # nothing observed yet, nothing stat'ed
+        monkeypatch.undo()
+        assert registry.scan() == 1
+
+        fresh = registry.refresh(current)
+        assert fresh is not current and len(opened) == 1
+        assert fresh.last_reload["parsed"] == 2
+        assert fresh.category("alias_7") == 3 and fresh.resolve_alias("cap") == "hat"
+        assert current.category("alias_7") == 0 and not current.has("hat")
+        reference = rb_catalog.CsvCatalog(path)
+        for name in ("_aliases", "_cats", "_counts", "_textual", "_hair", "_eyes", "_all_tags"):
+            assert getattr(fresh, name) == getattr(reference, name), name
+    finally:
+        registry.stop()
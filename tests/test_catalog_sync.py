@@ -0,0 +1,144 @@
+import json
+import threading
+
+import pytest
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import catalog_sync
+
+
+class FakeDapi:
+    base_url = "https://booru.test"
+
+    def __init__(self, tags, aliases, fail_tag_pages=()):
+        self.tags = tags
+        self.aliases = aliases
+        self.fail_tag_pages = set(fail_tag_pages)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _page(entries, limit, page, after_id):
+        if after_id is not None:
+            entries = [entry for entry in entries if int(entry["id"]) > after_id]
+        return entries[page * limit : (page + 1) * limit]
+
+    def get_tags(self, name_pattern=None, limit=100, page=None, after_id=None):
+        with self._lock:
+            self.calls.append(("tag", page, after_id))
+        if page in self.fail_tag_pages:
+            raise RuntimeError("site down")
+        return self._page(self.tags, limit, page, after_id)
+
+    def get_tag_aliases(self, name_pattern=None, limit=100, page=None, after_id=None):
+        with self._lock:
+            self.calls.append(("alias", page, after_id))
+        return self._page(self.aliases, limit, page, after_id)
+
+
+def _tags(count):
+    return [
+        {"id": str(i), "name": f"tag_{i}", "count": str(1000 - i), "type": "0"}
+        for i in range(1, count + 1)
+    ]
+
+
+def test_sync_writes_catalog_csv_with_aliases_and_categories(tmp_path):
+    tags = _tags(5) + [
+        {"id": "6", "name": "hatsune_miku", "count": "5000", "type": "character"},
+        {"id": "7", "name": "don&#039;t_stop", "count": "2", "type": "3"},
+    ]
+    aliases = [
+        {"id": "1", "alias": "miku", "tag": "hatsune_miku", "status": "active"},
+        {"id": "2", "alias": "old_name", "tag": "tag_1", "status": "pending"},
+    ]
+    api = FakeDapi(tags, aliases)
+    path = tmp_path / "site.csv"
+
+    totals = catalog_sync.CatalogSync(api, str(path), page_size=2, workers=3).run()
+
+    assert totals == {"tags": 7, "aliases": 1, "rows": 7, "incremental": False}
+    assert path.read_text(encoding="utf-8").splitlines()[:2] == [
+        "tag,category,count,alias",
+        "hatsune_miku,4,5000,miku",
+    ]
+    catalog = rb_catalog.CsvCatalog(str(path))
+    assert catalog.resolve_alias("miku") == "hatsune_miku"
+    assert catalog.category("don't_stop") == 3
+    assert catalog.resolve_alias("old_name") == "old_name"
+    state = json.loads((tmp_path / "site.csv.sync.json").read_text(encoding="utf-8"))
+    assert state["last_tag_id"] == 7 and state["last_alias_id"] == 1
+    assert not (tmp_path / "site.csv.sync-journal.jsonl").exists()
+    # Listings stop once the first short page is known, give or take in-flight pages.
+    assert max(page for kind, page, _after in api.calls if kind == "tag") <= 3 + 2
+
+
+def test_sync_resumes_from_journal_after_a_failed_page(tmp_path):
+    path = tmp_path / "site.csv"
+    api = FakeDapi(_tags(9), [], fail_tag_pages={2})
+
+    with pytest.raises(RuntimeError):
+        catalog_sync.CatalogSync(api, str(path), page_size=2, workers=1).run()
+    assert not path.exists()
+    journal = tmp_path / "site.csv.sync-journal.jsonl"
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write('{"kind": "tag", "pa')  # torn line from an interrupted write
+
+    api.fail_tag_pages.clear()
+    api.calls.clear()
+    totals = catalog_sync.CatalogSync(api, str(path), page_size=2, workers=1).run()
+
+    assert [page for kind, page, _after in api.calls if kind == "tag"] == [2, 3, 4]
+    assert totals["tags"] == 9
+    assert len(catalog_sync.read_catalog_rows(str(path))) == 9
+
+
+def test_read_catalog_rows_splits_aliases_like_the_catalog(tmp_path):
+    path = tmp_path / "tags.csv"
+    path.write_text(
+        'tag,category,count,alias\nblue_hair,0,5,"azure_hair sky_hair, cyan_hair"\n',
+        encoding="utf-8",
+    )
+
+    rows = catalog_sync.read_catalog_rows(str(path))
+
+    assert rows["blue_hair"][2] == {"azure_hair", "sky_hair", "cyan_hair"}
+
+
+def test_incremental_sync_fetches_only_newer_tags(tmp_path):
+    path = tmp_path / "site.csv"
+    api = FakeDapi(_tags(3), [{"id": "1", "alias": "first", "tag": "tag_1"}])
+    catalog_sync.CatalogSync(api, str(path), page_size=10).run()
+
+    api.tags = _tags(5)
+    api.aliases.append({"id": "2", "alias": "fifth", "tag": "tag_5"})
+    api.calls.clear()
+    totals = catalog_sync.CatalogSync(api, str(path), page_size=10).run()
+
+    assert totals == {"tags": 2, "aliases": 1, "rows": 5, "incremental": True}
+    assert ("tag", 0, 3) in api.calls and ("alias", 0, 1) in api.calls
+    rows = catalog_sync.read_catalog_rows(str(path))
+    assert rows["tag_1"][2] == {"first"} and rows["tag_5"][2] == {"fifth"}
+
+    api.calls.clear()
+    catalog_sync.CatalogSync(api, str(path), page_size=10).run(full=True)
+    assert ("tag", 0, None) in api.calls
+
+
+def test_gelbooru_compatible_tag_listing_pages_by_pid_and_after_id(monkeypatch):
+    from ranboorux.boorus.gelbooru import GelbooruCompatible
+
+    api = GelbooruCompatible("https://booru.test")
+    queries = []
+    monkeypatch.setattr(
+        api, "_request_dapi", lambda url, entity: queries.append((url, entity)) or ([], 0)
+    )
+
+    api.get_tags(limit=50, page=3, after_id=120)
+    api.get_tag_aliases(name_pattern="miku%")
+
+    assert queries[0] == (
+        "https://booru.test/index.php?page=dapi&s=tag&q=index&limit=50&pid=3&after_id=120",
+        "tag",
+    )
+    assert queries[1][0].endswith("s=tag_alias&q=index&limit=100&name_pattern=miku%25")
@@ -0,0 +1,85 @@
+import difflib
+import os
+import random
+import time
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import fuzzy_index
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED = os.path.join(REPO_ROOT, "data", "catalogs", "danbooru_tags.csv")
+
+
+def test_trigram_search_ranks_close_names_by_count():
+    index = fuzzy_index.TrigramIndex(
+        ["long_hair", "long_hat", "short_hair", "hair_bow", "ad"], [900, 1000, 800, 50, 1]
+    )
+
+    assert index.search("long_hiar") == ["long_hat", "long_hair"]
+    assert index.search("long_hiar", cutoff=0.85) == ["long_hair"]
+    assert index.search("a", limit=1) == ["ad"]  # too short to share a trigram
+    assert index.search("zzzz") == []
+    assert "long_hair" in index.search("long_hiar", cutoff=0.5, exact=False)
+
+
+def _typos(names, count, seed=7):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz_"
+    typos = []
+    for _ in range(count):
+        name = rng.choice(names)
+        at = rng.randrange(len(name))
+        edit = rng.randrange(3)
+        if edit == 0:
+            name = name[:at] + rng.choice(alphabet) + name[at + 1 :]
+        elif edit == 1:
+            name = name[:at] + name[at + 1 :]
+        else:
+            name = name[:at] + rng.choice(alphabet) + name[at:]
+        typos.append(name)
+    return typos
+
+
+def test_catalog_suggestions_match_difflib_on_the_bundled_catalog():
+    catalog = rb_catalog.CsvCatalog(BUNDLED)
+    names = list(catalog._all_tags)
+    typos = ["1gril", "long_hiar", "blue_eys", "thighhihgs", "fletchex_(kancolle)"]
+
+    for typo in typos + _typos(sorted(names), 20):
+        pool = difflib.get_close_matches(typo, names, n=12, cutoff=0.6)
+        expected = sorted(pool, key=lambda name: (-catalog._counts.get(name, 0), name))[:3]
+        assert catalog.suggestions(typo, exact=True) == expected, typo
+
+
+def test_default_suggestions_are_fast_and_find_common_typos():
+    catalog = rb_catalog.CsvCatalog(BUNDLED)
+    fixes = {
+        "1gril": "1girl",
+        "long_hiar": "long_hair",
+        "blonde_hiar": "blonde_hair",
+        "thighhihgs": "thighhighs",
+        "ringed_ryes": "ringed_eyes",
+    }
+    for typo, fixed in fixes.items():
+        assert catalog.suggestions(typo)[0] == fixed, typo
+    assert "fletcher_(kancolle)" in catalog.suggestions("fletchex_(kancolle)")
+
+    typos = list(fixes) + _typos(sorted(catalog._all_tags), 30, seed=3)
+    elapsed = []
+    for typo in typos:
+        runs = []
+        for _ in range(3):
+            started = time.perf_counter()
+            catalog.suggestions(typo)
+            runs.append(time.perf_counter() - started)
+        elapsed.append(min(runs))
+    # About a millisecond locally; the margin absorbs slow CI machines.
+    assert sum(elapsed) / len(elapsed) < 0.003
+
+
+def test_suggestion_index_is_built_on_the_first_lookup():
+    catalog, _message = rb_catalog.load_catalog(BUNDLED)
+
+    assert catalog._fuzzy is None
+    catalog.suggestions("1gril")
+    assert catalog._fuzzy is not None
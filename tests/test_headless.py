@@ -0,0 +1,172 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from ranboorux import catalog as rb_catalog
+from ranboorux import headless
+from ranboorux.boorus import PostsResult
+
+
+class FakeBooru:
+    booru_name = "Danbooru"
+
+    def __init__(self, posts, fail_calls=()):
+        self.posts = posts
+        self.fail_calls = set(fail_calls)
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def get_posts(self, tags_query="", max_pages=10, post_id=None):
+        with self._lock:
+            self.queries.append(tags_query)
+            call = len(self.queries)
+        if call in self.fail_calls:
+            raise RuntimeError("booru down")
+        return PostsResult(posts=[dict(post) for post in self.posts], total=len(self.posts))
+
+
+def _posts():
+    return [
+        {
+            "id": 1,
+            "booru_name": "Danbooru",
+            "tags": "1girl yellow_hair smile",
+            "artist_tags": ["some_artist"],
+            "file_url": "https://img.test/1.png",
+        },
+        {
+            "id": 2,
+            "booru_name": "Danbooru",
+            "tags": "1boy hat sword",
+            "file_url": "https://img.test/2.png",
+        },
+    ]
+
+
+def _write_catalog(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text(
+        "tag,category,count,alias\n1girl,0,100,\nblonde_hair,0,50,yellow_hair\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_generator_runs_catalog_prefilter_and_prompt_steps(tmp_path):
+    catalog, _message = rb_catalog.load_catalog(_write_catalog(tmp_path))
+    api = FakeBooru(_posts())
+    options = headless.HeadlessOptions(
+        tags="yellow_hair",
+        mature_rating="Safe",
+        base_positive="masterpiece",
+        remove_headwear_tags=True,
+        shuffle_tags=False,
+    )
+    generator = headless.PromptGenerator(options, api=api, catalog=catalog)
+
+    records = generator.generate_batch(3, 4, first_index=12)
+
+    assert generator.tags_query == "&tags=blonde_hair+rating:g+-animated"
+    assert [record["index"] for record in records] == [12, 13, 14, 15]
+    assert {record["post_id"] for record in records} == {1}
+    assert records[0]["prompt"] == "masterpiece,1girl,yellow_hair,smile"
+    assert records[0]["batch"] == 3
+    assert records[0]["relaxed"] is False
+
+
+def test_strict_harvest_skips_the_page_already_fetched():
+    hat_post, kept_post = _posts()[1], _posts()[0]
+
+    class HarvestingBooru(FakeBooru):
+        def __init__(self):
+            super().__init__([hat_post])
+            self.harvests = []
+
+        def get_posts(self, tags_query="", max_pages=10, post_id=None):
+            result = super().get_posts(tags_query, max_pages, post_id)
+            result.page = 2
+            return result
+
+        def harvest_posts(self, **kwargs):
+            self.harvests.append(kwargs)
+            return [dict(kept_post)]
+
+    api = HarvestingBooru()
+    options = headless.HeadlessOptions(remove_headwear_tags=True, shuffle_tags=False)
+    generator = headless.PromptGenerator(options, api=api, catalog=None)
+
+    records = generator.generate_batch(0, 2)
+
+    assert {record["post_id"] for record in records} == {1}
+    assert [call["exclude_pages"] for call in api.harvests] == [(2,)]
+
+
+def test_run_streams_batches_and_resumes_missing_ones(tmp_path):
+    output = tmp_path / "prompts.jsonl"
+    api = FakeBooru(_posts(), fail_calls={2})
+    generator = headless.PromptGenerator(
+        headless.HeadlessOptions(strict=False), api=api, catalog=None
+    )
+
+    with open(output, "a", encoding="utf-8") as handle:
+        first = headless.run(generator, handle, count=7, batch_size=3, workers=1)
+
+    assert first == {"batches": 3, "skipped": 0, "written": 4, "failed": 1}
+    with open(output, "a", encoding="utf-8") as handle:
+        handle.write('{"batch": 9, "ind')  # torn line from an interrupted write
+    done = headless.completed_batches(str(output), 7, 3)
+    assert done == {0, 2}
+
+    with open(output, "a", encoding="utf-8") as handle:
+        second = headless.run(generator, handle, count=7, batch_size=3, workers=2, skip=done)
+
+    assert second["written"] == 3 and second["skipped"] == 2
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(record["index"] for record in records) == list(range(7))
+
+
+def test_completed_batches_treats_a_short_batch_as_missing(tmp_path):
+    output = tmp_path / "prompts.jsonl"
+    lines = [json.dumps({"batch": 0, "index": index}) + "\n" for index in range(3)]
+    lines.append(json.dumps({"batch": 1, "index": 3}) + "\n")  # 1 of 3 before a crash
+    output.write_text("".join(lines), encoding="utf-8")
+
+    assert headless.completed_batches(str(output), 7, 3) == {0}
+    assert output.read_text(encoding="utf-8") == "".join(lines[:3])
+
+
+def test_cli_writes_jsonl_without_webui_modules(tmp_path):
+    code = (
+        "import sys\n"
+        "from ranboorux import __main__ as cli, headless\n"
+        "from ranboorux.boorus import PostsResult\n"
+        "class Api:\n"
+        "    booru_name = 'Danbooru'\n"
+        "    def get_posts(self, tags_query='', max_pages=10, post_id=None):\n"
+        "        return PostsResult(posts=[{'id': 5, 'tags': 'solo smile'}])\n"
+        "original = headless.PromptGenerator.__init__\n"
+        "def patched(self, options, **kwargs):\n"
+        "    original(self, options, api=Api(), catalog=kwargs.get('catalog'))\n"
+        "headless.PromptGenerator.__init__ = patched\n"
+        "code = cli.main(sys.argv[1:])\n"
+        "heavy = [name for name in sys.modules "
+        "if name.split('.')[0] in ('scripts', 'gradio', 'modules')]\n"
+        "print('HEAVY:' + ','.join(heavy), file=sys.stderr)\n"
+        "raise SystemExit(code)\n"
+    )
+    output = tmp_path / "out.jsonl"
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code, "-o", str(output), "-n", "3", "--batch-size", "2"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "HEAVY:\n" in result.stderr
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert all(json.loads(line)["post_id"] == 5 for line in lines)
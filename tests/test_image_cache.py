@@ -0,0 +1,145 @@
+import os
+import types
+
+from ranboorux import http_client, image_cache
+
+
+def test_disk_cache_round_trips_and_persists(tmp_path):
+    cache = image_cache.DiskImageCache(str(tmp_path), max_bytes=1024)
+    cache.put("https://img.test/a.png", b"png-bytes")
+
+    assert cache.get("https://img.test/a.png") == b"png-bytes"
+    assert cache.get("https://img.test/missing.png") is None
+
+    reopened = image_cache.DiskImageCache(str(tmp_path), max_bytes=1024)
+    assert reopened.get("https://img.test/a.png") == b"png-bytes"
+    assert reopened.stats()["entries"] == 1
+
+
+def test_disk_cache_drops_blob_with_mismatched_content(tmp_path):
+    cache = image_cache.DiskImageCache(str(tmp_path), max_bytes=1024)
+    cache.put("https://img.test/a.png", b"original")
+    key = image_cache.url_key("https://img.test/a.png")
+    shard = tmp_path / key[:2]
+    (blob,) = list(shard.iterdir())
+    blob.write_bytes(b"tampered")
+
+    assert cache.get("https://img.test/a.png") is None
+    assert not blob.exists()
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = image_cache.DiskImageCache(str(tmp_path), max_bytes=20)
+    cache.put("https://img.test/a.png", b"a" * 8)
+    cache.put("https://img.test/b.png", b"b" * 8)
+    assert cache.get("https://img.test/a.png") == b"a" * 8
+    cache.put("https://img.test/c.png", b"c" * 8)
+
+    assert cache.get("https://img.test/b.png") is None
+    assert cache.get("https://img.test/a.png") == b"a" * 8
+    assert cache.get("https://img.test/c.png") == b"c" * 8
+    assert cache.stats()["bytes"] == 16
+
+
+def test_get_bytes_serves_repeat_downloads_from_disk_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        http_client.socket,
+        "getaddrinfo",
+        lambda *_args, **_kwargs: [(None, None, None, None, ("93.184.216.34", 443))],
+    )
+    calls = []
+
+    class FakeSession:
+        def get(self, url, **_kwargs):
+            calls.append(url)
+            return types.SimpleNamespace(
+                status_code=200,
+                headers={"content-type": "image/png"},
+                iter_content=lambda chunk_size: iter([b"image-data"]),
+                raise_for_status=lambda: None,
+                close=lambda: None,
+            )
+
+    monkeypatch.setattr(http_client.requests, "Session", lambda: FakeSession())
+    disk_cache = image_cache.DiskImageCache(str(tmp_path / "images"))
+    session = http_client.BooruSession(use_cache=False, image_cache=disk_cache)
+
+    first = session.get_bytes("https://img.test/a.png")
+    second = session.get_bytes("https://img.test/a.png")
+    session.get_bytes("https://img.test/b.png?token=secret")
+    session.get_bytes("https://img.test/b.png?token=secret")
+
+    assert first == second == b"image-data"
+    assert calls.count("https://img.test/a.png") == 1
+    assert calls.count("https://img.test/b.png?token=secret") == 2
+    assert os.path.isdir(tmp_path / "images")
+
+
+class _Decoded:
+    def __init__(self, width, height, bands="RGB"):
+        self.size = (width, height)
+        self._bands = tuple(bands)
+
+    def getbands(self):
+        return self._bands
+
+
+def test_decoded_cache_evicts_least_recently_used_by_pixel_bytes():
+    cache = image_cache.DecodedImageCache(max_bytes=2 * 10 * 10 * 3)
+    first, second, third = _Decoded(10, 10), _Decoded(10, 10), _Decoded(10, 10)
+    cache.put(("danbooru", "1", "https://img.test/1.png"), first)
+    cache.put(("danbooru", "2", "https://img.test/2.png"), second)
+    assert cache.get(("danbooru", "1", "https://img.test/1.png")) is first
+
+    cache.put(("danbooru", "3", "https://img.test/3.png"), third)
+
+    assert cache.get(("danbooru", "2", "https://img.test/2.png")) is None
+    assert cache.get(("danbooru", "3", "https://img.test/3.png")) is third
+    assert cache.stats()["bytes"] == 600
+
+    cache.resize(0)
+    assert cache.stats()["entries"] == 0
+
+
+def test_decoded_image_key_uses_booru_post_id_and_url():
+    post = {"id": 42, "file_url": "https://img.test/42.png"}
+
+    assert image_cache.decoded_image_key("Danbooru", post) == (
+        "danbooru",
+        "42",
+        "https://img.test/42.png",
+    )
+    assert image_cache.decoded_image_key("danbooru", {"id": 1}) is None
+
+
+def test_script_fetch_images_reuses_decoded_images_across_runs(monkeypatch, stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    ranbooru.Script._configure_decoded_image_cache(64)
+    downloads = []
+
+    class FakeApi:
+        headers = {}
+
+    def download(url, _headers):
+        downloads.append(url)
+        return _Decoded(8, 8)
+
+    monkeypatch.setattr(script, "_get_booru_api", lambda *_args, **_kwargs: FakeApi())
+    monkeypatch.setattr(script, "_download_source_image", download)
+
+    first_run = [{"id": 1, "file_url": "https://img.test/1.png"}]
+    second_run = [
+        {"id": 2, "file_url": "https://img.test/2.png"},
+        {"id": 1, "file_url": "https://img.test/1.png"},
+    ]
+    first_images = script._fetch_images(first_run, False, "danbooru", True)
+    second_images = script._fetch_images(second_run, False, "danbooru", True)
+
+    assert downloads == ["https://img.test/1.png", "https://img.test/2.png"]
+    assert second_images[1] is first_images[0]
+
+    ranbooru.Script._configure_decoded_image_cache(0)
+    script._fetch_images(first_run, False, "danbooru", True)
+    assert downloads[-1] == "https://img.test/1.png" and len(downloads) == 3
@@ -0,0 +1,166 @@
+import threading
+import time
+
+from ranboorux import image_fetch
+
+
+def test_fetch_concurrently_keeps_input_order():
+    delays = {
+        "https://a.test/1.png": 0.05,
+        "https://b.test/2.png": 0.0,
+        "https://c.test/3.png": 0.02,
+    }
+
+    def fetch(url):
+        time.sleep(delays[url])
+        return url.rsplit("/", 1)[-1]
+
+    outcomes = image_fetch.fetch_concurrently(list(delays), fetch, max_workers=3)
+
+    assert [outcome.value for outcome in outcomes] == ["1.png", "2.png", "3.png"]
+    assert all(outcome.ok for outcome in outcomes)
+
+
+def test_fetch_concurrently_isolates_errors_and_skips_empty_urls():
+    def fetch(url):
+        if "bad" in url:
+            raise RuntimeError("boom")
+        return url
+
+    urls = ["https://ok.test/a.png", None, "https://bad.test/b.png", "https://ok.test/c.png"]
+    outcomes = image_fetch.fetch_concurrently(urls, fetch, max_workers=4)
+
+    assert outcomes[0].value == "https://ok.test/a.png"
+    assert outcomes[1].value is None and outcomes[1].error is None
+    assert isinstance(outcomes[2].error, RuntimeError)
+    assert outcomes[3].ok
+
+
+def test_fetch_concurrently_caps_requests_per_host():
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def fetch(url):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return url
+
+    urls = [f"https://cdn.test/{index}.png" for index in range(8)]
+    outcomes = image_fetch.fetch_concurrently(urls, fetch, max_workers=8, per_host_limit=2)
+
+    assert all(outcome.ok for outcome in outcomes)
+    assert active["peak"] <= 2
+
+
+def test_script_fetch_images_preserves_post_order(monkeypatch, stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+
+    class FakeApi:
+        headers = {}
+
+    class FakeImage:
+        def __init__(self, url):
+            self.url = url
+            self.size = (8, 8)
+
+    monkeypatch.setattr(script, "_get_booru_api", lambda *_args, **_kwargs: FakeApi())
+    monkeypatch.setattr(script, "_download_source_image", lambda url, _headers: FakeImage(url))
+
+    posts = [
+        {"file_url": "https://img.test/1.png"},
+        {"file_url": None},
+        {"file_url": "https://img.test/3.png"},
+    ]
+    images = script._fetch_images(posts, False, "danbooru", True)
+
+    assert [getattr(image, "url", None) for image in images] == [
+        "https://img.test/1.png",
+        None,
+        "https://img.test/3.png",
+    ]
+
+
+def test_fetch_concurrently_downloads_repeated_urls_once():
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return object()
+
+    urls = ["https://img.test/same.png"] * 16 + ["https://img.test/other.png"]
+    outcomes = image_fetch.fetch_concurrently(urls, fetch, max_workers=8)
+
+    assert sorted(calls) == ["https://img.test/other.png", "https://img.test/same.png"]
+    assert all(outcome.value is outcomes[0].value for outcome in outcomes[:16])
+    assert outcomes[16].value is not outcomes[0].value
+
+
+def test_fetch_concurrently_shares_errors_between_repeats():
+    def fetch(_url):
+        raise RuntimeError("boom")
+
+    outcomes = image_fetch.fetch_concurrently(["https://img.test/x.png"] * 3, fetch)
+
+    assert all(isinstance(outcome.error, RuntimeError) for outcome in outcomes)
+
+
+def _post_with_renditions():
+    return {
+        "file_url": "https://img.test/original.png",
+        "width": 4000,
+        "height": 3000,
+        "renditions": [
+            {"kind": "preview", "url": "https://img.test/p.jpg", "width": 150, "height": 113},
+            {"kind": "sample", "url": "https://img.test/s.jpg", "width": 1200, "height": 900},
+            {"kind": "720x720", "url": "https://img.test/m.webp", "width": 720, "height": 540},
+        ],
+    }
+
+
+def test_select_rendition_picks_smallest_covering_target():
+    post = _post_with_renditions()
+
+    assert image_fetch.select_rendition(post, (1152, 864)).url == "https://img.test/s.jpg"
+    assert image_fetch.select_rendition(post, (512, 384)).url == "https://img.test/m.webp"
+    assert image_fetch.select_rendition(post, (2048, 1536)).kind == "original"
+    assert image_fetch.select_rendition(post, None).kind == "original"
+
+
+def test_select_rendition_keeps_original_when_its_size_is_unknown():
+    post = _post_with_renditions()
+    del post["width"], post["height"]
+
+    assert image_fetch.select_rendition(post, (512, 384)).url == "https://img.test/original.png"
+
+
+def test_script_fetch_images_downloads_sample_for_img2img_target(monkeypatch, stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    downloads = []
+
+    class FakeApi:
+        headers = {}
+
+    class FakeImage:
+        size = (8, 8)
+
+    def download(url, _headers):
+        downloads.append(url)
+        return FakeImage()
+
+    monkeypatch.setattr(script, "_get_booru_api", lambda *_args, **_kwargs: FakeApi())
+    monkeypatch.setattr(script, "_download_source_image", download)
+
+    script._fetch_images([_post_with_renditions()], False, "danbooru", True)
+    script._fetch_images(
+        [_post_with_renditions()], False, "danbooru", True, crop_target=(2048, 2048)
+    )
+
+    assert downloads == ["https://img.test/s.jpg", "https://img.test/original.png"]
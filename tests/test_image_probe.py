@@ -0,0 +1,81 @@
+import io
+import struct
+import zlib
+
+from ranboorux import image_probe
+
+
+def _png_chunk(kind, payload):
+    body = kind + payload
+    return struct.pack(">I", len(payload)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def _png(width, height, animated=False):
+    data = image_probe._PNG_SIGNATURE
+    data += _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    if animated:
+        data += _png_chunk(b"acTL", struct.pack(">II", 2, 0))
+    return data + _png_chunk(b"IDAT", b"\x00" * 16)
+
+
+def test_probe_header_reads_png_size_and_animation():
+    assert image_probe.probe_header(_png(640, 480)) == image_probe.ImageHeader("PNG", 640, 480)
+    assert image_probe.probe_header(_png(64, 64, animated=True)).animated
+
+
+def test_probe_header_skips_jpeg_segments_before_sof():
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc2" + struct.pack(">HBHH", 11, 8, 3000, 4000) + b"\x03"
+    header = image_probe.probe_header(b"\xff\xd8" + app0 + sof)
+
+    assert (header.format, header.width, header.height) == ("JPEG", 4000, 3000)
+
+
+def test_probe_header_reads_webp_variants():
+    vp8x = b"RIFF\x00\x00\x00\x00WEBPVP8X" + struct.pack("<I", 10) + b"\x02\x00\x00\x00"
+    vp8x += (799).to_bytes(3, "little") + (599).to_bytes(3, "little")
+    header = image_probe.probe_header(vp8x)
+    assert (header.width, header.height, header.animated) == (800, 600, True)
+
+    bits = (1023) | (767 << 14)
+    vp8l = b"RIFF\x00\x00\x00\x00WEBPVP8L" + struct.pack("<I", 5) + b"\x2f"
+    vp8l += struct.pack("<I", bits) + b"\x00" * 5
+    assert image_probe.probe_header(vp8l) == image_probe.ImageHeader("WEBP", 1024, 768)
+
+
+def test_probe_stream_rewinds_and_rejects_oversized_dimensions():
+    stream = io.BytesIO(_png(20000, 20000) + b"\x00" * 100_000)
+    header = image_probe.probe_stream(stream)
+
+    assert stream.tell() == 0
+    assert image_probe.rejection_reason(header.width, header.height, max_pixels=50_000_000)
+    assert image_probe.rejection_reason(800, 600, max_pixels=50_000_000) is None
+
+
+def test_script_prescreens_posts_with_declared_dimensions(monkeypatch, stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    downloads = []
+
+    class FakeApi:
+        headers = {}
+
+    class FakeImage:
+        size = (8, 8)
+
+    def download(url, _headers):
+        downloads.append(url)
+        return FakeImage()
+
+    monkeypatch.setattr(script, "_get_booru_api", lambda *_args, **_kwargs: FakeApi())
+    monkeypatch.setattr(script, "_download_source_image", download)
+    posts = [
+        {"id": 1, "file_url": "https://img.test/huge.png", "width": 20000, "height": 20000},
+        {"id": 2, "file_url": "https://img.test/ok.png", "width": 800, "height": 600},
+    ]
+
+    images = script._fetch_images(posts, False, "danbooru", True)
+
+    assert downloads == ["https://img.test/ok.png"]
+    assert images[0] is None and images[1] is not None
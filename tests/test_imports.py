@@ -32,3 +32,28 @@ def test_smoke_import_all_stubs(stub_modules):
     sys.modules.pop("modules.ui_components", None)
     module = _reload_ranbooru()
     assert module is not None
+
+
+def test_booru_layer_imports_without_webui_modules():
+    import os
+    import subprocess
+
+    code = (
+        "import sys\n"
+        "from ranboorux.boorus import federated, gelbooru, simple\n"
+        "simple.Danbooru(); gelbooru.GelbooruCompatible('example.test')\n"
+        "heavy = [name for name in sys.modules "
+        "if name.split('.')[0] in ('scripts', 'gradio', 'modules', 'numpy', 'PIL', "
+        "'requests_cache')]\n"
+        "print(','.join(heavy))\n"
+    )
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == ""
@@ -68,6 +68,7 @@ def _args(**overrides):
         "lora_detected_loras": [],
         "anima_auto_detect": False,
         "anima_tune_img2img": True,
+        "decoded_image_cache_mb": 0,
         "lora_blacklist": [],
     }
     defaults.update(overrides)
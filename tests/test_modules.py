@@ -10,6 +10,16 @@ def test_image_ops_import():
     assert hasattr(image_ops, "resize_image")
 
 
+def test_image_ops_orientation_target_matches_check_orientation_rules():
+    import ranboorux.image_ops as image_ops
+
+    assert image_ops.orientation_target(4000, 2000) == (1152, 576)
+    assert image_ops.orientation_target(1000, 3000) == (512, 1536)
+    assert image_ops.orientation_target(2000, 1800) == (1024, 1024)
+    assert image_ops.orientation_target(700, 650) == (696, 696)
+    assert image_ops.orientation_label(300, 1000) == "Tall"
+
+
 def test_user_store_import():
     import ranboorux.user_store as user_store
 
@@ -59,6 +59,81 @@ def test_gelbooru_compat_parse_xml_entities():
     assert approx == 2
 
 
+def test_gelbooru_compat_streams_tag_xml_with_nested_fields():
+    import pytest
+
+    from ranboorux.boorus.common import BooruError
+    from ranboorux.boorus.gelbooru import GelbooruCompatible
+
+    client = GelbooruCompatible("https://example.com")
+    xml_payload = (
+        b'<?xml version="1.0" encoding="UTF-8"?><tags type="array">'
+        b"<tag id='1' name='solo' count='10' />"
+        b"<tag><id>2</id><name>smile</name><count>5</count></tag>"
+        b"</tags>"
+    )
+    entries, approx = client._parse_xml_entities(xml_payload, "tag")
+    assert entries == [
+        {"id": "1", "name": "solo", "count": "10"},
+        {"id": "2", "name": "smile", "count": "5"},
+    ]
+    assert approx is None  # no count attribute: the total is unknown, not len(entries)
+
+    with pytest.raises(BooruError):
+        client._parse_xml_entities("<rss><item /></rss>", "tag")
+    with pytest.raises(BooruError):
+        client._parse_xml_entities("<tag_aliases><tag_alias /></tag_aliases>", "tag")
+
+
+def test_gelbooru_compat_parses_xml_as_the_body_streams_in():
+    from ranboorux import http_client
+    from ranboorux.boorus.gelbooru import GelbooruCompatible
+
+    pulled = []
+
+    def chunks():
+        yield b"<tags count='3'>"
+        for index in range(3):
+            pulled.append(index)
+            yield f"<tag id='{index}' name='t{index}' />".encode()
+        yield b"</tags>"
+
+    body = http_client.BoundedStream(chunks(), "https://example.com", 1 << 20, retain=False)
+    assert body.peek(6) == b"<tags " and not pulled
+
+    entries, approx = GelbooruCompatible("https://example.com")._parse_xml_entities(body, "tag")
+    assert [entry["name"] for entry in entries] == ["t0", "t1", "t2"] and approx == 3
+    # Read bytes are dropped as the parser consumes them.
+    assert body.bytes_received > 0 and len(body._buffer) == 0
+
+
+def test_gelbooru_compat_remembers_xml_only_sites(monkeypatch):
+    from ranboorux import http_client
+    from ranboorux.boorus import gelbooru
+
+    monkeypatch.setattr(gelbooru, "_DAPI_FORMATS", {})
+    client = gelbooru.GelbooruCompatible("https://xmlonly.test")
+    requested = []
+
+    def fake_request(url, stream=False):
+        requested.append(url)
+        if url.endswith("&json=1"):
+            body = b"not json"
+        else:
+            body = b"<posts count='7'><post id='3' tags='a' /></posts>"
+        return http_client.BoundedResponse(url=url, status_code=200, headers={}, content=body)
+
+    monkeypatch.setattr(client, "_perform_request", fake_request)
+
+    for _ in range(3):
+        entries, approx = client._request_dapi(f"{client._post_endpoint}&pid=0", "post")
+        assert entries == [{"id": "3", "tags": "a"}] and approx == 7
+
+    assert sum(url.endswith("&json=1") for url in requested) == 1
+    assert len(requested) == 4
+    assert gelbooru._DAPI_FORMATS == {"https://xmlonly.test": "xml"}
+
+
 def test_standardize_post_uses_tag_dict():
     from ranboorux.boorus import Booru
 
@@ -93,6 +168,73 @@ def test_standardize_post_tag_string_override_and_heuristic():
     assert "foo_(series)" in post["character_tags"]
 
 
+def test_standardize_post_records_declared_dimensions():
+    from ranboorux.boorus import Booru
+
+    booru = Booru("Test", "https://example.com")
+    danbooru = booru._standardize_post({"id": 1, "image_width": 1200, "image_height": "900"})
+    e621 = booru._standardize_post({"id": 2, "file": {"width": 640, "height": 480}})
+    unknown = booru._standardize_post({"id": 3})
+
+    assert (danbooru["width"], danbooru["height"]) == (1200, 900)
+    assert (e621["width"], e621["height"]) == (640, 480)
+    assert (unknown["width"], unknown["height"]) == (None, None)
+
+
+def test_standardize_post_records_renditions_with_dimensions():
+    from ranboorux.boorus import Booru
+
+    booru = Booru("Test", "https://example.com")
+    gelbooru = booru._standardize_post(
+        {
+            "id": 1,
+            "file_url": "https://img.test/full.png",
+            "sample_url": "https://img.test/sample.jpg",
+            "sample_width": 850,
+            "sample_height": 1200,
+            "preview_url": "https://img.test/thumb.jpg",
+            "preview_width": 0,
+            "preview_height": 0,
+        }
+    )
+    danbooru = booru._standardize_post(
+        {
+            "id": 2,
+            "file_url": "https://img.test/2.png",
+            "media_asset": {
+                "variants": [
+                    {
+                        "type": "720x720",
+                        "url": "https://img.test/720.webp",
+                        "width": 510,
+                        "height": 720,
+                    },
+                    {
+                        "type": "original",
+                        "url": "https://img.test/2.png",
+                        "width": 2000,
+                        "height": 2824,
+                    },
+                ]
+            },
+        }
+    )
+    e621 = booru._standardize_post(
+        {
+            "id": 3,
+            "file": {"url": "https://img.test/3.png", "width": 3000, "height": 2000},
+            "sample": {"url": "https://img.test/3s.jpg", "width": 850, "height": 567},
+        }
+    )
+
+    assert gelbooru["renditions"] == [
+        {"kind": "sample", "url": "https://img.test/sample.jpg", "width": 850, "height": 1200}
+    ]
+    assert [entry["kind"] for entry in danbooru["renditions"]] == ["720x720"]
+    assert e621["file_url"] == "https://img.test/3.png"
+    assert e621["renditions"][0]["url"] == "https://img.test/3s.jpg"
+
+
 def _write_dummy_safetensors(path, metadata=None):
     import json
 
@@ -0,0 +1,191 @@
+import types
+
+from ranboorux import http_client, rate_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _limiter(clock, **limits):
+    return rate_limit.HostRateLimiter(
+        default_rate=2.0,
+        default_burst=2,
+        host_limits=limits,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+
+def test_token_bucket_paces_requests_after_burst():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+
+    waits = [limiter.acquire("https://api.test/posts") for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == [0.5, 0.5]
+    assert limiter.acquire("https://other.test/posts") == 0.0
+    stats = limiter.stats()
+    assert stats["waits"] == 2
+    assert stats["waited_seconds"] == 1.0
+    assert stats["hosts"]["api.test"]["requests"] == 4
+
+
+def test_retry_after_blocks_host_and_halves_rate_until_recovered():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    url = "https://api.test/posts"
+
+    limiter.observe(url, 429, {"Retry-After": "3"})
+
+    assert limiter.bucket_for(url).rate == 1.0
+    assert limiter.acquire(url) == 3.0
+    assert limiter.stats()["throttled"] == 1
+    for _ in range(20):
+        limiter.observe(url, 200, {})
+    assert limiter.bucket_for(url).rate == 2.0
+
+
+def test_exhausted_rate_limit_headers_block_until_reset():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    url = "https://api.test/posts"
+
+    limiter.observe(url, 200, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "4"})
+
+    assert limiter.acquire(url) == 4.0
+
+
+def test_backoff_keeps_a_longer_retry_after():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    url = "https://api.test/posts"
+
+    limiter.observe(url, 503, {"Retry-After": "10"})
+
+    assert limiter.backoff(url, 1) == 10.0
+    assert limiter.backoff(url, 5) == 16.0
+    assert limiter.stats()["retries"] == 2
+
+
+def test_parse_retry_after_accepts_http_dates():
+    assert rate_limit.parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10.0
+    assert rate_limit.parse_retry_after("soon") is None
+
+
+def test_booru_session_routes_requests_through_limiter(monkeypatch):
+    monkeypatch.setattr(
+        http_client.socket,
+        "getaddrinfo",
+        lambda *_args, **_kwargs: [(None, None, None, None, ("93.184.216.34", 443))],
+    )
+    clock = FakeClock()
+    limiter = _limiter(clock)
+
+    class FakeSession:
+        def mount(self, *_args):
+            pass
+
+        def get(self, *_args, **_kwargs):
+            return types.SimpleNamespace(
+                status_code=429, headers={"Retry-After": "2"}, close=lambda: None
+            )
+
+    monkeypatch.setattr(http_client.requests, "Session", lambda: FakeSession())
+    session = http_client.BooruSession(rate_limiter=limiter)
+
+    session.get("https://api.test/posts.json")
+    session.get("https://api.test/posts.json")
+
+    assert clock.slept == [2.0]
+    assert session.rate_limit_stats()["throttled"] == 2
+
+
+def test_response_cache_hits_do_not_spend_host_tokens(monkeypatch):
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    sent = []
+
+    class FakeCache:
+        def __init__(self):
+            self.responses = {}
+
+        def create_key(self, request):
+            return request.url
+
+        def get_response(self, key):
+            return self.responses.get(key)
+
+    class FakeCachedSession:
+        def __init__(self, *_args, **_kwargs):
+            self.cache = FakeCache()
+
+        def mount(self, *_args):
+            pass
+
+        def get(self, url, **_kwargs):
+            if url in self.cache.responses:
+                return types.SimpleNamespace(status_code=200, headers={}, from_cache=True)
+            sent.append(url)
+            self.cache.responses[url] = types.SimpleNamespace(is_expired=False)
+            return types.SimpleNamespace(status_code=200, headers={}, from_cache=False)
+
+    monkeypatch.setattr(
+        http_client.socket,
+        "getaddrinfo",
+        lambda *_args, **_kwargs: [(None, None, None, None, ("93.184.216.34", 443))],
+    )
+    monkeypatch.setattr(
+        http_client, "requests_cache", types.SimpleNamespace(CachedSession=FakeCachedSession)
+    )
+    session = http_client.BooruSession(use_cache=True, rate_limiter=limiter)
+
+    for _ in range(5):
+        assert session.get("https://api.test/posts.json").status_code == 200
+
+    assert sent == ["https://api.test/posts.json"]
+    assert session.rate_limit_stats()["requests"] == 1
+    assert clock.slept == []
+
+    # An entry that expires is refetched and charged again.
+    session._session.cache.responses.clear()
+    session.get("https://api.test/posts.json")
+    assert session.rate_limit_stats()["requests"] == 2
+
+
+def test_fetch_data_retries_throttled_requests_via_limiter(stub_modules):
+    from requests.exceptions import HTTPError
+
+    from ranboorux.boorus.simple import Danbooru
+
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    attempts = []
+
+    class FlakyHttp:
+        rate_limiter = limiter
+
+        def get_json(self, url, **_kwargs):
+            attempts.append(url)
+            limiter.acquire(url)
+            if len(attempts) == 1:
+                limiter.observe(url, 429, {"Retry-After": "5"})
+                raise HTTPError(response=types.SimpleNamespace(status_code=429))
+            return [{"id": 1}]
+
+    booru = Danbooru()
+    booru.http = FlakyHttp()
+
+    assert booru._fetch_data("https://danbooru.test/posts.json") == [{"id": 1}]
+    assert len(attempts) == 2
+    assert clock.slept == [5.0]
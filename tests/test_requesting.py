@@ -1,6 +1,8 @@
 import json
 import types
 
+import pytest
+
 from ranboorux import http_client
 
 
@@ -480,6 +482,56 @@ def test_get_json_surfaces_invalid_json(monkeypatch):
         raise AssertionError("expected JSON parse error")
 
 
+@pytest.mark.parametrize("backend", ["orjson", "json"])
+def test_json_loads_parses_bytes_with_either_backend(monkeypatch, backend):
+    if backend == "json":
+        monkeypatch.setattr(http_client, "orjson", None)
+    elif http_client.orjson is None:
+        pytest.skip("orjson is not installed")
+    body = '{"tags": "caf\u00e9", "id": 7}'
+
+    assert http_client.json_loads(body.encode("utf-8")) == {"tags": "caf\u00e9", "id": 7}
+    assert http_client.json_loads(body.encode("utf-8"), "UTF-8") == {"tags": "caf\u00e9", "id": 7}
+    assert http_client.json_loads(body.encode("latin-1"), "latin-1") == {
+        "tags": "caf\u00e9",
+        "id": 7,
+    }
+
+
+def test_get_json_projects_post_fields_and_keeps_envelope(monkeypatch):
+    _public_dns(monkeypatch)
+
+    class FakeResponse:
+        status_code = 200
+        headers = {"content-type": "application/json"}
+
+        def raise_for_status(self):
+            return None
+
+        def iter_content(self, chunk_size):
+            del chunk_size
+            yield (
+                b'{"@attributes": {"count": 2}, "post": [{"id": 1, "tags": "a", "owner": "x"}, '
+                b'{"id": 2, "change": 9}]}'
+            )
+
+        def close(self):
+            return None
+
+    class FakeSession:
+        def get(self, *_args, **_kwargs):
+            return FakeResponse()
+
+    monkeypatch.setattr(http_client.requests, "Session", lambda: FakeSession())
+    session = http_client.BooruSession(use_cache=False)
+
+    assert session.get_json("https://site.test/api", fields={"id", "tags"}) == {
+        "@attributes": {"count": 2},
+        "post": [{"id": 1, "tags": "a"}, {"id": 2}],
+    }
+    assert http_client.project_fields([{"id": 1, "x": 2}, None], ["id"]) == [{"id": 1}, None]
+
+
 def test_redact_url_mixed_case_and_percent_encoding():
     url1 = "https://site.test/api?X-Amz-Signature=secret123&X-goog-Credential=secret456&sig=secret789&normal=hello"
     redacted1 = http_client.redact_url(url1)
@@ -648,6 +700,7 @@ def test_get_json_parser_failure_contains_sanitized_error(monkeypatch):
             0,
         )
 
+    monkeypatch.setattr(http_client, "orjson", None)
     monkeypatch.setattr(http_client.json, "loads", mock_loads)
 
     try:
@@ -754,3 +807,192 @@ def test_logger_handler_includes_no_secrets(monkeypatch):
                 assert "secret123" not in arg_str
     finally:
         logger.removeHandler(handler)
+
+
+def test_safe_pool_manager_sizes_pools_per_host_and_counts_reuse():
+    import socket
+
+    stats = http_client.PoolStats()
+    manager = http_client._SafePoolManager(
+        num_pools=4, maxsize=2, host_maxsize={"CDN.test": 6}, stats=stats
+    )
+    cdn_pool = manager.connection_from_host("cdn.test", 443, "https")
+    api_pool = manager.connection_from_host("api.test", 443, "https")
+
+    assert cdn_pool.pool.maxsize == 6
+    assert api_pool.pool.maxsize == 2
+
+    conn = api_pool._get_conn()
+    local, remote = socket.socketpair()
+    try:
+        conn.sock = local
+        api_pool._put_conn(conn)
+        assert api_pool._get_conn() is conn
+    finally:
+        conn.sock = None
+        local.close()
+        remote.close()
+
+    assert stats.snapshot() == {"api.test": {"created": 1, "reused": 1}}
+    assert stats.totals() == {"created": 1, "reused": 1}
+
+
+def test_booru_session_mounts_adapter_with_pool_settings():
+    session = http_client.BooruSession(pool_maxsize=3, host_pool_maxsize={"img.test": 5})
+    adapter = session._uncached_session.get_adapter("https://img.test/a.png")
+
+    assert isinstance(adapter, http_client._SafeHTTPAdapter)
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 3
+    assert adapter.poolmanager.host_maxsize == {"img.test": 5}
+    assert session.pool_stats() == {"created": 0, "reused": 0, "hosts": {}}
+    session.close()
+
+
+def test_session_manager_reuses_sessions_per_configuration():
+    created = []
+
+    class FakeSession:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            self.closed = False
+            created.append(self)
+
+        def close(self):
+            self.closed = True
+
+    manager = http_client.SessionManager(factory=FakeSession)
+    plain = manager.acquire(use_cache=False)
+
+    assert manager.acquire(use_cache=False) is plain
+    cached = manager.acquire(use_cache=True, expire_after=600)
+    assert cached is not plain
+    assert cached.kwargs["expire_after"] == 600
+    assert manager.acquire(use_cache=True, expire_after=600) is cached
+    assert len(created) == 2
+
+    manager.close_all()
+
+    assert plain.closed and cached.closed
+    assert manager.acquire(use_cache=False) is not plain
+
+
+def test_script_keeps_booru_session_between_generations(stub_modules):
+    import scripts.ranbooru as ranbooru
+
+    script = ranbooru.Script()
+    initial = script._http_client
+
+    script._setup_cache(False)
+    assert script._http_client is initial
+    script._setup_cache(False)
+    assert script._http_client is initial
+
+
+def test_dns_cache_skips_repeat_lookups_within_ttl(monkeypatch):
+    lookups = []
+    now = {"value": 100.0}
+
+    def fake_getaddrinfo(host, *_args, **_kwargs):
+        lookups.append(host)
+        return [(None, None, None, None, ("93.184.216.34", 443))]
+
+    monkeypatch.setattr(http_client.socket, "getaddrinfo", fake_getaddrinfo)
+    cache = http_client.DnsCache(ttl=30, clock=lambda: now["value"])
+    monkeypatch.setattr(http_client, "DNS_CACHE", cache)
+
+    for _ in range(3):
+        http_client.validate_outbound_url("https://cdn.test/a.png")
+    now["value"] += 31
+    http_client.validate_outbound_url("https://CDN.test/b.png")
+
+    assert lookups == ["cdn.test", "cdn.test"]
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 2}
+
+
+def test_dns_cache_still_rejects_cached_private_addresses(monkeypatch):
+    monkeypatch.setattr(
+        http_client.socket,
+        "getaddrinfo",
+        lambda *_args, **_kwargs: [(None, None, None, None, ("10.0.0.7", 443))],
+    )
+
+    for _ in range(2):
+        try:
+            http_client.validate_outbound_url("https://intranet.test/api")
+        except http_client.UnsafeUrlError:
+            pass
+        else:
+            raise AssertionError("expected UnsafeUrlError")
+
+    assert http_client.DNS_CACHE.stats()["hits"] == 1
+
+
+def _chunked_image_session(monkeypatch, chunks, pulled):
+    _public_dns(monkeypatch)
+
+    class FakeResponse:
+        status_code = 200
+        headers = {"content-type": "image/png"}
+
+        def __init__(self):
+            self.closed = False
+
+        def raise_for_status(self):
+            return None
+
+        def iter_content(self, chunk_size):
+            del chunk_size
+            for chunk in chunks:
+                pulled.append(chunk)
+                yield chunk
+
+        def close(self):
+            self.closed = True
+
+    response = FakeResponse()
+
+    class FakeSession:
+        def get(self, *_args, **_kwargs):
+            return response
+
+    monkeypatch.setattr(http_client.requests, "Session", lambda: FakeSession())
+    return http_client.BooruSession(use_cache=False), response
+
+
+def test_open_image_stream_reads_header_without_pulling_whole_body(monkeypatch):
+    pulled = []
+    session, response = _chunked_image_session(monkeypatch, [b"HEAD", b"body", b"tail"], pulled)
+
+    try:
+        with session.open_image_stream("https://site.test/a.png", max_bytes=64) as stream:
+            assert stream.read(4) == b"HEAD"
+            stream.seek(0)
+            assert stream.read(2) == b"HE"
+            raise ValueError("header rejected")
+    except ValueError:
+        pass
+
+    assert pulled == [b"HEAD"]
+    assert response.closed
+
+
+def test_open_image_stream_enforces_limit_and_completes_on_clean_exit(monkeypatch):
+    pulled = []
+    session, _response = _chunked_image_session(monkeypatch, [b"1234", b"5678"], pulled)
+    completed = []
+
+    with session.open_image_stream("https://site.test/a.png", max_bytes=64) as stream:
+        stream._on_complete = completed.append
+        assert stream.read(2) == b"12"
+    assert completed == [b"12345678"]
+
+    session, _response = _chunked_image_session(monkeypatch, [b"1234", b"5678"], [])
+    stream = session.open_image_stream("https://site.test/a.png", max_bytes=6)
+    try:
+        stream.read()
+    except http_client.ResponseTooLargeError:
+        pass
+    else:
+        raise AssertionError("expected ResponseTooLargeError")
+    finally:
+        stream.close()
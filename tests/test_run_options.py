@@ -4,7 +4,7 @@ from ranboorux.run_options import UI_ARGUMENT_FIELDS, RunComponents, RunOptions
 
 
 def test_ui_argument_field_order_is_frozen():
-    assert len(UI_ARGUMENT_FIELDS) == 64
+    assert len(UI_ARGUMENT_FIELDS) == 65
     assert UI_ARGUMENT_FIELDS[:6] == (
         "enabled",
         "tags",
@@ -14,12 +14,12 @@ def test_ui_argument_field_order_is_frozen():
         "gelbooru_compat_base_url",
     )
     assert UI_ARGUMENT_FIELDS[-6:] == (
-        "catalog_path",
         "lora_auto_detect_pony",
         "lora_detected_loras",
         "lora_blacklist",
         "anima_auto_detect",
         "anima_tune_img2img",
+        "decoded_image_cache_mb",
     )
 
 
@@ -35,11 +35,12 @@ def test_run_options_from_script_args_maps_names_once():
     assert options.tag_filters.remove_text_tags == 50
     assert options.loranado.blacklist == 61
     assert options.anima_tune_img2img == 63
+    assert options.image_workflow.decoded_image_cache_mb == 64
     assert options.as_dict() == dict(zip(UI_ARGUMENT_FIELDS, values))
 
 
 def test_run_options_rejects_wrong_count():
-    with pytest.raises(ValueError, match="Expected 64"):
+    with pytest.raises(ValueError, match="Expected 65"):
         RunOptions.from_script_args([object()])
 
 
@@ -173,6 +173,35 @@ def test_unknown_linter_suggests(tmp_path):
     assert "blonde_hair" in suggestions
 
 
+def test_classify_matches_per_tag_lookups(tmp_path):
+    from ranboorux import catalog as rb_catalog
+    from ranboorux import catalog_index
+
+    catalog_path = str(_write_catalog(tmp_path))
+    tags = ["Uchiwa", "azure hair", "emerald-eyes", "speech bubble", "mystery", "", "uchiwa"]
+    for catalog in (
+        rb_catalog.CsvCatalog(catalog_path),
+        catalog_index.BinaryCatalog(catalog_path, catalog_index.compile_catalog(catalog_path)),
+        rb_catalog.NoopCatalog(),
+    ):
+        result = catalog.classify(tags)
+        assert len(result) == len(tags)
+        for idx, tag in enumerate(tags):
+            assert result.canonical[idx] == catalog.resolve_alias(tag), tag
+            assert result.category[idx] == catalog.category(tag), tag
+            assert result.count[idx] == catalog.count(tag), tag
+            assert result.flagged(idx, rb_catalog.FLAG_KNOWN) == catalog.has(tag), tag
+            assert result.flagged(idx, rb_catalog.FLAG_HAIR) == catalog.is_hair(tag), tag
+            assert result.flagged(idx, rb_catalog.FLAG_EYE) == catalog.is_eye(tag), tag
+            assert result.flagged(idx, rb_catalog.FLAG_TEXTUAL) == catalog.is_textual(tag), tag
+
+    csv_catalog = rb_catalog.CsvCatalog(catalog_path)
+    assert list(csv_catalog.classify(["Uchiwa", "blue hair"]).count) == [500, 1500]
+    view = rb_catalog.classified(csv_catalog, ["uchiwa"])
+    assert view.category("uchiwa") == 4  # from the classify pass
+    assert view.is_hair("blue_hair")  # not classified, asks the catalog
+
+
 def test_import_custom_catalog(tmp_path):
     script = _make_script(tmp_path)
     catalog_path = _write_catalog(tmp_path)
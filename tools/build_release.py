@@ -43,6 +43,7 @@ FORBIDDEN_PATTERNS = [
     "*.zip",
     "*.tar.gz",
     "*.bak",
+    "*.rbxcat",
     "*~",
     "*/tmpclaude-*",
     "*/.ranboorux_*",
@@ -158,7 +158,7 @@ output_path = "docs/handoff/UI_ARGUMENT_CONTRACT.md"
 os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
 # We map components back to their indices and variable names
-# The return statement from scripts/ranbooru.py has 64 items:
+# The return statement from scripts/ranbooru.py has 65 items:
 variable_names = [
     "enabled",
     "tags",
@@ -223,6 +223,7 @@ variable_names = [
     "lora_blacklist",
     "anima_auto_detect",
     "anima_tune_img2img",
+    "decoded_image_cache_mb",
 ]
 
 with open(output_path, "w", encoding="utf-8") as f: